@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 金额提取与数值列索引
+功能：从清洗后的文书正文中提取金额（阿拉伯数字、中文数字及混合写法，如 人民币1,234,567.89元、十万元、3.5万元、12万5000元），
+按前文判断金额的含义（受理费、违约金、本金等），存为NumPy列，区间查询和按法院、月份的汇总都对整列向量化计算
+
+索引目录结构（每列一个.npy文件，按行对齐，打开时mmap）：
+    amount.npy   金额（分，int64）
+    label.npy    含义编号（uint8，对应meta.json中的labels）
+    claim.npy    是否出现在诉讼请求中（bool）
+    section.npy  所在的段（uint8，document_sections.SECTION_KINDS中的下标，如裁判主文中的金额为判决支持的数额）
+    doc.npy      文书号（uint32）
+    court.npy    法院编号（uint16，对应meta.json中的courts，案号无法解析时为0即空字符串）
+    date.npy     裁判日期 YYYYMMDD（uint32，取自日期目录名）
+    month.npy    月份 YYYYMM（uint32）
+    meta.json    含义、法院字典
+    docs.dat / docs.idx   文书信息，每行"docId\t日期\t文件路径\t标题\t案号"
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import argparse
+import unicodedata
+from decimal import Decimal
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bigram_index import find_shards
+from case_number import parse_case_number
+from chinese_numerals import chinese_to_int, DIGITS, LARGE_UNITS, NUMERAL_CHARS
+from document_catalog import parse_document_text
+from document_sections import SECTION_KINDS, SECTION_NAMES, section_bounds, section_at
+from doc_id import extract_doc_id
+
+_SMALL = rf'[0-9{"".join(DIGITS)}]'
+# NFKC后全角逗号、数字都变为半角；千分位逗号必须是三位一组，避免把句中的逗号当作千分位
+AMOUNT_PATTERN = re.compile(
+    r'(?:(?P<arabic>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)\s*(?P<unit>万|亿)?'
+    rf'|(?P<chinese>[0-9{NUMERAL_CHARS}]*[{NUMERAL_CHARS}][0-9{NUMERAL_CHARS}]*))'
+    r'\s*元'
+    rf'(?:\s*(?P<jiao>{_SMALL})角)?(?:\s*(?P<fen>{_SMALL})分)?'
+)
+UNIT_VALUES = {'万': 10 ** 4, '亿': 10 ** 8}
+
+# 金额的含义：在金额之前同一句中最后出现的关键词决定含义，没有关键词时为"其他"
+LABEL_RULES = (
+    ('受理费', ('受理费', '诉讼费')),
+    ('保全费', ('保全费', '保全申请费')),
+    ('鉴定费', ('鉴定费', '评估费')),
+    ('律师费', ('律师费', '代理费')),
+    ('违约金', ('违约金',)),
+    ('利息', ('利息', '逾期付款损失', '资金占用')),
+    ('赔偿', ('赔偿', '损失', '补偿')),
+    ('本金', ('借款', '本金', '欠款', '货款', '价款', '工程款', '租金', '工资', '报酬', '款项')),
+    ('标的额', ('标的额', '标的')),
+)
+LABELS = ['其他'] + [label for label, _ in LABEL_RULES]
+CLAIM_KEYWORDS = ('诉讼请求', '请求判令', '诉请')
+CONTEXT_CHARS = 40
+SENTENCE_END = re.compile(r'[。；;\n]')
+
+
+def parse_amount(match):
+    """
+    把AMOUNT_PATTERN的匹配转换为以分为单位的整数
+    
+    Returns:
+        int: 金额（分），中文数字无法识别时为None
+    """
+    if match.group('arabic'):
+        fen = Decimal(match.group('arabic').replace(',', '')) * 100
+        if match.group('unit'):
+            fen *= UNIT_VALUES[match.group('unit')]
+        fen = int(fen)  # 不足一分的部分舍去
+    else:
+        text = match.group('chinese')
+        if all(ch in LARGE_UNITS for ch in text):
+            return None  # 只有万、亿，如"万元"
+        try:
+            fen = chinese_to_int(text) * 100
+        except ValueError:
+            return None
+    for group, scale in (('jiao', 10), ('fen', 1)):
+        if match.group(group):
+            fen += chinese_to_int(match.group(group)) * scale
+    return fen
+
+
+def label_of(before):
+    """
+    按金额之前的文字判断含义
+    
+    Args:
+        before (str): 金额之前同一句中的文字
+    
+    Returns:
+        int: LABELS中的编号
+    """
+    best, best_pos = 0, -1
+    for i, (_, keywords) in enumerate(LABEL_RULES):
+        for keyword in keywords:
+            pos = before.rfind(keyword)
+            if pos > best_pos:
+                best, best_pos = i + 1, pos
+    return best
+
+
+def extract_amounts(body):
+    """
+    提取正文中的金额
+    
+    Args:
+        body (str): 文书正文（DocumentCleaner的输出）
+    
+    Returns:
+        list: (金额(分), 含义编号, 是否在诉讼请求中, 段号)，按出现顺序
+    """
+    text = unicodedata.normalize('NFKC', body)
+    bounds = section_bounds(text)
+    amounts = []
+    paragraph_start = None
+    claim = False
+    for match in AMOUNT_PATTERN.finditer(text):
+        fen = parse_amount(match)
+        if fen is None:
+            continue
+        start = match.start()
+        # 诉讼请求所在的段落（正文中一行为一段）
+        line_start = text.rfind('\n', 0, start) + 1
+        if line_start != paragraph_start:
+            paragraph_start = line_start
+            line_end = text.find('\n', start)
+            paragraph = text[line_start:line_end if line_end >= 0 else len(text)]
+            claim = any(keyword in paragraph for keyword in CLAIM_KEYWORDS)
+        window = text[max(line_start, start - CONTEXT_CHARS):start]
+        ends = list(SENTENCE_END.finditer(window))
+        if ends:
+            window = window[ends[-1].end():]
+        amounts.append((fen, label_of(window), claim, section_at(bounds, start)))
+    return amounts
+
+
+def _month_fields(date_str):
+    """日期目录名转换为(YYYYMMDD, YYYYMM)，不是日期时为(0, 0)"""
+    digits = date_str.replace('-', '')
+    if len(digits) == 8 and digits.isdigit():
+        return int(digits), int(digits[:6])
+    return 0, 0
+
+
+def _extract_shard(shard_dir, shard_name):
+    """提取一个日期目录中全部文书的金额（在子进程中运行）"""
+    documents = []
+    for filename in sorted(os.listdir(shard_dir)):
+        if not filename.endswith('.txt'):
+            continue
+        file_path = os.path.join(shard_dir, filename)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                document = parse_document_text(f.read())
+        except (OSError, UnicodeDecodeError):
+            continue
+        amounts = extract_amounts(document['body'])
+        if not amounts:
+            continue
+        doc_id = extract_doc_id(document['url']) if document['url'] else 'file-' + file_path
+        parsed = parse_case_number(document['case_number'])
+        documents.append((doc_id, shard_name, file_path, document['title'], document['case_number'],
+                          parsed.court if parsed else '', amounts))
+    return documents
+
+
+def build_table(root='文书', output_dir='金额索引', workers=None):
+    """
+    扫描文书目录建立金额列（各日期目录并行提取，先写入临时目录再替换）
+    
+    Args:
+        root (str): 文书根目录
+        output_dir (str): 索引目录
+        workers (int): 进程数，默认CPU核数
+    
+    Returns:
+        int: 金额的条数
+    """
+    shards = find_shards(root)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shard_results = list(executor.map(_extract_shard, *zip(*shards))) if shards else []
+    documents = [document for documents in shard_results for document in documents]
+    
+    courts = [''] + sorted({document[5] for document in documents} - {''})
+    court_ids = {court: i for i, court in enumerate(courts)}
+    columns = {name: array(typecode) for name, typecode in
+               (('amount', 'q'), ('label', 'B'), ('claim', 'B'), ('section', 'B'), ('doc', 'I'),
+                ('court', 'H'), ('date', 'I'), ('month', 'I'))}
+    
+    tmp_dir = output_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    offsets = array('Q', [0])
+    with open(os.path.join(tmp_dir, 'docs.dat'), 'wb') as f:
+        for doc, (doc_id, shard_name, file_path, title, case_number, court, amounts) in enumerate(documents):
+            line = '\t'.join(field.replace('\t', ' ').replace('\n', ' ')
+                             for field in (doc_id, shard_name, file_path, title, case_number)) + '\n'
+            line = line.encode('utf-8')
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+            date, month = _month_fields(shard_name)
+            for fen, label, claim, section in amounts:
+                columns['amount'].append(fen)
+                columns['label'].append(label)
+                columns['claim'].append(claim)
+                columns['section'].append(section)
+                columns['doc'].append(doc)
+                columns['court'].append(court_ids[court])
+                columns['date'].append(date)
+                columns['month'].append(month)
+    with open(os.path.join(tmp_dir, 'docs.idx'), 'wb') as f:
+        f.write(offsets.tobytes())
+    dtypes = {'amount': np.int64, 'label': np.uint8, 'claim': np.bool_, 'section': np.uint8, 'doc': np.uint32,
+              'court': np.uint16, 'date': np.uint32, 'month': np.uint32}
+    for name, values in columns.items():
+        np.save(os.path.join(tmp_dir, f'{name}.npy'), np.frombuffer(values.tobytes(), dtype=values.typecode)
+                .astype(dtypes[name]))
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'labels': LABELS, 'courts': courts, 'documents': len(documents)}, f, ensure_ascii=False)
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.replace(tmp_dir, output_dir)
+    rows = len(columns['amount'])
+    print(f"✓ 金额索引建立完成：{len(documents)} 篇文书，{rows} 个金额")
+    return rows
+
+
+class AmountTable:
+    """只读的金额列"""
+    
+    COLUMNS = ('amount', 'label', 'claim', 'section', 'doc', 'court', 'date', 'month')
+    ROW_COLUMNS = ('label', 'claim', 'section')  # 同一文书内各条金额可以不同的列
+    
+    def __init__(self, path='金额索引'):
+        """
+        打开索引，各列以mmap方式加载
+        
+        Args:
+            path (str): 索引目录
+        """
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.labels = meta['labels']
+        self.courts = meta['courts']
+        self.columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                        for name in self.COLUMNS}
+        with open(os.path.join(path, 'docs.idx'), 'rb') as f:
+            self._doc_offsets = np.frombuffer(f.read(), dtype=np.uint64)
+    
+    def __len__(self):
+        return len(self.columns['amount'])
+    
+    def mask(self, label=None, claim=None, section=None, min_yuan=None, max_yuan=None,
+             date_from=None, date_to=None, court=None):
+        """
+        按条件筛选行，条件为None时不限
+        
+        Args:
+            label (str): 含义，如'受理费'
+            claim (bool): 是否出现在诉讼请求中
+            section (str): 所在的段，如'holding'（裁判主文）
+            min_yuan (float): 金额下限（元，含）
+            max_yuan (float): 金额上限（元，含）
+            date_from (str): 起始日期（含），如'2023-01-01'
+            date_to (str): 截止日期（含）
+            court (str): 法院代字，如'沪02'；只给省级简称时匹配该省全部法院
+        
+        Returns:
+            numpy.ndarray: 布尔数组
+        """
+        columns = self.columns
+        selected = np.ones(len(self), dtype=bool)
+        if label is not None:
+            selected &= columns['label'] == (self.labels.index(label) if label in self.labels else 255)
+        if claim is not None:
+            selected &= columns['claim'] == claim
+        if section is not None:
+            selected &= columns['section'] == SECTION_KINDS.index(section)
+        if min_yuan is not None:
+            selected &= columns['amount'] >= round(min_yuan * 100)
+        if max_yuan is not None:
+            selected &= columns['amount'] <= round(max_yuan * 100)
+        if date_from:
+            selected &= columns['date'] >= int(date_from.replace('-', ''))
+        if date_to:
+            selected &= columns['date'] <= int(date_to.replace('-', ''))
+        if court is not None:
+            ids = [i for i, name in enumerate(self.courts)
+                   if name == court or (len(court) == 1 and name.startswith(court))]
+            selected &= np.isin(columns['court'], ids)
+        return selected
+    
+    def document(self, doc):
+        """
+        Returns:
+            dict: doc_id、date、file_path、title、case_number
+        """
+        start, end = int(self._doc_offsets[doc]), int(self._doc_offsets[doc + 1])
+        with open(os.path.join(self.path, 'docs.dat'), 'rb') as f:
+            f.seek(start)
+            line = f.read(end - start).decode('utf-8')
+        doc_id, date, file_path, title, case_number = line.rstrip('\n').split('\t')
+        return {'doc': doc, 'doc_id': doc_id, 'date': date, 'file_path': file_path,
+                'title': title, 'case_number': case_number}
+    
+    def search(self, limit=20, **filters):
+        """
+        查找金额满足条件的文书，条件同mask()
+        
+        Returns:
+            list: 文书信息dict，附带其中满足条件的最大金额（元），按该金额从大到小排列
+        """
+        selected = self.mask(**filters)
+        docs = self.columns['doc'][selected]
+        amounts = self.columns['amount'][selected]
+        if len(docs) == 0:
+            return []
+        order = np.lexsort((-amounts, docs))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = docs[order][1:] != docs[order][:-1]
+        # 每篇文书取最大金额的一行，再按金额从大到小取前limit篇（金额相同时按文书号）
+        rows = order[first]
+        rows = rows[np.argsort(-amounts[rows].astype(np.int64), kind='stable')]
+        hits = []
+        for row in rows[:limit]:
+            hit = self.document(int(docs[row]))
+            hit['amount'] = int(amounts[row]) / 100
+            hits.append(hit)
+        return hits
+    
+    def aggregate(self, func='sum', by=('court', 'month'), per_document=None, **filters):
+        """
+        分组汇总
+        
+        Args:
+            func (str): 'sum'、'mean'、'median'、'min'、'max'或'count'
+            by (tuple): 分组列，可用court、month、date、label、claim、section
+            per_document (str): 先把每篇文书的金额合并为一个值（'sum'或'max'）再分组，
+                例如每篇文书诉讼请求的最高金额；by中有label等逐条的列时，按(文书, 该列的值)分别合并；
+                为None时按金额逐条汇总
+            **filters: 筛选条件，同mask()
+        
+        Returns:
+            list: (分组值元组, 汇总值(元), 条数)，按分组值排序
+        """
+        selected = self.mask(**filters)
+        amounts = self.columns['amount'][selected].astype(np.int64)
+        keys = [np.asarray(self.columns[name][selected]).astype(np.int64) for name in by]
+        if per_document:
+            # 建索引时按文书号顺序写入各行，同一文书的行相邻，按文书切段即可
+            docs = self.columns['doc'][selected]
+            if len(docs) == 0:
+                return []
+            changed = docs[1:] != docs[:-1]
+            row_keys = [key for name, key in zip(by, keys) if name in self.ROW_COLUMNS]
+            if row_keys:
+                # 同一文书内不同标签、段落的金额交错排列，先按(文书, 逐条的列)排序再切段
+                order = np.lexsort(row_keys[::-1] + [docs])
+                docs, amounts = docs[order], amounts[order]
+                keys = [key[order] for key in keys]
+                row_keys = [key[order] for key in row_keys]
+                changed = docs[1:] != docs[:-1]
+                for key in row_keys:
+                    changed |= key[1:] != key[:-1]
+            starts = np.flatnonzero(np.concatenate(([True], changed)))
+            reduce = np.add if per_document == 'sum' else np.maximum
+            amounts = reduce.reduceat(amounts, starts)
+            keys = [key[starts] for key in keys]
+        if len(amounts) == 0:
+            return []
+        
+        # 各分组列按混合进制合成一个int64键，对一维数组去重比按行去重快得多
+        radices = [int(key.max()) + 1 for key in keys]
+        if np.prod([float(radix) for radix in radices]) >= 2 ** 62:
+            factorized = [np.unique(key, return_inverse=True) for key in keys]
+            columns = [values for values, _ in factorized]
+            keys = [inverse.reshape(-1) for _, inverse in factorized]
+            radices = [len(values) for values in columns]
+        else:
+            columns = None
+        composite = np.zeros(len(amounts), dtype=np.int64)
+        for key, radix in zip(keys, radices):
+            composite = composite * radix + key
+        composite_groups, inverse = np.unique(composite, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        groups = []
+        for radix in reversed(radices):
+            composite_groups, digits = np.divmod(composite_groups, radix)
+            groups.append(digits)
+        groups = groups[::-1]
+        if columns is not None:
+            groups = [values[digits] for values, digits in zip(columns, groups)]
+        groups = np.stack(groups, axis=1) if groups else np.zeros((len(composite_groups), 0), dtype=np.int64)
+        counts = np.bincount(inverse, minlength=len(groups))
+        if func in ('sum', 'mean', 'count'):
+            sums = np.bincount(inverse, weights=amounts, minlength=len(groups))
+            values = {'sum': sums, 'mean': sums / counts, 'count': counts * 100}[func]
+        else:
+            # 按(分组, 金额)排序后，每组的最小、最大和中位数都在固定位置
+            order = np.lexsort((amounts, inverse))
+            ordered = amounts[order]
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            if func == 'min':
+                values = ordered[starts]
+            elif func == 'max':
+                values = ordered[starts + counts - 1]
+            elif func == 'median':
+                values = (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2
+            else:
+                raise ValueError(f"不支持的汇总方式: {func}")
+        results = []
+        for group, value, count in zip(groups.tolist(), np.asarray(values).tolist(), counts.tolist()):
+            labels = tuple(self._display(name, key) for name, key in zip(by, group))
+            results.append((labels, value / 100, count))
+        return results
+    
+    def _display(self, column, value):
+        if column == 'court':
+            return self.courts[value] or '未知'
+        if column == 'label':
+            return self.labels[value]
+        if column == 'section':
+            return SECTION_NAMES[SECTION_KINDS[value]]
+        if column == 'claim':
+            return bool(value)
+        return value
+
+
+def main(argv=None):
+    """命令行入口：python -m amount_extractor build / search / agg / extract"""
+    parser = argparse.ArgumentParser(prog='python -m amount_extractor', description='金额提取与数值列索引')
+    parser.add_argument('--index', default='金额索引', help='索引目录（默认: 金额索引）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='建立金额索引')
+    build_parser.add_argument('root', nargs='?', default='文书', help='文书根目录（默认: 文书）')
+    build_parser.add_argument('--workers', type=int, default=None, help='进程数（默认: CPU核数）')
+    search_parser = subparsers.add_parser('search', help='查找金额满足条件的文书')
+    agg_parser = subparsers.add_parser('agg', help='分组汇总')
+    agg_parser.add_argument('--func', default='sum', choices=['sum', 'mean', 'median', 'min', 'max', 'count'])
+    agg_parser.add_argument('--by', default='court,month', help='分组列，逗号分隔（默认: court,month）')
+    agg_parser.add_argument('--per-doc', dest='per_document', choices=['sum', 'max'],
+                            help='先把每篇文书的金额合并为一个值')
+    for sub_parser in (search_parser, agg_parser):
+        sub_parser.add_argument('--label', choices=LABELS, help='金额含义')
+        sub_parser.add_argument('--claim', action='store_true', default=None, help='只统计诉讼请求中的金额')
+        sub_parser.add_argument('--section', choices=SECTION_KINDS, help='只统计某段中的金额，如 holding（裁判主文）')
+        sub_parser.add_argument('--min', dest='min_yuan', type=float, help='金额下限（元）')
+        sub_parser.add_argument('--max', dest='max_yuan', type=float, help='金额上限（元）')
+        sub_parser.add_argument('--from', dest='date_from', help='起始日期 YYYY-MM-DD')
+        sub_parser.add_argument('--to', dest='date_to', help='截止日期 YYYY-MM-DD')
+        sub_parser.add_argument('--court', help='法院代字，如 沪02；只给省级简称时匹配该省全部法院')
+    search_parser.add_argument('--limit', type=int, default=20, help='最多显示条数（默认: 20）')
+    extract_parser = subparsers.add_parser('extract', help='显示一篇文书中的金额')
+    extract_parser.add_argument('file', help='文书txt文件')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    
+    if args.command == 'extract':
+        with open(args.file, 'r', encoding='utf-8') as f:
+            for fen, label, claim, section in extract_amounts(parse_document_text(f.read())['body']):
+                print(f"{fen / 100:>16,.2f} 元  {LABELS[label]}  {SECTION_NAMES[SECTION_KINDS[section]]}"
+                      + ('  [诉讼请求]' if claim else ''))
+        return True
+    
+    if args.command == 'build':
+        if not os.path.isdir(args.root):
+            print(f"✗ 目录不存在: {args.root}")
+            return False
+        build_table(args.root, args.index, args.workers)
+        return True
+    
+    table = AmountTable(args.index)
+    filters = {name: getattr(args, name) for name in
+               ('label', 'claim', 'section', 'min_yuan', 'max_yuan', 'date_from', 'date_to', 'court')}
+    if args.command == 'search':
+        for hit in table.search(limit=args.limit, **filters):
+            print(f"{hit['amount']:>16,.2f} 元  [{hit['date']}] {hit['case_number']} {hit['title']}")
+    else:
+        by = tuple(name for name in args.by.split(',') if name)
+        for group, value, count in table.aggregate(args.func, by, args.per_document, **filters):
+            shown = f"{count:>12}" if args.func == 'count' else f"{value:>20,.2f} 元"
+            print(f"{' '.join(str(key) for key in group):<24} {shown}  （{count} 条）")
+    return True
+
+
+if __name__ == "__main__":
+    main()
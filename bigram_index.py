@@ -0,0 +1,688 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 二元组倒排索引
+功能：对 文书/ 下清洗后的文书建立汉字二元组倒排索引，词典和倒排表都通过mmap读取，
+支持短语查询和AND/OR/NOT组合查询；建立索引时按日期分片并行处理再归并
+
+索引目录结构：
+    terms.keys     词典：已排序的uint64词键数组（两个字的码位拼成），二分查找
+    terms.dat      与词键一一对应的(倒排表偏移 uint64, 字节数 uint32, 文书数 uint32, 最后的文书号 uint32)
+    postings.bin   倒排表：每篇文书依次为 文书号差值、出现次数、各位置差值，均为varint
+    docs.dat       文书信息，每行"docId\t日期\t文件路径\t标题"
+    docs.idx       docs.dat中每行的偏移（uint64数组，末尾多一项为文件长度）
+
+查询时只映射文件、按需解码所涉及词的倒排表，内存占用与语料规模无关。
+"""
+
+import os
+import sys
+import mmap
+import heapq
+import shutil
+import struct
+import bisect
+import argparse
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from doc_id import extract_doc_id
+from document_catalog import parse_document_text, split_runs, run_tokens, query_tokens, normalize_text
+
+TERM_ENTRY = struct.Struct('<QIII')
+RUN_HEADER = struct.Struct('<QIII')  # 分片临时文件中每个词的头：词键、文书数、最后的文书号、字节数
+
+
+def term_key(token):
+    """
+    词键：第一个字的码位左移32位加第二个字的码位，单字的第二部分为0
+    
+    按词键排序即按(第一个字, 第二个字)排序，以某个字开头的词连续存放。
+    """
+    return (ord(token[0]) << 32) | (ord(token[1]) if len(token) > 1 else 0)
+
+
+def encode_varint(value, out):
+    """把非负整数以varint追加到bytearray"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(buf, pos):
+    """
+    从pos处解码一个varint
+    
+    Returns:
+        tuple: (数值, 下一个位置)
+    """
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_posting(delta, positions, out):
+    """追加一篇文书的倒排项：文书号差值、出现次数、各位置差值"""
+    encode_varint(delta, out)
+    encode_varint(len(positions), out)
+    previous = 0
+    for p in positions:
+        encode_varint(p - previous, out)
+        previous = p
+
+
+def document_positions(document):
+    """
+    计算一篇文书中各词出现的位置（标题和正文依次编号，中间空一位，短语不会跨越两者）
+    
+    每个连续串的词（二元组和末尾单字，见run_tokens）各占一个位置。
+    
+    Returns:
+        dict: 词键 -> 位置列表
+    """
+    positions = {}
+    pos = 0
+    for text in (document['title'], document['body']):
+        for run in split_runs(text):
+            for token in run_tokens(run):
+                positions.setdefault(term_key(token), []).append(pos)
+                pos += 1
+        pos += 1
+    return positions
+
+
+def _build_shard(shard_dir, shard_name, run_path, docs_path):
+    """
+    映射阶段：为一个日期分片建立内存中的倒排表并写入临时文件（在子进程中运行）
+    
+    Returns:
+        tuple: (分片名, 文书数, 临时倒排文件, 临时文书信息文件)
+    """
+    postings = {}
+    last_doc = {}
+    doc_freq = {}
+    filenames = sorted(name for name in os.listdir(shard_dir) if name.endswith('.txt'))
+    count = 0
+    with open(docs_path, 'w', encoding='utf-8') as docs_file:
+        for filename in filenames:
+            file_path = os.path.join(shard_dir, filename)
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    document = parse_document_text(f.read())
+            except (OSError, UnicodeDecodeError):
+                continue
+            doc = count
+            count += 1
+            doc_id = extract_doc_id(document['url']) if document['url'] else 'file-' + file_path
+            fields = (doc_id, shard_name, file_path, document['title'])
+            docs_file.write('\t'.join(field.replace('\t', ' ').replace('\n', ' ') for field in fields) + '\n')
+            
+            for key, plist in document_positions(document).items():
+                buf = postings.get(key)
+                if buf is None:
+                    buf = postings[key] = bytearray()
+                    doc_freq[key] = 0
+                # 每个词的第一篇文书记录分片内的文书号，归并时换算为全局文书号
+                encode_posting(doc - last_doc.get(key, 0), plist, buf)
+                last_doc[key] = doc
+                doc_freq[key] += 1
+    
+    with open(run_path, 'wb') as f:
+        for key in sorted(postings):
+            buf = postings[key]
+            f.write(RUN_HEADER.pack(key, doc_freq[key], last_doc[key], len(buf)))
+            f.write(buf)
+    return shard_name, count, run_path, docs_path
+
+
+def _read_run(run_path):
+    """顺序读取分片临时文件，产生(词键, 文书数, 最后的文书号, 倒排字节)"""
+    with open(run_path, 'rb') as f:
+        while True:
+            header = f.read(RUN_HEADER.size)
+            if not header:
+                return
+            key, df, last, length = RUN_HEADER.unpack(header)
+            yield key, df, last, f.read(length)
+
+
+def _read_lines(path):
+    """逐行读取分片的文书信息临时文件"""
+    with open(path, 'rb') as f:
+        yield from f
+
+
+def _tagged(terms, source_index):
+    """给词流加上来源序号，归并时同一个词按来源顺序排列"""
+    for key, df, last, data in terms:
+        yield key, source_index, df, last, data
+
+
+def find_shards(root):
+    """列出包含txt文书的目录，按相对路径排序；分片名为相对路径（通常就是日期）"""
+    shards = []
+    for dirpath, _, filenames in os.walk(root):
+        if any(name.endswith('.txt') for name in filenames):
+            name = os.path.relpath(dirpath, root)
+            shards.append((dirpath, os.path.basename(root) if name == '.' else name))
+    return sorted(shards, key=lambda shard: shard[1])
+
+
+def _prepare_dir(output_dir):
+    """新建临时目录（含存放分片临时文件的runs子目录）"""
+    tmp_dir = output_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(os.path.join(tmp_dir, 'runs'))
+    return tmp_dir
+
+
+def _finish_dir(tmp_dir, output_dir):
+    """删除分片临时文件，用临时目录替换旧索引"""
+    shutil.rmtree(os.path.join(tmp_dir, 'runs'))
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.replace(tmp_dir, output_dir)
+
+
+def _run_sources(results):
+    """把各分片的建立结果转换为归并来源"""
+    return [(count, _read_run(run_path), _read_lines(docs_path))
+            for _, count, run_path, docs_path in results]
+
+
+def build_index(root='文书', output_dir='二元索引', workers=None):
+    """
+    建立索引：各日期分片并行建立倒排表（映射），再按词键归并为一个索引（归并）
+    
+    先写入临时目录，完成后替换旧索引。
+    
+    Args:
+        root (str): 文书根目录
+        output_dir (str): 索引目录
+        workers (int): 进程数，默认CPU核数
+    
+    Returns:
+        int: 索引的文书数
+    """
+    shards = find_shards(root)
+    tmp_dir = _prepare_dir(output_dir)
+    print(f"正在建立二元组索引：{len(shards)} 个分片")
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_build_shard, shard_dir, name,
+                                   os.path.join(tmp_dir, 'runs', f'{i}.run'),
+                                   os.path.join(tmp_dir, 'runs', f'{i}.docs'))
+                   for i, (shard_dir, name) in enumerate(shards)]
+        results = [future.result() for future in futures]
+    
+    total = _merge_sources(_run_sources(results), tmp_dir)
+    _finish_dir(tmp_dir, output_dir)
+    print(f"✓ 二元组索引建立完成，共 {total} 篇文书")
+    return total
+
+
+def build_segment(shards, output_dir):
+    """
+    在当前进程中把若干分片建立为一个独立的索引（分段索引在后台进程中调用）
+    
+    Args:
+        shards (list): (分片目录, 分片名) 列表
+        output_dir (str): 索引目录
+    
+    Returns:
+        int: 索引的文书数
+    """
+    tmp_dir = _prepare_dir(output_dir)
+    results = [_build_shard(shard_dir, name,
+                            os.path.join(tmp_dir, 'runs', f'{i}.run'),
+                            os.path.join(tmp_dir, 'runs', f'{i}.docs'))
+               for i, (shard_dir, name) in enumerate(shards)]
+    total = _merge_sources(_run_sources(results), tmp_dir)
+    _finish_dir(tmp_dir, output_dir)
+    return total
+
+
+def merge_indexes(sources, output_dir):
+    """
+    把若干已建立的索引合并为一个索引，文书按来源的顺序排列
+    
+    倒排表按词键归并，没有需要丢弃的文书时原样拷贝字节，只换算每个来源第一篇文书的差值。
+    
+    Args:
+        sources (list): (索引目录, 要丢弃的分片名集合) 列表
+        output_dir (str): 合并后的索引目录
+    
+    Returns:
+        int: 合并后的文书数
+    """
+    tmp_dir = _prepare_dir(output_dir)
+    indexes = [BigramIndex(path) for path, _ in sources]
+    try:
+        total = _merge_sources([index.merge_source(dropped) for index, (_, dropped) in zip(indexes, sources)],
+                               tmp_dir)
+    finally:
+        for index in indexes:
+            index.close()
+    _finish_dir(tmp_dir, output_dir)
+    return total
+
+
+def _merge_sources(sources, output_dir):
+    """
+    归并各来源的倒排表和文书信息，写出词典、倒排表和文书表
+    
+    Args:
+        sources (list): (文书数, 按词键排序的(词键, 文书数, 最后的文书号, 倒排字节)流, 文书信息行流) 列表，
+            每个来源的倒排表中第一篇文书的差值即来源内的文书号
+        output_dir (str): 输出目录
+    
+    Returns:
+        int: 文书总数
+    """
+    bases = []
+    total = 0
+    for count, _, _ in sources:
+        bases.append(total)
+        total += count
+    
+    with open(os.path.join(output_dir, 'postings.bin'), 'wb') as postings_file, \
+            open(os.path.join(output_dir, 'terms.keys'), 'wb') as keys_file, \
+            open(os.path.join(output_dir, 'terms.dat'), 'wb') as terms_file:
+        keys = array('Q')
+        entries = bytearray()
+        offset = 0
+        current_key = None
+        start = df = previous_last = 0
+        runs = [_tagged(terms, i) for i, (_, terms, _) in enumerate(sources)]
+        for key, source_index, source_df, last, data in heapq.merge(*runs):
+            if key != current_key:
+                if current_key is not None:
+                    keys.append(current_key)
+                    entries += TERM_ENTRY.pack(start, offset - start, df, previous_last)
+                current_key, start, df, previous_last = key, offset, 0, 0
+            # 换算该来源第一篇文书的差值，其余字节原样拷贝
+            first, pos = decode_varint(data, 0)
+            head = bytearray()
+            encode_varint(bases[source_index] + first - previous_last, head)
+            postings_file.write(head)
+            postings_file.write(memoryview(data)[pos:])
+            offset += len(head) + len(data) - pos
+            previous_last = bases[source_index] + last
+            df += source_df
+            if len(keys) >= 65536:
+                keys_file.write(keys.tobytes())
+                terms_file.write(entries)
+                keys, entries = array('Q'), bytearray()
+        if current_key is not None:
+            keys.append(current_key)
+            entries += TERM_ENTRY.pack(start, offset - start, df, previous_last)
+        keys_file.write(keys.tobytes())
+        terms_file.write(entries)
+    
+    offsets = array('Q', [0])
+    with open(os.path.join(output_dir, 'docs.dat'), 'wb') as docs_file:
+        for _, _, lines in sources:
+            for line in lines:
+                docs_file.write(line)
+                offsets.append(offsets[-1] + len(line))
+    with open(os.path.join(output_dir, 'docs.idx'), 'wb') as f:
+        f.write(offsets.tobytes())
+    return total
+
+
+def _map_file(path):
+    """只读映射文件，空文件返回空bytes"""
+    if os.path.getsize(path) == 0:
+        return None, b''
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mapped, mapped
+
+
+def _intersect(streams):
+    """多个升序文书号流的交集"""
+    iterators = [iter(stream) for stream in streams]
+    try:
+        current = [next(it) for it in iterators]
+        while True:
+            target = max(current)
+            for i, it in enumerate(iterators):
+                while current[i] < target:
+                    current[i] = next(it)
+            if all(doc == target for doc in current):
+                yield target
+                current[0] = next(iterators[0])
+    except StopIteration:
+        return
+
+
+def _union(streams):
+    """多个升序文书号流的并集"""
+    last = None
+    for doc in heapq.merge(*streams):
+        if doc != last:
+            yield doc
+            last = doc
+
+
+def _difference(stream, excluded):
+    """从升序文书号流中去掉excluded（升序）中的文书"""
+    excluded = iter(excluded)
+    skip = next(excluded, None)
+    for doc in stream:
+        while skip is not None and skip < doc:
+            skip = next(excluded, None)
+        if doc != skip:
+            yield doc
+
+
+class BigramIndex:
+    """只读的二元组倒排索引"""
+    
+    def __init__(self, path='二元索引'):
+        """
+        打开索引
+        
+        Args:
+            path (str): 索引目录
+        """
+        self.path = path
+        self._maps = []
+        self._keys = self._open(os.path.join(path, 'terms.keys'), 'Q')
+        self._terms = self._open(os.path.join(path, 'terms.dat'))
+        self._postings = self._open(os.path.join(path, 'postings.bin'))
+        self._docs = self._open(os.path.join(path, 'docs.dat'))
+        self._doc_offsets = self._open(os.path.join(path, 'docs.idx'), 'Q')
+    
+    def _open(self, path, fmt=None):
+        mapped, data = _map_file(path)
+        if mapped is not None:
+            self._maps.append(mapped)
+        view = memoryview(data)
+        return view.cast(fmt) if fmt else view
+    
+    def __len__(self):
+        return max(len(self._doc_offsets) - 1, 0)
+    
+    def document(self, doc):
+        """
+        读取文书信息
+        
+        Args:
+            doc (int): 文书号
+        
+        Returns:
+            dict: doc_id、date、file_path、title
+        """
+        start, end = self._doc_offsets[doc], self._doc_offsets[doc + 1]
+        doc_id, date, file_path, title = bytes(self._docs[start:end]).decode('utf-8').rstrip('\n').split('\t')
+        return {'doc': doc, 'doc_id': doc_id, 'date': date, 'file_path': file_path, 'title': title}
+    
+    def docs_in_shards(self, shards):
+        """
+        属于给定分片（日期）的文书号集合
+        
+        Args:
+            shards (set): 分片名集合
+        
+        Returns:
+            set: 文书号
+        """
+        if not shards:
+            return set()
+        docs = set()
+        for doc in range(len(self)):
+            line = bytes(self._docs[self._doc_offsets[doc]:self._doc_offsets[doc + 1]])
+            if line.split(b'\t', 2)[1].decode('utf-8') in shards:
+                docs.add(doc)
+        return docs
+    
+    def merge_source(self, dropped_shards=()):
+        """
+        作为合并来源，丢弃给定分片的文书并重新编号
+        
+        Returns:
+            tuple: (文书数, 词流, 文书信息行流)，格式同_merge_sources
+        """
+        dropped = self.docs_in_shards(set(dropped_shards))
+        if not dropped:
+            return len(self), self._raw_terms(), self._doc_lines(dropped)
+        renumber = []
+        kept = 0
+        for doc in range(len(self)):
+            if doc in dropped:
+                renumber.append(-1)
+            else:
+                renumber.append(kept)
+                kept += 1
+        return kept, self._renumbered_terms(renumber), self._doc_lines(dropped)
+    
+    def _raw_terms(self):
+        for i, key in enumerate(self._keys):
+            offset, length, df, last = TERM_ENTRY.unpack_from(self._terms, i * TERM_ENTRY.size)
+            yield key, df, last, bytes(self._postings[offset:offset + length])
+    
+    def _renumbered_terms(self, renumber):
+        for i, key in enumerate(self._keys):
+            buf = bytearray()
+            df = previous = 0
+            for doc, positions in self._iter_postings(i):
+                new_doc = renumber[doc]
+                if new_doc < 0:
+                    continue
+                encode_posting(new_doc - previous, positions, buf)
+                previous = new_doc
+                df += 1
+            if df:
+                yield key, df, previous, bytes(buf)
+    
+    def _doc_lines(self, dropped):
+        for doc in range(len(self)):
+            if doc not in dropped:
+                yield bytes(self._docs[self._doc_offsets[doc]:self._doc_offsets[doc + 1]])
+    
+    def _term_range(self, low, high):
+        """词键在[low, high)内的词在词典中的下标范围"""
+        return bisect.bisect_left(self._keys, low), bisect.bisect_left(self._keys, high)
+    
+    def _iter_postings(self, index):
+        """解码第index个词的倒排表，产生(文书号, 位置列表)"""
+        offset, length, _, _ = TERM_ENTRY.unpack_from(self._terms, index * TERM_ENTRY.size)
+        buf = self._postings
+        pos, end = offset, offset + length
+        doc = 0
+        while pos < end:
+            delta, pos = decode_varint(buf, pos)
+            doc += delta
+            tf, pos = decode_varint(buf, pos)
+            positions = []
+            p = 0
+            for _ in range(tf):
+                step, pos = decode_varint(buf, pos)
+                p += step
+                positions.append(p)
+            yield doc, positions
+    
+    def _slot(self, token, prefix=False):
+        """短语中一个位置的倒排流；prefix为True时合并以该字开头的全部词"""
+        key = term_key(token)
+        first, last = self._term_range(key, key + (1 << 32) if prefix else key + 1)
+        streams = [self._iter_postings(i) for i in range(first, last)]
+        if len(streams) == 1:
+            return streams[0]
+        return self._merge_slot(streams)
+    
+    @staticmethod
+    def _merge_slot(streams):
+        current_doc, positions = None, []
+        for doc, plist in heapq.merge(*streams, key=lambda item: item[0]):
+            if doc != current_doc:
+                if current_doc is not None:
+                    yield current_doc, sorted(positions)
+                current_doc, positions = doc, []
+            positions.extend(plist)
+        if current_doc is not None:
+            yield current_doc, sorted(positions)
+    
+    def _phrase(self, tokens, prefix_last=False):
+        """各词位置依次相邻的文书号流"""
+        slots = [self._slot(token, prefix_last and i == len(tokens) - 1) for i, token in enumerate(tokens)]
+        if len(slots) == 1:
+            for doc, _ in slots[0]:
+                yield doc
+            return
+        try:
+            current = [next(slot) for slot in slots]
+            while True:
+                target = max(item[0] for item in current)
+                for i, slot in enumerate(slots):
+                    while current[i][0] < target:
+                        current[i] = next(slot)
+                if all(item[0] == target for item in current):
+                    starts = set(current[0][1])
+                    for i in range(1, len(slots)):
+                        starts &= {p - i for p in current[i][1]}
+                        if not starts:
+                            break
+                    if starts:
+                        yield target
+                    current[0] = next(slots[0])
+        except StopIteration:
+            return
+    
+    def _term_docs(self, term):
+        """
+        一个查询词（作为短语）命中的文书号流
+        
+        与文书目录相同：开头被标点隔开的单字从短语中去掉并核对原文，末尾的单字按前缀匹配。
+        """
+        runs = split_runs(term)
+        verify = len(runs) > 1 and len(runs[0]) == 1
+        if verify:
+            runs = runs[1:]
+        if not runs:
+            return None
+        tokens = query_tokens(runs)
+        docs = self._phrase(tokens, prefix_last=len(runs[-1]) == 1)
+        if verify:
+            return self._verify(docs, normalize_text(term))
+        return docs
+    
+    def _verify(self, docs, term):
+        """核对原文确实包含term；文件已删除或无法读取时无法确认，不计为命中"""
+        for doc in docs:
+            file_path = self.document(doc)['file_path']
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    if term not in normalize_text(f.read()):
+                        continue
+            except OSError as e:
+                print(f"⚠ 索引中的文书无法读取，已忽略（索引可能已过期）: {file_path} ({e})")
+                continue
+            yield doc
+    
+    def query(self, query):
+        """
+        执行查询，产生升序的文书号
+        
+        语法：空白分隔的词同时命中（AND），OR分隔的各组任一命中，以-开头的词排除；
+        每个词按短语匹配。
+        
+        Args:
+            query (str): 查询
+        """
+        clauses = [([], [])]
+        for word in query.split():
+            if word == 'OR':
+                clauses.append(([], []))
+            elif word.startswith('-') and len(word) > 1:
+                clauses[-1][1].append(word[1:])
+            else:
+                clauses[-1][0].append(word)
+        
+        streams = []
+        for positive, negative in clauses:
+            included = [docs for docs in map(self._term_docs, positive) if docs is not None]
+            if not included:
+                continue
+            docs = included[0] if len(included) == 1 else _intersect(included)
+            excluded = [docs for docs in map(self._term_docs, negative) if docs is not None]
+            if excluded:
+                docs = _difference(docs, _union(excluded))
+            streams.append(docs)
+        if len(streams) == 1:
+            return streams[0]
+        return _union(streams)
+    
+    def search(self, query, limit=20):
+        """
+        检索并返回文书信息
+        
+        Args:
+            query (str): 查询，语法见query()
+            limit (int): 最多返回条数
+        
+        Returns:
+            list: 按文书号（即日期分片顺序）排列的文书信息dict
+        """
+        hits = []
+        for doc in self.query(query):
+            hits.append(self.document(doc))
+            if len(hits) >= limit:
+                break
+        return hits
+    
+    def count(self, query):
+        """命中的文书数"""
+        return sum(1 for _ in self.query(query))
+    
+    def close(self):
+        """释放映射"""
+        for view in (self._keys, self._terms, self._postings, self._docs, self._doc_offsets):
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+
+def main(argv=None):
+    """命令行入口：python -m bigram_index build [目录] / search <查询>"""
+    parser = argparse.ArgumentParser(prog='python -m bigram_index', description='二元组倒排索引')
+    parser.add_argument('--index', default='二元索引', help='索引目录（默认: 二元索引）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='建立索引')
+    build_parser.add_argument('root', nargs='?', default='文书', help='文书根目录（默认: 文书）')
+    build_parser.add_argument('--workers', type=int, default=None, help='进程数（默认: CPU核数）')
+    search_parser = subparsers.add_parser('search', help='检索')
+    search_parser.add_argument('query', help='查询：空格表示同时命中，OR表示任一命中，-词表示排除')
+    search_parser.add_argument('--limit', type=int, default=20, help='最多返回条数（默认: 20）')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    
+    if args.command == 'build':
+        if not os.path.isdir(args.root):
+            print(f"✗ 目录不存在: {args.root}")
+            return False
+        build_index(args.root, args.index, args.workers)
+        return True
+    
+    index = BigramIndex(args.index)
+    try:
+        hits = index.search(args.query, args.limit)
+        print(f"共显示 {len(hits)} 条结果:")
+        for i, hit in enumerate(hits):
+            print(f"{i+1}. [{hit['date']}] {hit['title']}")
+            print(f"   {hit['file_path']}")
+        return True
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 浏览器会话
+功能：整个采集过程只启动一次浏览器，按日期复用上下文并保存Cookie和本地存储；
+只有在内存增长过多、页面或浏览器崩溃、错误过多或需要切换指纹时才重建上下文
+"""
+
+import os
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# 未安装psutil时，退而读取页面的JS堆大小（仅Chromium支持）
+JS_HEAP_USED_JS = "() => performance.memory ? performance.memory.usedJSHeapSize : 0"
+
+
+class BrowserSession:
+    """长期运行的浏览器会话：一个浏览器进程，按需重建的上下文"""
+    
+    def __init__(self, simulator, headless=True, state_path='浏览器状态.json',
+                 max_errors=10, max_memory_growth_mb=800):
+        """
+        初始化会话（不启动浏览器）
+        
+        Args:
+            simulator (WenshuBrowserSimulator): 浏览器模拟器
+            headless (bool): 是否无头模式
+            state_path (str): 上下文的Cookie和本地存储保存位置
+            max_errors (int): 同一上下文内允许的错误次数，超过后重建上下文
+            max_memory_growth_mb (int): 内存比上下文创建时增长超过该值（MB）后重建上下文
+        """
+        self.simulator = simulator
+        self.headless = headless
+        self.state_path = state_path
+        self.max_errors = max_errors
+        self.max_memory_growth_mb = max_memory_growth_mb
+        self.errors = 0
+        self.baseline_mb = None
+        self.recycle_reason = None
+        self.fresh_context = False
+        self.context_count = 0
+    
+    def start(self):
+        """
+        启动浏览器并创建第一个上下文
+        
+        Returns:
+            bool: 是否启动成功
+        """
+        # 新进程的指纹是重新随机的，上次运行保存的状态不再沿用
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        print("启动浏览器...")
+        if not self.simulator.start_browser(headless=self.headless):
+            return False
+        self._context_created()
+        return True
+    
+    def memory_usage_mb(self):
+        """
+        浏览器占用的内存（MB）
+        
+        安装psutil时统计本进程全部子进程（playwright驱动和浏览器各进程）的RSS，
+        否则读取当前页面的JS堆大小；都无法获取时返回None。
+        """
+        if psutil is not None:
+            total = 0
+            for child in psutil.Process().children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+            return total / 1024 / 1024
+        try:
+            used = self.simulator.page.evaluate(JS_HEAP_USED_JS)
+        except Exception:
+            return None
+        return used / 1024 / 1024 if used else None
+    
+    def record_error(self):
+        """记录一次错误，超出错误预算时标记重建上下文"""
+        self.errors += 1
+        if self.errors >= self.max_errors and self.recycle_reason is None:
+            self.recycle_reason = f"错误次数达到 {self.errors}"
+    
+    def check_health(self):
+        """
+        检查浏览器和页面是否可用、内存是否增长过多、是否需要切换指纹
+        
+        Returns:
+            str: 需要重建时的原因，健康时返回None
+        """
+        simulator = self.simulator
+        if simulator.browser is None or not simulator.browser.is_connected():
+            return "浏览器进程已退出"
+        if simulator.page is None or simulator.page.is_closed() or simulator.page_crashed:
+            return "页面崩溃或已关闭"
+        try:
+            simulator.page.evaluate("() => 1")
+        except Exception:
+            return "页面无响应"
+        if self.recycle_reason:
+            return self.recycle_reason
+        if simulator.fingerprint_due():
+            return "到了切换指纹的时间"
+        if self.baseline_mb is not None:
+            current = self.memory_usage_mb()
+            if current is not None and current - self.baseline_mb > self.max_memory_growth_mb:
+                return f"内存从 {self.baseline_mb:.0f}MB 增长到 {current:.0f}MB"
+        return None
+    
+    def prepare_date(self):
+        """
+        为处理新日期做准备：必要时重建上下文，然后打开首页
+        
+        新建且没有保存状态的上下文先访问一次首页并设置Cookie；
+        复用的上下文或从保存状态恢复的上下文直接打开首页。
+        
+        Returns:
+            bool: 是否可以开始处理该日期
+        """
+        reason = self.check_health()
+        if reason:
+            print(f"⚠ 重建浏览器上下文：{reason}")
+            if not self.recycle():
+                return False
+        
+        if self.fresh_context:
+            if not self.simulator.setup_cookies():
+                print("✗ Cookie设置失败")
+                self.record_error()
+                return False
+            self.fresh_context = False
+        
+        if not self.simulator.open_page():
+            self.record_error()
+            return False
+        return True
+    
+    def recycle(self):
+        """
+        关闭当前上下文并新建一个，浏览器进程退出时重新启动
+        
+        切换指纹时丢弃保存的状态，新指纹从空白状态开始；其余情况恢复上一个上下文的Cookie和本地存储。
+        
+        Returns:
+            bool: 是否重建成功
+        """
+        simulator = self.simulator
+        rotate = simulator.fingerprint_due()
+        if rotate and os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        
+        simulator.close_context()
+        if simulator.browser is None or not simulator.browser.is_connected():
+            simulator.browser = None
+            if not simulator.launch_browser(headless=self.headless):
+                return False
+        
+        storage_state = self.state_path if os.path.exists(self.state_path) else None
+        if not simulator.new_context(storage_state=storage_state):
+            return False
+        self._context_created(restored=storage_state is not None)
+        return True
+    
+    def _context_created(self, restored=False):
+        self.context_count += 1
+        self.errors = 0
+        self.recycle_reason = None
+        self.fresh_context = not restored
+        self.baseline_mb = self.memory_usage_mb()
+    
+    def finish_date(self, success=True):
+        """
+        一个日期处理结束：记录结果并保存上下文状态，供之后重建时恢复
+        
+        Args:
+            success (bool): 该日期是否处理成功
+        """
+        if not success:
+            self.record_error()
+        if self.simulator.context is not None and not self.simulator.page_crashed:
+            self.simulator.save_storage_state(self.state_path)
+    
+    def close(self):
+        """关闭浏览器"""
+        self.simulator.close_browser()
+        print(f"✓ 浏览器会话结束，共使用 {self.context_count} 个上下文")
@@ -12,16 +12,34 @@ from playwright.async_api import async_playwright
 from playwright.sync_api import sync_playwright
 import json
 import datetime
+from link_record import LinkRecord, LinkSet
+from route_policy import RoutePolicy, page_kind_of
+from selector_cache import SelectorCache
+from latency_tracker import LatencyTracker
+from page_readiness import READY_CONDITIONS, RESULTS_SIGNATURE_JS, RESULTS_CHANGED_JS
 
 class WenshuBrowserSimulator:
     """裁判文书网浏览器模拟器 - 使用Playwright"""
     
-    def __init__(self):
-        """初始化浏览器模拟器"""
+    # 在页面内一次性取出链接的原始href属性和textContent（与get_attribute、text_content一致）
+    LINK_PAIRS_JS = "els => els.map(a => [a.getAttribute('href'), a.textContent])"
+    
+    def __init__(self, route_policy=None):
+        """
+        初始化浏览器模拟器
+        
+        Args:
+            route_policy (RoutePolicy): 请求路由策略，默认拦截图片、字体和媒体
+        """
         self.base_url = "https://wenshu.court.gov.cn/website/wenshu/181029CR4M5A62CH/index.html?"
         self.playwright = None
         self.browser = None
+        self.context = None
         self.page = None
+        self.page_crashed = False
+        self.route_policy = route_policy or RoutePolicy()
+        self.selector_cache = SelectorCache()  # 各步骤上次命中的选择器，下次优先尝试
+        self.latency = LatencyTracker()  # 按操作类型统计耗时，推算超时
         self.cookies = self.parse_cookies()
         self.last_fingerprint_change = datetime.datetime.now()
         self.fingerprint_days = random.randint(1, 3)  # 1~3天切换一次指纹
@@ -77,10 +95,99 @@ class WenshuBrowserSimulator:
         except Exception as e:
             print(f"模拟人类行为时出错: {str(e)}")
     
+    def goto(self, url, wait_until='load', timeout=30000):
+        """
+        访问页面，超时按该类页面的历史耗时推算（样本不足时使用timeout）
+        
+        Returns:
+            Response: playwright响应
+        """
+        return self.latency.run(
+            f'goto:{page_kind_of(url)}:{wait_until}', timeout,
+            lambda t: self.page.goto(url, wait_until=wait_until, timeout=t)
+        )
+    
+    def wait_for_load_state(self, state='load', timeout=30000):
+        """等待页面达到加载状态，超时按历史耗时推算（样本不足时使用timeout）"""
+        return self.latency.run(
+            f'load_state:{page_kind_of(self.page.url)}:{state}', timeout,
+            lambda t: self.page.wait_for_load_state(state, timeout=t)
+        )
+    
+    def wait_for_selector(self, selector, timeout=30000):
+        """
+        等待元素出现，超时按历史耗时推算（样本不足时使用timeout）
+        
+        元素不存在时的超时不计入统计，否则找不到元素的情况会把超时越推越长。
+        """
+        return self.latency.run(
+            f'selector:{page_kind_of(self.page.url)}', timeout,
+            lambda t: self.page.wait_for_selector(selector, timeout=t),
+            record_timeouts=False
+        )
+    
+    def wait_until_ready(self, condition, timeout=30000):
+        """
+        等待页面满足某个就绪条件（见page_readiness.READY_CONDITIONS），超时后退回等待网络空闲
+        
+        Returns:
+            bool: 是否满足了就绪条件，退回等待网络空闲时为False
+        """
+        try:
+            self.latency.run(
+                f'ready:{condition}', timeout,
+                lambda t: self.page.wait_for_function(READY_CONDITIONS[condition], timeout=t),
+                record_timeouts=False
+            )
+            return True
+        except Exception:
+            print(f"⚠ 页面未满足就绪条件 {condition}，改为等待网络空闲")
+            self.wait_for_load_state('networkidle', timeout=timeout)
+            return False
+    
+    def results_signature(self):
+        """当前结果列表的签名（链接数量和第一条链接），用于判断列表是否已重新渲染"""
+        try:
+            return self.page.evaluate(RESULTS_SIGNATURE_JS)
+        except Exception:
+            return ''
+    
+    def wait_for_results_change(self, before, timeout=15000):
+        """
+        等待结果列表在翻页、筛选后重新渲染，超时后退回等待网络空闲
+        
+        Args:
+            before (str): 操作前的results_signature()
+        
+        Returns:
+            bool: 列表是否已变化
+        """
+        try:
+            self.latency.run(
+                'ready:results_changed', timeout,
+                lambda t: self.page.wait_for_function(RESULTS_CHANGED_JS, arg=before, timeout=t),
+                record_timeouts=False
+            )
+            return True
+        except Exception:
+            print("⚠ 结果列表未发生变化，改为等待网络空闲")
+            self.wait_for_load_state('networkidle', timeout=timeout)
+            return False
+    
+    def wait_for_stable_results(self, interval=0.5, max_checks=10):
+        """结果列表出现后，等到连续两次读取的签名相同（列表不再增长）"""
+        last = self.results_signature()
+        for _ in range(max_checks):
+            time.sleep(interval)
+            current = self.results_signature()
+            if current == last:
+                return
+            last = current
+    
     def safe_click(self, selector, timeout=30000):
         """安全点击，包含人类行为模拟"""
         try:
-            element = self.page.wait_for_selector(selector, timeout=timeout)
+            element = self.wait_for_selector(selector, timeout=timeout)
             if element:
                 # 模拟真实用户行为
                 element.scroll_into_view_if_needed()
@@ -106,7 +213,7 @@ class WenshuBrowserSimulator:
     def safe_fill(self, selector, text, timeout=30000):
         """安全填充文本，模拟真实打字"""
         try:
-            element = self.page.wait_for_selector(selector, timeout=timeout)
+            element = self.wait_for_selector(selector, timeout=timeout)
             if element:
                 element.scroll_into_view_if_needed()
                 time.sleep(random.uniform(0.3, 0.8))
@@ -163,7 +270,7 @@ class WenshuBrowserSimulator:
     def update_fingerprint(self):
         """每隔1~3天自动切换指纹"""
         now = datetime.datetime.now()
-        if (now - self.last_fingerprint_change).days >= self.fingerprint_days:
+        if self.fingerprint_due():
             self.current_ua = random.choice(self.ua_pool)
             self.current_viewport = random.choice(self.viewport_pool)
             self.current_langs = random.choice(self.langs_pool)
@@ -247,13 +354,27 @@ class WenshuBrowserSimulator:
         return False
 
     def start_browser(self, headless=False):
+        """启动浏览器并创建带反检测设置的页面"""
         self.night_pause()
-        self.update_fingerprint()
         print("\n正在启动浏览器...")
+        if not self.launch_browser(headless):
+            return False
+        return self.new_context()
+    
+    def launch_browser(self, headless=False):
+        """
+        启动浏览器进程（不创建页面），浏览器已在运行时直接返回
+        
+        Returns:
+            bool: 是否启动成功
+        """
+        if self.browser is not None and self.browser.is_connected():
+            return True
         
         try:
-            # 启动playwright
-            self.playwright = sync_playwright().start()
+            # 启动playwright（浏览器崩溃后重新启动时沿用已有的playwright实例）
+            if self.playwright is None:
+                self.playwright = sync_playwright().start()
             
             # 更强的反检测参数
             self.browser = self.playwright.chromium.launch(
@@ -285,33 +406,37 @@ class WenshuBrowserSimulator:
                 ]
             )
             
-            # 随机选择用户代理和分辨率
-            import random
-            
-            user_agents = [
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36 Edg/132.0.0.0',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0'
-            ]
-            
-            viewports = [
-                {'width': 1920, 'height': 1080},
-                {'width': 1366, 'height': 768},
-                {'width': 1536, 'height': 864},
-                {'width': 1440, 'height': 900},
-                {'width': 1600, 'height': 900}
-            ]
-            
-            selected_ua = random.choice(user_agents)
-            selected_viewport = random.choice(viewports)
+            print("✓ 浏览器启动成功")
+            return True
             
-            # 创建新页面
-            self.page = self.browser.new_page(
+        except Exception as e:
+            print(f"✗ 浏览器启动失败: {str(e)}")
+            return False
+    
+    def new_context(self, storage_state=None):
+        """
+        在已启动的浏览器中创建新的上下文和页面，按当前指纹设置UA、分辨率和反检测脚本
+        
+        Args:
+            storage_state (str): 上一个上下文保存的Cookie和本地存储文件，为None时从空白状态开始
+        
+        Returns:
+            bool: 是否创建成功
+        """
+        self.close_context()
+        self.update_fingerprint()
+        
+        try:
+            self.context = self.browser.new_context(
                 user_agent=self.current_ua,
-                viewport=self.current_viewport
+                viewport=self.current_viewport,
+                storage_state=storage_state
             )
+            # 只需要DOM文本，拦截与正文无关的资源
+            self.route_policy.attach(self.context)
+            self.page = self.context.new_page()
+            self.page_crashed = False
+            self.page.on('crash', self._on_page_crash)
             
             # 更强的反检测脚本
             self.page.add_init_script("""
@@ -409,13 +534,46 @@ class WenshuBrowserSimulator:
                 'Referer': 'https://cn.bing.com/'
             })
             
-            print("✓ 浏览器启动成功")
+            print("✓ 浏览器页面创建成功")
             return True
             
         except Exception as e:
-            print(f"✗ 浏览器启动失败: {str(e)}")
+            print(f"✗ 浏览器页面创建失败: {str(e)}")
             return False
     
+    def _on_page_crash(self, page):
+        print("⚠ 浏览器页面崩溃")
+        self.page_crashed = True
+    
+    def fingerprint_due(self):
+        """检查是否到了切换指纹的时间（新指纹在创建下一个上下文时生效）"""
+        now = datetime.datetime.now()
+        return (now - self.last_fingerprint_change).days >= self.fingerprint_days
+    
+    def save_storage_state(self, path):
+        """
+        保存当前上下文的Cookie和本地存储，供下一个上下文恢复
+        
+        Returns:
+            bool: 是否保存成功
+        """
+        try:
+            self.context.storage_state(path=path)
+            return True
+        except Exception as e:
+            print(f"⚠ 保存浏览器状态失败: {str(e)}")
+            return False
+    
+    def close_context(self):
+        """关闭当前上下文和页面，浏览器进程保持运行"""
+        try:
+            if self.context:
+                self.context.close()
+        except Exception as e:
+            print(f"⚠ 关闭浏览器上下文时出错: {str(e)}")
+        self.context = None
+        self.page = None
+    
     def setup_cookies(self):
         """设置身份令牌Cookie"""
         try:
@@ -423,15 +581,15 @@ class WenshuBrowserSimulator:
             
             # 先访问一次主页面以建立域名上下文
             print("首次访问页面以建立域名上下文...")
-            response = self.page.goto(
+            response = self.goto(
                 self.base_url,
                 wait_until='domcontentloaded',
                 timeout=30000
             )
             print(f"初次访问响应状态: {response.status}")
             
-            # 等待页面完全加载
-            self.page.wait_for_load_state('networkidle')
+            # 等待首页渲染完成
+            self.wait_until_ready('home')
             
             # 获取当前页面的cookies（如果有的话）
             existing_cookies = self.page.context.cookies()
@@ -465,15 +623,15 @@ class WenshuBrowserSimulator:
             if reload:
                 # 刷新页面以验证Cookie效果
                 print("刷新页面以验证Cookie效果...")
-                response = self.page.goto(
+                response = self.goto(
                     self.base_url,
-                    wait_until='networkidle',  # 等待网络空闲
+                    wait_until='domcontentloaded',
                     timeout=30000  # 30秒超时
                 )
                 print(f"✓ 页面响应状态: {response.status}")
             
-            # 等待页面加载完成
-            self.page.wait_for_load_state('domcontentloaded')
+            # 等待首页渲染完成
+            self.wait_until_ready('home')
             
             # 模拟真实用户行为
             self.random_sleep(3, 6)
@@ -573,7 +731,7 @@ class WenshuBrowserSimulator:
             print("正在检查页面中的登录状态指示器...")
             
             # 等待页面完全加载
-            self.page.wait_for_load_state('networkidle')
+            self.wait_for_load_state('networkidle')
             
             # 检查页面中是否有登录状态的JavaScript变量
             login_status = self.page.evaluate("""
@@ -672,7 +830,7 @@ class WenshuBrowserSimulator:
                     print("\n尝试点击登录按钮...")
                     try:
                         login_elements[0].click()
-                        self.page.wait_for_load_state('networkidle', timeout=10000)
+                        self.wait_for_load_state('networkidle', timeout=10000)
                         
                         # 检查是否跳转到登录页面
                         current_url = self.page.url
@@ -773,8 +931,8 @@ class WenshuBrowserSimulator:
         print("\n正在查找高级检索...")
         
         try:
-            # 等待页面完全加载
-            self.page.wait_for_load_state('networkidle')
+            # 等待高级检索入口渲染
+            self.wait_until_ready('home')
             
             # 尝试多种选择器查找高级检索
             selectors = [
@@ -786,27 +944,15 @@ class WenshuBrowserSimulator:
                 'button[class*="advanced"]',
                 'span:has-text("高级检索")',
                 'a:has-text("高级检索")',
-                'div:has-text("高级检索")'
+                'div:has-text("高级检索")',
+                # 最后通过文本内容查找
+                'xpath=//div[contains(text(), "高级检索")] | //a[contains(text(), "高级检索")] | //span[contains(text(), "高级检索")]'
             ]
             
-            advanced_element = None
-            for selector in selectors:
-                try:
-                    element = self.page.query_selector(selector)
-                    if element:
-                        advanced_element = element
-                        print(f"✓ 找到高级检索元素，选择器: {selector}")
-                        break
-                except Exception as e:
-                    continue
-            
-            if not advanced_element:
-                print("⚠ 未找到高级检索元素，尝试通过文本查找...")
-                # 尝试通过文本内容查找
-                advanced_element = self.page.query_selector('xpath=//div[contains(text(), "高级检索")] | //a[contains(text(), "高级检索")] | //span[contains(text(), "高级检索")]')
+            advanced_element, selector = self.selector_cache.find('advanced_search', selectors, self.page.query_selector)
                 
             if advanced_element:
-                print("✓ 成功找到高级检索元素")
+                print(f"✓ 成功找到高级检索元素，选择器: {selector}")
                 return advanced_element
             else:
                 print("✗ 未找到高级检索元素")
@@ -844,8 +990,8 @@ class WenshuBrowserSimulator:
             # 随机等待
             self.random_sleep(3, 6)
             
-            # 等待页面响应
-            self.page.wait_for_load_state('networkidle', timeout=15000)
+            # 等待高级检索表单展开
+            self.wait_until_ready('advanced_form', timeout=15000)
             
             print("✓ 成功点击高级检索")
             
@@ -871,8 +1017,8 @@ class WenshuBrowserSimulator:
             self.simulate_human_behavior()
             self.random_sleep(2, 4)
             
-            # 等待页面加载
-            self.page.wait_for_load_state('networkidle')
+            # 等待高级检索表单
+            self.wait_until_ready('advanced_form')
             
             # 查找日期输入框
             start_date_input = self.page.query_selector('#cprqStart')
@@ -947,19 +1093,16 @@ class WenshuBrowserSimulator:
         print("\n正在点击检索按钮...")
         
         try:
-            # 查找检索按钮
-            search_button = self.page.query_selector('#searchBtn')
-            
-            if not search_button:
-                print("⚠ 未找到检索按钮，尝试其他选择器...")
-                search_button = self.page.query_selector('a[id="searchBtn"]')
-            
-            if not search_button:
-                # 尝试通过文本查找
-                search_button = self.page.query_selector('xpath=//a[contains(text(), "检索")] | //button[contains(text(), "检索")]')
+            # 查找检索按钮，最后尝试通过文本查找
+            selectors = [
+                '#searchBtn',
+                'a[id="searchBtn"]',
+                'xpath=//a[contains(text(), "检索")] | //button[contains(text(), "检索")]'
+            ]
+            search_button, selector = self.selector_cache.find('search_button', selectors, self.page.query_selector)
             
             if search_button:
-                print("✓ 找到检索按钮")
+                print(f"✓ 找到检索按钮，选择器: {selector}")
                 
                 # 滚动到按钮位置
                 search_button.scroll_into_view_if_needed()
@@ -970,7 +1113,7 @@ class WenshuBrowserSimulator:
                 
                 # 等待搜索结果加载
                 print("正在等待搜索结果加载...")
-                self.page.wait_for_load_state('networkidle', timeout=30000)
+                self.wait_until_ready('results', timeout=30000)
                 
                 # 截图保存搜索结果
                 self.page.screenshot(path='search_results.png')
@@ -1036,8 +1179,8 @@ class WenshuBrowserSimulator:
         print("\n正在选择地域：上海市...")
         
         try:
-            # 等待页面加载
-            self.page.wait_for_load_state('networkidle')
+            # 等待检索结果渲染
+            self.wait_until_ready('results')
             
             # 查找地域及法院列表
             region_selectors = [
@@ -1048,41 +1191,26 @@ class WenshuBrowserSimulator:
                 'div:has-text("上海市")'
             ]
             
-            # 查找上海市选项
-            shanghai_element = None
-            for selector in region_selectors:
-                try:
-                    # 查找包含上海市的元素
-                    elements = self.page.query_selector_all(f'{selector} >> text="上海市"')
-                    if elements:
-                        shanghai_element = elements[0]
-                        print(f"✓ 找到上海市选项，选择器: {selector}")
-                        break
-                except:
-                    continue
-            
-            if not shanghai_element:
-                # 尝试直接查找上海市
-                shanghai_element = self.page.query_selector('text="上海市"')
-                if shanghai_element:
-                    print("✓ 直接找到上海市选项")
-            
-            if not shanghai_element:
-                # 尝试通过xpath查找
-                shanghai_element = self.page.query_selector('xpath=//div[contains(text(), "上海市")] | //a[contains(text(), "上海市")] | //span[contains(text(), "上海市")]')
-                if shanghai_element:
-                    print("✓ 通过xpath找到上海市选项")
+            # 查找上海市选项：先在各列表中查找，再直接查找，最后通过xpath查找
+            selectors = [f'{selector} >> text="上海市"' for selector in region_selectors] + [
+                'text="上海市"',
+                'xpath=//div[contains(text(), "上海市")] | //a[contains(text(), "上海市")] | //span[contains(text(), "上海市")]'
+            ]
+            shanghai_element, selector = self.selector_cache.find('region_shanghai', selectors, self.page.query_selector)
             
             if shanghai_element:
+                print(f"✓ 找到上海市选项，选择器: {selector}")
+                
                 # 滚动到元素位置
                 shanghai_element.scroll_into_view_if_needed()
                 
                 # 点击上海市
+                before = self.results_signature()
                 shanghai_element.click()
                 print("✓ 成功选择上海市")
                 
-                # 等待页面更新
-                self.page.wait_for_load_state('networkidle', timeout=10000)
+                # 等待结果列表按地域重新渲染
+                self.wait_for_results_change(before, timeout=10000)
                 
                 # 截图保存
                 self.page.screenshot(path='shanghai_selected.png')
@@ -1114,28 +1242,26 @@ class WenshuBrowserSimulator:
         print("\n正在设置每页显示15条...")
         
         try:
-            # 等待页面加载
-            self.page.wait_for_load_state('networkidle')
+            # 等待分页控件渲染
+            self.wait_until_ready('pager')
             
             # 查找页面大小选择下拉框
-            page_size_select = self.page.query_selector('select.pageSizeSelect')
-            
-            if not page_size_select:
-                print("⚠ 未找到页面大小选择框，尝试其他选择器...")
-                page_size_select = self.page.query_selector('select[class*="pageSize"]')
+            selectors = ['select.pageSizeSelect', 'select[class*="pageSize"]']
+            page_size_select, selector = self.selector_cache.find('page_size', selectors, self.page.query_selector)
             
             if page_size_select:
-                print("✓ 找到页面大小选择框")
+                print(f"✓ 找到页面大小选择框，选择器: {selector}")
                 
                 # 滚动到元素位置
                 page_size_select.scroll_into_view_if_needed()
                 
                 # 选择15条
+                before = self.results_signature()
                 page_size_select.select_option('15')
                 print("✓ 设置每页显示15条")
                 
-                # 等待页面更新
-                self.page.wait_for_load_state('networkidle', timeout=10000)
+                # 等待结果列表按新的页面大小重新渲染
+                self.wait_for_results_change(before, timeout=10000)
                 
                 # 截图保存
                 self.page.screenshot(path='pagesize_15_set.png')
@@ -1162,59 +1288,56 @@ class WenshuBrowserSimulator:
             print(f"✗ 设置页面大小失败: {str(e)}")
             return False
     
-    def extract_document_links(self):
-        """提取当前页面的文书链接"""
+    def extract_document_links(self, page_number=0):
+        """
+        提取当前页面的文书链接
+        
+        Args:
+            page_number (int): 当前结果页页码，记入LinkRecord
+            
+        Returns:
+            list: LinkRecord列表
+        """
         print("\n正在提取当前页面的文书链接...")
         
         try:
-            # 等待页面加载
-            self.page.wait_for_load_state('networkidle')
-            
-            # 查找所有h4标签下的a链接
-            h4_links = self.page.query_selector_all('h4 a.caseName')
-            
-            if not h4_links:
-                print("⚠ 未找到caseName类的链接，尝试其他选择器...")
-                h4_links = self.page.query_selector_all('h4 a[href*="docId"]')
-            
-            if not h4_links:
-                print("⚠ 未找到docId链接，尝试h4下的所有链接...")
-                h4_links = self.page.query_selector_all('h4 a')
+            # 等待链接列表填充且不再增长
+            if self.wait_until_ready('results'):
+                self.wait_for_stable_results()
+            
+            # 一次往返取回所有(href, 标题)，避免逐个链接调用get_attribute和text_content；
+            # 依次尝试caseName类的链接、docId链接、h4下的所有链接
+            pairs, _ = self.selector_cache.find(
+                'document_links',
+                ['h4 a.caseName', 'h4 a[href*="docId"]', 'h4 a'],
+                lambda selector: self.page.eval_on_selector_all(selector, self.LINK_PAIRS_JS)
+            )
             
-            if h4_links:
-                print(f"✓ 找到 {len(h4_links)} 个文书链接")
+            if pairs:
+                print(f"✓ 找到 {len(pairs)} 个文书链接")
                 
                 links = []
-                for i, link in enumerate(h4_links):
-                    try:
-                        href = link.get_attribute('href')
-                        title = link.text_content().strip()
+                for i, (href, title) in enumerate(pairs):
+                    if href:
+                        # 将../替换为完整URL
+                        if href.startswith('../'):
+                            full_url = href.replace('../', 'https://wenshu.court.gov.cn/website/wenshu/')
+                        else:
+                            full_url = href
+                        title = (title or '').strip()
                         
-                        if href:
-                            # 将../替换为完整URL
-                            if href.startswith('../'):
-                                full_url = href.replace('../', 'https://wenshu.court.gov.cn/website/wenshu/')
-                            else:
-                                full_url = href
-                            
-                            links.append({
-                                'url': full_url,
-                                'title': title
-                            })
-                            
-                            print(f"  {i+1}. {title[:50]}...")
-                            
-                    except Exception as e:
-                        print(f"  ✗ 提取第{i+1}个链接失败: {str(e)}")
+                        links.append(LinkRecord.from_url(full_url, title, page_number, i + 1))
+                        
+                        print(f"  {i+1}. {title[:50]}...")
                 
                 return links
             else:
                 print("✗ 未找到文书链接")
                 
                 # 查找所有可能的链接
-                all_links = self.page.query_selector_all('a[href*="docId"]')
-                if all_links:
-                    print(f"找到 {len(all_links)} 个包含docId的链接")
+                docid_count = self.page.eval_on_selector_all('a[href*="docId"]', 'els => els.length')
+                if docid_count:
+                    print(f"找到 {docid_count} 个包含docId的链接")
                 else:
                     print("未找到任何包含docId的链接")
                 
@@ -1229,19 +1352,16 @@ class WenshuBrowserSimulator:
         print("\n正在点击下一页...")
         
         try:
-            # 等待页面加载
-            self.page.wait_for_load_state('networkidle')
-            
-            # 查找下一页按钮
-            next_button = self.page.query_selector('a.pageButton:has-text("下一页")')
-            
-            if not next_button:
-                print("⚠ 未找到下一页按钮，尝试其他选择器...")
-                next_button = self.page.query_selector('a[class*="pageButton"]:has-text("下一页")')
+            # 等待分页控件渲染
+            self.wait_until_ready('pager')
             
-            if not next_button:
-                # 通过文本查找
-                next_button = self.page.query_selector('xpath=//a[contains(text(), "下一页")]')
+            # 查找下一页按钮，最后通过文本查找
+            selectors = [
+                'a.pageButton:has-text("下一页")',
+                'a[class*="pageButton"]:has-text("下一页")',
+                'xpath=//a[contains(text(), "下一页")]'
+            ]
+            next_button, _ = self.selector_cache.find('next_page', selectors, self.page.query_selector)
             
             if next_button:
                 # 检查按钮是否可点击（非禁用状态）
@@ -1254,11 +1374,12 @@ class WenshuBrowserSimulator:
                 next_button.scroll_into_view_if_needed()
                 
                 # 点击下一页
+                before = self.results_signature()
                 next_button.click()
                 print("✓ 成功点击下一页")
                 
-                # 等待页面更新
-                self.page.wait_for_load_state('networkidle', timeout=15000)
+                # 等待下一页的结果列表渲染
+                self.wait_for_results_change(before, timeout=15000)
                 
                 return True
             else:
@@ -1295,8 +1416,8 @@ class WenshuBrowserSimulator:
                 f.write(f"# 总共收集到 {len(all_links)} 个文书链接\n\n")
                 
                 for i, link in enumerate(all_links):
-                    f.write(f"{i+1}. {link['title']}\n")
-                    f.write(f"   URL: {link['url']}\n\n")
+                    f.write(f"{i+1}. {link.title}\n")
+                    f.write(f"   URL: {link.url}\n\n")
             
             print(f"✓ 成功保存 {len(all_links)} 个链接到文件: {filename}")
             return filename
@@ -1311,7 +1432,7 @@ class WenshuBrowserSimulator:
         print(f"开始收集 {date_str} 上海市的文书链接")
         print("=" * 60)
         
-        all_links = []
+        all_links = LinkSet()
         current_page = 1
         
         try:
@@ -1328,11 +1449,11 @@ class WenshuBrowserSimulator:
                 print(f"\n--- 第 {current_page} 页 ---")
                 
                 # 提取当前页面的链接
-                page_links = self.extract_document_links()
+                page_links = self.extract_document_links(current_page)
                 
                 if page_links:
-                    all_links.extend(page_links)
-                    print(f"✓ 第 {current_page} 页收集到 {len(page_links)} 个链接")
+                    new_links = all_links.update(page_links)
+                    print(f"✓ 第 {current_page} 页收集到 {len(page_links)} 个链接，去重后新增 {len(new_links)} 个")
                 else:
                     print(f"⚠ 第 {current_page} 页未收集到链接")
                 
@@ -1356,14 +1477,14 @@ class WenshuBrowserSimulator:
                 print(f"✓ 已保存到文件: {filename}")
                 print("=" * 60)
                 
-                return all_links, filename
+                return list(all_links), filename
             else:
                 print("✗ 未收集到任何链接")
                 return [], None
                 
         except Exception as e:
             print(f"✗ 收集文书链接失败: {str(e)}")
-            return all_links, None
+            return list(all_links), None
     
     def get_page_info(self):
         """获取页面信息"""
@@ -1386,13 +1507,15 @@ class WenshuBrowserSimulator:
     
     def close_browser(self):
         """关闭浏览器"""
+        self.latency.save()
+        self.close_context()
         try:
-            if self.page:
-                self.page.close()
             if self.browser:
                 self.browser.close()
             if self.playwright:
                 self.playwright.stop()
+            self.browser = None
+            self.playwright = None
             print("✓ 浏览器已关闭")
         except Exception as e:
             print(f"⚠ 关闭浏览器时出错: {str(e)}")
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 案号解析与区间索引
+功能：把案号（如（2023）沪02行初163号）解析为年份、法院代字、案件类型代字、审级和顺序号，
+并按(法院, 类型, 年份, 顺序号)建立排序的列式索引，区间查询和相邻案号查询都用二分查找
+
+索引目录结构：
+    keys.bin    已排序的uint64数组，每个键依次为 法院编号16位、类型编号12位、年份12位、顺序号24位
+    dicts.json  法院代字和类型代字的字典（按字符串排序，编号顺序即字符串顺序）
+    docs.dat    与键一一对应的文书信息，每行"案号\tdocId\t日期\t文件路径"
+    docs.idx    docs.dat中每行的偏移（uint64数组，末尾多一项为文件长度）
+"""
+
+import os
+import re
+import sys
+import mmap
+import json
+import bisect
+import shutil
+import argparse
+import unicodedata
+from array import array
+from typing import NamedTuple
+
+from doc_id import extract_doc_id
+from document_catalog import parse_document_text
+
+# NFKC后全角括号变为半角；最高人民法院的代字为"最高法"，其余法院为一个省级简称加数字代码
+CASE_NUMBER_PATTERN = re.compile(
+    r'[(〔\[]\s*(\d{4})\s*[)〕\]]\s*'
+    r'(最高法|[\u4e00-\u9fff])(\d{0,4})'
+    r'([\u4e00-\u9fff]{1,6}?)'
+    r'(\d+)\s*号(?:之([\u4e00-\u9fff\d]+))?'
+)
+
+# 类型代字的最后一个字表示审级或程序
+LEVEL_NAMES = {
+    '初': '一审',
+    '终': '二审',
+    '再': '再审',
+    '申': '申请再审审查',
+    '监': '审判监督',
+    '抗': '抗诉',
+    '复': '复议',
+    '异': '异议',
+    '恢': '恢复执行',
+}
+
+# 键的各字段：(位移, 位数)，依次为法院、类型、年份、顺序号
+KEY_FIELDS = ((48, 16), (36, 12), (24, 12), (0, 24))
+MAX_SEQUENCE = (1 << 24) - 1
+
+
+class CaseNumber(NamedTuple):
+    """解析后的案号"""
+    year: int
+    court: str       # 法院代字，如'沪02'、'最高法'
+    case_type: str   # 类型代字，如'行初'、'民终'、'执复'
+    sequence: int
+    suffix: str = ''  # "之一"等后缀
+    
+    @property
+    def province(self):
+        """省级简称，最高人民法院为'最高法'"""
+        return self.court if self.court.startswith('最高法') else self.court[:1]
+    
+    @property
+    def level(self):
+        """审级或程序，如'一审'；无法判断时为空字符串"""
+        return LEVEL_NAMES.get(self.case_type[-1], '')
+    
+    def __str__(self):
+        text = f"（{self.year}）{self.court}{self.case_type}{self.sequence}号"
+        return text + (f"之{self.suffix}" if self.suffix else '')
+
+
+def parse_case_number(text):
+    """
+    从文本中解析第一个案号
+    
+    Args:
+        text (str): 案号或含有案号的文本
+    
+    Returns:
+        CaseNumber: 解析结果，没有案号时为None
+    """
+    if not text:
+        return None
+    match = CASE_NUMBER_PATTERN.search(unicodedata.normalize('NFKC', text))
+    if not match:
+        return None
+    year, province, code, case_type, sequence, suffix = match.groups()
+    return CaseNumber(int(year), province + code, case_type, int(sequence), suffix or '')
+
+
+def _pack_key(court_id, type_id, year, sequence):
+    return (court_id << 48) | (type_id << 36) | (year << 24) | sequence
+
+
+def _map_array(path):
+    """只读映射uint64数组文件，空文件返回空数组"""
+    if os.path.getsize(path) == 0:
+        return None, memoryview(b'').cast('Q')
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mapped, memoryview(mapped).cast('Q')
+
+
+def _read_header(file_path, size=4096):
+    """只读取文书开头的元数据部分"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return parse_document_text(f.read(size))
+
+
+def build_index(root='文书', output_dir='案号索引'):
+    """
+    扫描文书目录，为有案号的文书建立案号索引（先写入临时目录再替换）
+    
+    Args:
+        root (str): 文书根目录
+        output_dir (str): 索引目录
+    
+    Returns:
+        int: 索引的文书数
+    """
+    records = []
+    skipped = 0
+    for dirpath, _, filenames in os.walk(root):
+        date_str = os.path.basename(dirpath)
+        for filename in sorted(filenames):
+            if not filename.endswith('.txt'):
+                continue
+            file_path = os.path.join(dirpath, filename)
+            try:
+                document = _read_header(file_path)
+            except (OSError, UnicodeDecodeError):
+                skipped += 1
+                continue
+            parsed = parse_case_number(document['case_number'])
+            if parsed is None or parsed.sequence > MAX_SEQUENCE or parsed.year >= 1 << 12:
+                skipped += 1
+                continue
+            doc_id = extract_doc_id(document['url']) if document['url'] else 'file-' + file_path
+            records.append((parsed, doc_id, date_str, file_path))
+    
+    courts = sorted({parsed.court for parsed, _, _, _ in records})
+    case_types = sorted({parsed.case_type for parsed, _, _, _ in records})
+    if len(courts) >= 1 << 16 or len(case_types) >= 1 << 12:
+        raise ValueError(f"法院或类型代字过多: {len(courts)} / {len(case_types)}")
+    court_ids = {court: i for i, court in enumerate(courts)}
+    type_ids = {case_type: i for i, case_type in enumerate(case_types)}
+    keyed = sorted(((_pack_key(court_ids[parsed.court], type_ids[parsed.case_type], parsed.year, parsed.sequence),
+                     str(parsed), doc_id, date_str, file_path)
+                    for parsed, doc_id, date_str, file_path in records),
+                   key=lambda record: (record[0], record[1], record[3]))
+    
+    tmp_dir = output_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    offsets = array('Q', [0])
+    with open(os.path.join(tmp_dir, 'docs.dat'), 'wb') as f:
+        for record in keyed:
+            line = ('\t'.join(field.replace('\t', ' ') for field in record[1:]) + '\n').encode('utf-8')
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    with open(os.path.join(tmp_dir, 'docs.idx'), 'wb') as f:
+        f.write(offsets.tobytes())
+    with open(os.path.join(tmp_dir, 'keys.bin'), 'wb') as f:
+        f.write(array('Q', (record[0] for record in keyed)).tobytes())
+    with open(os.path.join(tmp_dir, 'dicts.json'), 'w', encoding='utf-8') as f:
+        json.dump({'courts': courts, 'case_types': case_types}, f, ensure_ascii=False)
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.replace(tmp_dir, output_dir)
+    print(f"✓ 案号索引建立完成，共 {len(keyed)} 篇文书，跳过 {skipped} 篇（无案号或无法解析）")
+    return len(keyed)
+
+
+class CaseNumberIndex:
+    """只读的案号区间索引"""
+    
+    def __init__(self, path='案号索引'):
+        """
+        打开索引
+        
+        Args:
+            path (str): 索引目录
+        """
+        self.path = path
+        with open(os.path.join(path, 'dicts.json'), 'r', encoding='utf-8') as f:
+            dicts = json.load(f)
+        self.courts = dicts['courts']
+        self.case_types = dicts['case_types']
+        self._maps = []
+        self._keys = self._open(os.path.join(path, 'keys.bin'))
+        self._offsets = self._open(os.path.join(path, 'docs.idx'))
+        self._docs_file = open(os.path.join(path, 'docs.dat'), 'rb')
+    
+    def _open(self, path):
+        mapped, view = _map_array(path)
+        if mapped is not None:
+            self._maps.append(mapped)
+        return view
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    def entry(self, row):
+        """
+        读取第row条记录
+        
+        Returns:
+            dict: case_number、doc_id、date、file_path，以及解析出的各字段
+        """
+        self._docs_file.seek(self._offsets[row])
+        line = self._docs_file.read(self._offsets[row + 1] - self._offsets[row]).decode('utf-8')
+        case_number, doc_id, date, file_path = line.rstrip('\n').split('\t')
+        key = self._keys[row]
+        return {
+            'case_number': case_number,
+            'doc_id': doc_id,
+            'date': date,
+            'file_path': file_path,
+            'court': self.courts[key >> 48],
+            'case_type': self.case_types[(key >> 36) & 0xFFF],
+            'year': (key >> 24) & 0xFFF,
+            'sequence': key & MAX_SEQUENCE,
+        }
+    
+    @staticmethod
+    def _exact_id(names, value):
+        """代字在字典中的编号，不存在时为None"""
+        i = bisect.bisect_left(names, value)
+        return i if i < len(names) and names[i] == value else None
+    
+    def _id_range(self, names, value, by_prefix=False):
+        """
+        代字在字典中的编号区间（闭区间），不存在时first > last
+        
+        by_prefix为True时匹配以value开头的全部代字；字典按字符串排序，同一前缀的编号连续。
+        """
+        if value is None:
+            return 0, len(names) - 1
+        if by_prefix:
+            return (bisect.bisect_left(names, value),
+                    bisect.bisect_left(names, value + '\U0010ffff') - 1)
+        i = self._exact_id(names, value)
+        return (1, 0) if i is None else (i, i)
+    
+    def _scan(self, lo, hi, level, prefix, ranges):
+        """
+        逐级跳跃扫描：在[lo, hi)内、前level个字段已确定为prefix的键中，
+        依次找出本字段落在约束区间内的每个取值，对每个取值再二分下一级，不逐条比较
+        """
+        shift, bits = KEY_FIELDS[level]
+        first, last = ranges[level]
+        if level == len(KEY_FIELDS) - 1:
+            yield from range(bisect.bisect_left(self._keys, prefix | first, lo, hi),
+                             bisect.bisect_right(self._keys, prefix | last, lo, hi))
+            return
+        mask = (1 << bits) - 1
+        i = bisect.bisect_left(self._keys, prefix | (first << shift), lo, hi)
+        while i < hi:
+            value = (self._keys[i] >> shift) & mask
+            if value > last:
+                return
+            base = prefix | (value << shift)
+            end = bisect.bisect_left(self._keys, base + (1 << shift), i, hi)
+            yield from self._scan(i, end, level + 1, base, ranges)
+            i = end
+    
+    def rows(self, court=None, case_type=None, year=None, sequence_from=None, sequence_to=None):
+        """
+        区间查询，按(法院, 类型, 年份, 顺序号)的顺序产生行号；各条件为None时不限
+        
+        Args:
+            court (str): 法院代字，如'沪02'；只给省级简称（如'沪'）时匹配该省全部法院
+            case_type (str): 类型代字，如'行初'
+            year (int): 年份
+            sequence_from (int): 顺序号下限（含）
+            sequence_to (int): 顺序号上限（含）
+        """
+        ranges = (
+            self._id_range(self.courts, court, by_prefix=court is not None and len(court) == 1),
+            self._id_range(self.case_types, case_type),
+            (0, 0xFFF) if year is None else (year, year),
+            (sequence_from or 0, MAX_SEQUENCE if sequence_to is None else min(sequence_to, MAX_SEQUENCE)),
+        )
+        if any(first > last for first, last in ranges):
+            return iter(())
+        return self._scan(0, len(self._keys), 0, 0, ranges)
+    
+    def search(self, court=None, case_type=None, year=None, sequence_from=None, sequence_to=None, limit=None):
+        """
+        区间查询并返回记录，参数同rows()
+        
+        Returns:
+            list: 记录dict
+        """
+        hits = []
+        for row in self.rows(court, case_type, year, sequence_from, sequence_to):
+            hits.append(self.entry(row))
+            if limit is not None and len(hits) >= limit:
+                break
+        return hits
+    
+    def _key_of(self, parsed):
+        court_id = self._exact_id(self.courts, parsed.court)
+        type_id = self._exact_id(self.case_types, parsed.case_type)
+        if court_id is None or type_id is None or parsed.sequence > MAX_SEQUENCE:
+            return None
+        return _pack_key(court_id, type_id, parsed.year, parsed.sequence)
+    
+    def lookup(self, case_number):
+        """
+        查找某个案号的文书（同一案号可能有多篇文书）
+        
+        Returns:
+            list: 记录dict
+        """
+        parsed = parse_case_number(case_number)
+        key = self._key_of(parsed) if parsed else None
+        if key is None:
+            return []
+        return [self.entry(row) for row in range(bisect.bisect_left(self._keys, key),
+                                                 bisect.bisect_right(self._keys, key))]
+    
+    def neighbours(self, case_number, count=5):
+        """
+        同一法院、类型、年份中，顺序号紧邻的前后各count个案号的文书（案号本身不在索引中也可以查）
+        
+        Returns:
+            tuple: (之前的记录列表, 之后的记录列表)，均按顺序号升序
+        """
+        parsed = parse_case_number(case_number)
+        key = self._key_of(parsed) if parsed else None
+        if key is None:
+            return [], []
+        group = key & ~MAX_SEQUENCE
+        start = bisect.bisect_left(self._keys, key)
+        end = bisect.bisect_right(self._keys, key)
+        low = max(bisect.bisect_left(self._keys, group), start - count)
+        high = min(bisect.bisect_left(self._keys, group + MAX_SEQUENCE + 1), end + count)
+        return ([self.entry(row) for row in range(low, start)],
+                [self.entry(row) for row in range(end, high)])
+    
+    def close(self):
+        """释放映射"""
+        self._keys.release()
+        self._offsets.release()
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+        self._docs_file.close()
+
+
+def _print_entries(entries):
+    for entry in entries:
+        print(f"{entry['case_number']}  [{entry['date']}] {entry['file_path']}")
+
+
+def main(argv=None):
+    """命令行入口：python -m case_number build / range / neighbours / parse"""
+    parser = argparse.ArgumentParser(prog='python -m case_number', description='案号解析与区间索引')
+    parser.add_argument('--index', default='案号索引', help='索引目录（默认: 案号索引）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='建立案号索引')
+    build_parser.add_argument('root', nargs='?', default='文书', help='文书根目录（默认: 文书）')
+    range_parser = subparsers.add_parser('range', help='区间查询')
+    range_parser.add_argument('--court', help='法院代字，如 沪02；只给省级简称时匹配该省全部法院')
+    range_parser.add_argument('--type', dest='case_type', help='类型代字，如 行初')
+    range_parser.add_argument('--year', type=int, help='年份')
+    range_parser.add_argument('--from', dest='sequence_from', type=int, help='顺序号下限')
+    range_parser.add_argument('--to', dest='sequence_to', type=int, help='顺序号上限')
+    range_parser.add_argument('--limit', type=int, default=50, help='最多显示条数（默认: 50）')
+    neighbours_parser = subparsers.add_parser('neighbours', help='相邻案号')
+    neighbours_parser.add_argument('case_number', help='案号')
+    neighbours_parser.add_argument('--count', type=int, default=5, help='前后各显示条数（默认: 5）')
+    parse_parser = subparsers.add_parser('parse', help='解析案号')
+    parse_parser.add_argument('case_number', help='案号')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    
+    if args.command == 'parse':
+        parsed = parse_case_number(args.case_number)
+        if parsed is None:
+            print(f"✗ 无法解析案号: {args.case_number}")
+            return False
+        print(f"年份: {parsed.year}  法院: {parsed.court}  类型: {parsed.case_type}  "
+              f"审级: {parsed.level or '未知'}  顺序号: {parsed.sequence}" + (f"  后缀: 之{parsed.suffix}" if parsed.suffix else ''))
+        return True
+    
+    if args.command == 'build':
+        if not os.path.isdir(args.root):
+            print(f"✗ 目录不存在: {args.root}")
+            return False
+        build_index(args.root, args.index)
+        return True
+    
+    index = CaseNumberIndex(args.index)
+    try:
+        if args.command == 'range':
+            entries = index.search(args.court, args.case_type, args.year, args.sequence_from, args.sequence_to, args.limit)
+            print(f"共显示 {len(entries)} 条结果:")
+            _print_entries(entries)
+        else:
+            before, after = index.neighbours(args.case_number, args.count)
+            _print_entries(before)
+            print(f"--> {args.case_number}" + ('' if index.lookup(args.case_number) else '（不在索引中）'))
+            _print_entries(after)
+        return True
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 中文数字
+功能：把文书中的中文数字（如 一百七十七、两千零五、十二万、二〇二三）转换为整数
+"""
+
+import unicodedata
+
+DIGITS = {'〇': 0, '零': 0, '○': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4,
+          '五': 5, '六': 6, '七': 7, '八': 8, '九': 9,
+          '壹': 1, '贰': 2, '叁': 3, '肆': 4, '伍': 5, '陆': 6, '柒': 7, '捌': 8, '玖': 9}
+UNITS = {'十': 10, '拾': 10, '百': 100, '佰': 100, '千': 1000, '仟': 1000}
+LARGE_UNITS = {'万': 10 ** 4, '萬': 10 ** 4, '亿': 10 ** 8, '億': 10 ** 8}
+
+# 可以出现在中文数字中的字符，供其他模块拼写正则表达式
+NUMERAL_CHARS = ''.join(DIGITS) + ''.join(UNITS) + ''.join(LARGE_UNITS)
+
+
+def chinese_to_int(text):
+    """
+    中文数字转换为整数
+    
+    支持带单位的写法（一百七十七、一千零五、十二、两百、二十万、一亿二千万，大写数字亦可）、
+    逐位写法（二〇二三）以及阿拉伯数字（含全角）和两者混合（3万）。
+    
+    Args:
+        text (str): 数字文本
+    
+    Returns:
+        int: 数值
+    
+    Raises:
+        ValueError: 含有不能识别的字符或为空
+    """
+    text = unicodedata.normalize('NFKC', text).strip().replace(',', '')
+    if not text:
+        raise ValueError("空的数字")
+    if text.isascii() and text.isdigit():
+        return int(text)
+    # 逐位写法：全部是数字字（不含单位），如 二〇二三
+    if len(text) > 1 and all(ch in DIGITS or ch.isdigit() for ch in text):
+        return int(''.join(str(DIGITS[ch]) if ch in DIGITS else ch for ch in text))
+    
+    total = 0    # 已经过亿、万的部分
+    section = 0  # 当前万以内的部分
+    number = 0   # 尚未乘以单位的数字
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch.isascii() and ch.isdigit():
+            # 混合写法中的阿拉伯数字，如 3万（不支持小数）
+            j = i
+            while j < len(text) and text[j].isascii() and text[j].isdigit():
+                j += 1
+            number = int(text[i:j])
+            i = j
+            continue
+        if ch in DIGITS:
+            number = DIGITS[ch]
+        elif ch in UNITS:
+            # "十二"中的十前面省略了一
+            section += (number or 1) * UNITS[ch]
+            number = 0
+        elif ch in LARGE_UNITS:
+            unit = LARGE_UNITS[ch]
+            value = section + number
+            if total and total < unit:
+                # 一万亿：前面的部分整体乘以更大的单位
+                total = (total + value) * unit
+            else:
+                total += (value or 1) * unit
+            section = number = 0
+        else:
+            raise ValueError(f"不能识别的数字: {text}")
+        i += 1
+    return total + section + number
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 案号引用图
+功能：从清洗后的文书正文中提取所引用的其他案号，区分审理关系（上诉、申请再审、复议等所针对的原审案件）
+和一般引用，建立以案号为节点的压缩邻接数组（CSR）图，查询审级链和出入度
+
+图目录结构：
+    nodes.keys   已排序的uint64节点键（案号的8字节摘要），下标即节点号，通过mmap二分查找
+    nodes.dat    与节点一一对应，每行"案号\t文件路径"（引用到但未采集的案号文件路径为空）
+    nodes.idx    nodes.dat中每行的偏移（uint64数组，末尾多一项为文件长度）
+    out.idx / out.dst / out.kind    出边：每个节点的出边起点（uint64数组）、目标节点（uint32）、关系（uint8）
+    in.idx / in.src / in.kind       入边，格式同出边
+
+边的方向为 引用者 -> 被引用者，二审判决指向一审，再审审查指向二审。
+"""
+
+import os
+import re
+import sys
+import mmap
+import json
+import shutil
+import bisect
+import hashlib
+import argparse
+import unicodedata
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from bigram_index import find_shards
+from case_number import CASE_NUMBER_PATTERN, parse_case_number
+from document_catalog import parse_document_text
+
+KIND_CITE = 0    # 一般引用（关联案件、参照案例等）
+KIND_REVIEW = 1  # 审理关系：本案审理的是被引用的案件
+KIND_NAMES = {KIND_CITE: '引用', KIND_REVIEW: '审理'}
+
+# 同一句中案号之前出现这些词时，案号是本案审理的对象，如"不服……（2023）沪02行初163号行政判决"
+REVIEW_BEFORE_PATTERN = re.compile(r'(不服|维持|撤销|改判|发回|原审|原判|一审|二审|再审|复议|异议)[^。；]*$')
+# 或者案号之后紧接着提起上诉、申请再审等
+REVIEW_AFTER_PATTERN = re.compile(r'^[^。；]{0,16}?(提起上诉|提出上诉|申请再审|申请复议|提出复议|提出异议|抗诉)')
+CONTEXT_CHARS = 60
+
+
+def node_key(case_number):
+    """节点键：规范化案号的blake2b 8字节摘要"""
+    digest = hashlib.blake2b(case_number.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def extract_citations(body, own=None):
+    """
+    提取正文中引用的其他案号
+    
+    被引用的案号晚于本案时不可能是本案审理的对象，只记为一般引用。
+    
+    Args:
+        body (str): 文书正文（DocumentCleaner的输出）
+        own (CaseNumber): 本案案号，引用中与之相同的案号被忽略
+    
+    Returns:
+        dict: 规范化案号 -> 关系（KIND_REVIEW优先于KIND_CITE）
+    """
+    text = unicodedata.normalize('NFKC', body)
+    citations = {}
+    for match in CASE_NUMBER_PATTERN.finditer(text):
+        cited = parse_case_number(match.group())
+        if cited is None or cited == own:
+            continue
+        name = str(cited)
+        before = text[max(0, match.start() - CONTEXT_CHARS):match.start()]
+        after = text[match.end():match.end() + CONTEXT_CHARS]
+        kind = KIND_CITE
+        if (own is None or cited.year <= own.year) and \
+                (REVIEW_BEFORE_PATTERN.search(before) or REVIEW_AFTER_PATTERN.search(after)):
+            kind = KIND_REVIEW
+        citations[name] = max(kind, citations.get(name, KIND_CITE))
+    return citations
+
+
+def _extract_shard(shard_dir):
+    """提取一个日期目录中全部文书的引用（在子进程中运行）"""
+    documents = []
+    for filename in sorted(os.listdir(shard_dir)):
+        if not filename.endswith('.txt'):
+            continue
+        file_path = os.path.join(shard_dir, filename)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                document = parse_document_text(f.read())
+        except (OSError, UnicodeDecodeError):
+            continue
+        own = parse_case_number(document['case_number'])
+        if own is None:
+            continue
+        documents.append((str(own), file_path, extract_citations(document['body'], own)))
+    return documents
+
+
+def _write_array(path, typecode, values):
+    with open(path, 'wb') as f:
+        f.write(array(typecode, values).tobytes())
+
+
+def _write_csr(output_dir, prefix, node_count, edges):
+    """按起点排序的(起点, 终点, 关系)写成CSR三个数组"""
+    offsets = array('Q', [0] * (node_count + 1))
+    for source, _, _ in edges:
+        offsets[source + 1] += 1
+    for i in range(node_count):
+        offsets[i + 1] += offsets[i]
+    with open(os.path.join(output_dir, f'{prefix}.idx'), 'wb') as f:
+        f.write(offsets.tobytes())
+    _write_array(os.path.join(output_dir, f'{prefix}.{"dst" if prefix == "out" else "src"}'), 'I',
+                 (target for _, target, _ in edges))
+    _write_array(os.path.join(output_dir, f'{prefix}.kind'), 'B', (kind for _, _, kind in edges))
+
+
+def build_graph(root='文书', output_dir='引用图', workers=None):
+    """
+    扫描文书目录建立引用图（各日期目录并行提取，先写入临时目录再替换）
+    
+    Args:
+        root (str): 文书根目录
+        output_dir (str): 图目录
+        workers (int): 进程数，默认CPU核数
+    
+    Returns:
+        tuple: (节点数, 边数)
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shard_results = list(executor.map(_extract_shard, [shard_dir for shard_dir, _ in find_shards(root)]))
+    
+    files = {}
+    citations = {}
+    for documents in shard_results:
+        for own, file_path, cited in documents:
+            files.setdefault(own, file_path)
+            merged = citations.setdefault(own, {})
+            for name, kind in cited.items():
+                merged[name] = max(kind, merged.get(name, KIND_CITE))
+    
+    names = set(citations)
+    for cited in citations.values():
+        names.update(cited)
+    ordered = sorted(names, key=node_key)
+    node_ids = {name: i for i, name in enumerate(ordered)}
+    edges = sorted((node_ids[own], node_ids[name], kind)
+                   for own, cited in citations.items() for name, kind in cited.items())
+    
+    tmp_dir = output_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    _write_array(os.path.join(tmp_dir, 'nodes.keys'), 'Q', (node_key(name) for name in ordered))
+    offsets = array('Q', [0])
+    with open(os.path.join(tmp_dir, 'nodes.dat'), 'wb') as f:
+        for name in ordered:
+            line = f"{name}\t{files.get(name, '')}\n".encode('utf-8')
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    with open(os.path.join(tmp_dir, 'nodes.idx'), 'wb') as f:
+        f.write(offsets.tobytes())
+    _write_csr(tmp_dir, 'out', len(ordered), edges)
+    _write_csr(tmp_dir, 'in', len(ordered), sorted((target, source, kind) for source, target, kind in edges))
+    with open(os.path.join(tmp_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump({'nodes': len(ordered), 'edges': len(edges), 'documents': len(files)}, f)
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.replace(tmp_dir, output_dir)
+    print(f"✓ 引用图建立完成：{len(ordered)} 个案号，{len(edges)} 条引用，其中 {len(files)} 个案号有文书")
+    return len(ordered), len(edges)
+
+
+class CitationGraph:
+    """只读的案号引用图"""
+    
+    def __init__(self, path='引用图'):
+        """
+        打开引用图
+        
+        Args:
+            path (str): 图目录
+        """
+        self.path = path
+        self._maps = []
+        self._views = []
+        self._keys = self._open('nodes.keys', 'Q')
+        self._nodes = self._open('nodes.dat')
+        self._node_offsets = self._open('nodes.idx', 'Q')
+        self._out = (self._open('out.idx', 'Q'), self._open('out.dst', 'I'), self._open('out.kind', 'B'))
+        self._in = (self._open('in.idx', 'Q'), self._open('in.src', 'I'), self._open('in.kind', 'B'))
+    
+    def _open(self, filename, fmt='B'):
+        path = os.path.join(self.path, filename)
+        if os.path.getsize(path) == 0:
+            view = memoryview(b'').cast(fmt)
+        else:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps.append(mapped)
+            base = memoryview(mapped)
+            self._views.append(base)
+            view = base.cast(fmt)
+        self._views.append(view)
+        return view
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    def node_id(self, case_number):
+        """
+        案号对应的节点号
+        
+        Returns:
+            int: 节点号，案号不在图中或无法解析时为None
+        """
+        parsed = parse_case_number(case_number)
+        if parsed is None:
+            return None
+        name = str(parsed)
+        key = node_key(name)
+        i = bisect.bisect_left(self._keys, key)
+        while i < len(self._keys) and self._keys[i] == key:
+            if self.node(i)[0] == name:
+                return i
+            i += 1
+        return None
+    
+    def node(self, node_id):
+        """
+        Returns:
+            tuple: (案号, 文件路径)，未采集的案号文件路径为空字符串
+        """
+        line = bytes(self._nodes[self._node_offsets[node_id]:self._node_offsets[node_id + 1]])
+        name, file_path = line.decode('utf-8').rstrip('\n').split('\t')
+        return name, file_path
+    
+    @staticmethod
+    def _neighbours(csr, node_id, kind=None):
+        offsets, targets, kinds = csr
+        start, end = offsets[node_id], offsets[node_id + 1]
+        if kind is None:
+            return list(targets[start:end])
+        return [targets[i] for i in range(start, end) if kinds[i] == kind]
+    
+    def cites(self, node_id, kind=None):
+        """本案引用的案件节点号（kind为None时不区分关系）"""
+        return self._neighbours(self._out, node_id, kind)
+    
+    def cited_by(self, node_id, kind=None):
+        """引用本案的案件节点号"""
+        return self._neighbours(self._in, node_id, kind)
+    
+    def edges(self, node_id, incoming=False):
+        """
+        Returns:
+            list: (相邻节点号, 关系)，incoming为True时为引用本案的案件
+        """
+        offsets, targets, kinds = self._in if incoming else self._out
+        return [(targets[i], kinds[i]) for i in range(offsets[node_id], offsets[node_id + 1])]
+    
+    def degree(self, node_id):
+        """
+        Returns:
+            tuple: (入度, 出度)
+        """
+        return (self._in[0][node_id + 1] - self._in[0][node_id],
+                self._out[0][node_id + 1] - self._out[0][node_id])
+    
+    def chain(self, node_id):
+        """
+        审级链：沿审理关系向下找本案审理的原审案件，向上找审理本案的后续案件
+        
+        Returns:
+            list: (层级, 节点号)，原审案件层级为负、后续案件为正、本案为0，按层级升序
+        """
+        levels = {node_id: 0}
+        for csr, step in ((self._out, -1), (self._in, 1)):
+            queue = deque([node_id])
+            while queue:
+                current = queue.popleft()
+                for neighbour in self._neighbours(csr, current, KIND_REVIEW):
+                    if neighbour not in levels:
+                        levels[neighbour] = levels[current] + step
+                        queue.append(neighbour)
+        return sorted(((level, node) for node, level in levels.items()))
+    
+    def close(self):
+        """释放映射"""
+        for view in reversed(self._views):
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+        self._views = []
+        self._maps = []
+
+
+def main(argv=None):
+    """命令行入口：python -m citation_graph build [目录] / chain <案号> / show <案号>"""
+    parser = argparse.ArgumentParser(prog='python -m citation_graph', description='案号引用图')
+    parser.add_argument('--graph', default='引用图', help='图目录（默认: 引用图）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='建立引用图')
+    build_parser.add_argument('root', nargs='?', default='文书', help='文书根目录（默认: 文书）')
+    build_parser.add_argument('--workers', type=int, default=None, help='进程数（默认: CPU核数）')
+    chain_parser = subparsers.add_parser('chain', help='审级链（一审→二审→再审）')
+    chain_parser.add_argument('case_number', help='案号')
+    show_parser = subparsers.add_parser('show', help='出入度和直接引用')
+    show_parser.add_argument('case_number', help='案号')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    
+    if args.command == 'build':
+        if not os.path.isdir(args.root):
+            print(f"✗ 目录不存在: {args.root}")
+            return False
+        build_graph(args.root, args.graph, args.workers)
+        return True
+    
+    graph = CitationGraph(args.graph)
+    try:
+        node_id = graph.node_id(args.case_number)
+        if node_id is None:
+            print(f"✗ 引用图中没有该案号: {args.case_number}")
+            return False
+        if args.command == 'chain':
+            for level, node in graph.chain(node_id):
+                name, file_path = graph.node(node)
+                marker = '-->' if level == 0 else f'{level:+d} '
+                print(f"{marker} {name}  {file_path or '（未采集）'}")
+        else:
+            in_degree, out_degree = graph.degree(node_id)
+            print(f"{graph.node(node_id)[0]}：被引用 {in_degree} 次，引用 {out_degree} 个案号")
+            for title, incoming in (('引用', False), ('被引用', True)):
+                for node, kind in graph.edges(node_id, incoming):
+                    print(f"  {title} [{KIND_NAMES[kind]}] {graph.node(node)[0]}")
+        return True
+    finally:
+        graph.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,22 +10,49 @@ import os
 import time
 import datetime
 import json
-import re
+import hashlib
 from browser_simulator import WenshuBrowserSimulator
-from document_cleaner import DocumentCleaner
+from browser_session import BrowserSession
+from document_cleaner import DocumentCleaner, clean_filename, document_filename
+from raw_archive import RawHtmlArchive
+from document_ledger import DocumentLedger, DATE_LINKS_COLLECTED
+from url_dedup_store import UrlDedupStore
+from link_record import LinkSet
+from document_catalog import DocumentCatalog
+from index_segments import SegmentedIndex
+from title_parser import LinkRules
+from url_list_io import UrlListWriter, iter_url_list, iter_text_url_list, is_url_list_complete, URL_LIST_SUFFIX
 import random
 
 class ShanghaiDocumentCollector:
     """上海市裁判文书自动化收集器"""
     
-    def __init__(self):
+    def __init__(self, extract_mode='html', rules_file='采集规则.json'):
+        """
+        Args:
+            extract_mode (str): 文书提取方式。'html'取整页HTML清洗并归档原始网页；
+                'page'在页面内提取正文和案由，只传回文本，不归档原始网页
+            rules_file (str): 按标题筛选、排序链接的规则文件（格式见title_parser），不存在时不筛选
+        """
         self.simulator = WenshuBrowserSimulator()
+        self.session = BrowserSession(self.simulator)  # 整个采集过程复用同一个浏览器进程
+        self.extract_mode = extract_mode
         self.cleaner = DocumentCleaner()
         self.max_pages = 40
-        self.collected_urls = set()  # 用于去重
+        self.url_store = UrlDedupStore()  # 跨运行去重，以docId摘要为键
         self.url_folder = "URL列表"
         self.doc_folder = "文书"
         self.init_folders()
+        self.archive = RawHtmlArchive()  # 原始HTML归档，便于离线重新清洗
+        self.ledger = DocumentLedger()  # 按docId记录采集状态，断点续采
+        self.catalog = DocumentCatalog()  # 全文检索目录，保存后随即索引
+        self.search_index = SegmentedIndex()  # 分段二元组索引，每个日期完成后在后台建立一个段
+        self.link_rules = None  # 标题筛选规则，打开详情页之前排除不需要的文书
+        if os.path.exists(rules_file):
+            self.link_rules = LinkRules.from_file(rules_file)
+            print(f"✓ 已加载链接筛选规则: {rules_file}")
+        # 跳过的文书在台账中记下规则指纹，规则改变后重新判断
+        self.rules_key = self.link_rules.fingerprint if self.link_rules is not None else ''
     
     def init_folders(self):
         """初始化文件夹结构"""
@@ -59,6 +86,14 @@ class ShanghaiDocumentCollector:
     
     def collect_urls_for_date(self, date_str, max_pages=40):
         """收集指定日期的URL"""
+        list_path = self.url_list_path(date_str)
+        if is_url_list_complete(list_path):
+            # 上次已收集完成、但未来得及登记到台账
+            links = list(LinkSet(iter_url_list(list_path)))
+            print(f"✓ {date_str} 读取已收集完成的 {len(links)} 个链接")
+            return links
+        
+        url_list = None
         try:
             # 执行高级检索
             if not self.simulator.perform_advanced_search(date_str):
@@ -73,8 +108,12 @@ class ShanghaiDocumentCollector:
             if not self.simulator.set_page_size_15():
                 print(f"⚠ {date_str} 设置页面大小失败，继续执行...")
             
-            # 收集所有页面的链接
-            all_links = set()
+            # 收集所有页面的链接；每页新增的链接随即追加到JSONL文件，
+            # 上次中途中断时已写入的页先读回，中断前收集的链接不会丢失
+            all_links = LinkSet(iter_url_list(list_path)) if os.path.exists(list_path) else LinkSet()
+            if all_links:
+                print(f"✓ {date_str} 读回上次中断前收集的 {len(all_links)} 个链接")
+            url_list = UrlListWriter(list_path)
             current_page = 1
             
             while current_page <= max_pages:
@@ -87,18 +126,15 @@ class ShanghaiDocumentCollector:
                 print(f"\n--- 第 {current_page} 页 ---")
                 
                 # 提取当前页面的链接
-                page_links = self.simulator.extract_document_links()
+                page_links = self.simulator.extract_document_links(current_page)
                 
                 if page_links:
-                    # 去重处理
-                    new_links = []
-                    for link in page_links:
-                        if link['url'] not in self.collected_urls:
-                            new_links.append(link)
-                            self.collected_urls.add(link['url'])
-                    
-                    all_links.update(new_links)
+                    # 去重处理：过滤之前日期或之前运行中已登记的文书，以及本日期已收集的文书
+                    new_links = all_links.update(
+                        link for link in page_links if link.doc_id not in self.url_store
+                    )
                     print(f"✓ 第 {current_page} 页收集到 {len(page_links)} 个链接，去重后新增 {len(new_links)} 个")
+                    url_list.append_page(current_page, new_links)
                 else:
                     print(f"⚠ 第 {current_page} 页未收集到链接")
                 
@@ -113,22 +149,76 @@ class ShanghaiDocumentCollector:
                 self.simulator.extreme_random_sleep(20, 60)
                 self.simulator.simulate_extreme_human_behavior()
                 
+            url_list.close()
             print(f"✓ {date_str} 共收集到 {len(all_links)} 个新链接")
             return list(all_links)
             
         except Exception as e:
             print(f"✗ {date_str} 收集URL失败: {str(e)}")
+            if url_list is not None:
+                url_list.abort()
             return []
     
     def is_date_processed(self, date_str):
-        """检查日期是否已经处理过"""
-        url_file = os.path.join(self.url_folder, f"{date_str}_上海市文书.txt")
-        doc_folder = os.path.join(self.doc_folder, date_str)
+        """检查日期是否已经处理过（该日期的全部文书在采集台账中均已完成）"""
+        if self.ledger.get_date_status(date_str) is None:
+            self.import_legacy_date(date_str)
+        # 筛选规则改变后，按旧规则跳过的文书重新判断，需要的文书在本次采集
+        reopened = self.ledger.reopen_skipped(date_str, self.rules_key)
+        if reopened:
+            print(f"✓ {date_str} 筛选规则已改变，{reopened} 篇跳过的文书按当前规则重新判断")
+        return self.ledger.is_date_done(date_str)
+    
+    def import_legacy_date(self, date_str):
+        """
+        将台账启用前采集的日期导入台账
         
-        # 如果URL文件和文档文件夹都存在，认为已处理
-        if os.path.exists(url_file) and os.path.exists(doc_folder):
-            return True
-        return False
+        从URL文件读取链接，对应文书文件已存在的记为完成，其余待下次采集。
+        """
+        links = self.load_urls_from_file(date_str)
+        if not links:
+            return
+        
+        date_folder = os.path.join(self.doc_folder, date_str)
+        self.ledger.add_links(date_str, links)
+        self.ledger.mark_date_links_collected(date_str, len(links))
+        self.url_store.add_many(link.doc_id for link in links)
+        done_count = 0
+        for link in links:
+            file_path = self.existing_document_path(date_folder, link.title)
+            if file_path:
+                self.ledger.mark_cleaned(link.doc_id, file_path)
+                done_count += 1
+        self.ledger.finish_date(date_str)
+        print(f"✓ {date_str} 导入旧采集记录: {len(links)} 个链接，其中 {done_count} 篇已保存")
+    
+    def url_list_path(self, date_str):
+        """按页追加的JSONL链接文件路径"""
+        return os.path.join(self.url_folder, f"{date_str}_上海市文书{URL_LIST_SUFFIX}")
+    
+    def load_urls_from_file(self, date_str):
+        """
+        读取save_urls_to_file保存的URL文件，文件不存在时返回空列表
+        
+        该文件在一个日期的链接全部收集完成后才写出；按页追加的JSONL可能只有部分页，
+        由collect_urls_for_date读回后继续收集，不在这里导入。
+        """
+        filename = os.path.join(self.url_folder, f"{date_str}_上海市文书.txt")
+        if not os.path.exists(filename):
+            return []
+        return list(LinkSet(iter_text_url_list(filename)))
+    
+    def existing_document_path(self, date_folder, title):
+        """
+        访问页面前按标题推算保存路径，文件已存在时返回该路径
+        
+        标题过长时文件名取决于页面中的案件编号，无法提前判断，返回None。
+        """
+        filename = f"{self.clean_filename(title)}.txt"
+        if len(filename) > 100:
+            return None
+        file_path = os.path.join(date_folder, filename)
+        return file_path if os.path.exists(file_path) else None
     
     def save_urls_to_file(self, date_str, links):
         """保存URL到文件"""
@@ -145,8 +235,8 @@ class ShanghaiDocumentCollector:
                 f.write(f"# 总共收集到 {len(links)} 个文书链接\n\n")
                 
                 for i, link in enumerate(links):
-                    f.write(f"{i+1}. {link['title']}\n")
-                    f.write(f"   URL: {link['url']}\n\n")
+                    f.write(f"{i+1}. {link.title}\n")
+                    f.write(f"   URL: {link.url}\n\n")
             
             print(f"✓ 保存 {len(links)} 个链接到: {filename}")
             return filename
@@ -161,6 +251,16 @@ class ShanghaiDocumentCollector:
             print(f"⚠ {date_str} 没有文档需要下载")
             return
         
+        # 按标题筛选和排序，被排除的文书不打开详情页，在台账中记为跳过
+        if self.link_rules is not None:
+            url_list, skipped = self.link_rules.apply(url_list)
+            for link in skipped:
+                self.ledger.mark_skipped(link.doc_id, "标题不符合筛选规则", self.rules_key)
+            if skipped:
+                print(f"✓ 按标题筛选规则跳过 {len(skipped)} 篇，剩余 {len(url_list)} 篇")
+            if not url_list:
+                return
+        
         print(f"\n开始下载和清洗 {date_str} 的文档...")
         
         # 创建日期文件夹
@@ -171,8 +271,21 @@ class ShanghaiDocumentCollector:
         
         success_count = 0
         fail_count = 0
+        skip_count = 0
+        cleaned_ids = self.ledger.cleaned_doc_ids(date_str)
         
-        for idx, url in enumerate(url_list):
+        for idx, link in enumerate(url_list):
+            doc_id = link.doc_id
+            # 访问页面前先查台账和目标文件，已完成的文书不再打开
+            if doc_id in cleaned_ids:
+                skip_count += 1
+                continue
+            existing_path = self.existing_document_path(date_folder, link.title)
+            if existing_path:
+                self.ledger.mark_cleaned(doc_id, existing_path)
+                skip_count += 1
+                continue
+            
             # 极致安全：夜间暂停、长延时、复杂行为模拟、异常检测
             self.simulator.night_pause()
             self.simulator.extreme_random_sleep(30, 90)
@@ -184,47 +297,39 @@ class ShanghaiDocumentCollector:
                 continue
 
             try:
-                print(f"\n处理文档 {idx+1}/{len(url_list)}: {url['title'][:50]}...")
+                print(f"\n处理文档 {idx+1}/{len(url_list)}: {link.title[:50]}...")
                 
                 # 访问文档页面
-                response = self.simulator.page.goto(
-                    url['url'],
-                    wait_until='networkidle',
+                response = self.simulator.goto(
+                    link.url,
+                    wait_until='domcontentloaded',
                     timeout=30000
                 )
                 
                 if response.status != 200:
                     print(f"✗ 页面响应状态异常: {response.status}")
+                    self.ledger.mark_failed(doc_id, f"HTTP {response.status}")
+                    self.session.record_error()
                     fail_count += 1
                     continue
                 
-                # 等待页面加载
-                self.simulator.page.wait_for_load_state('domcontentloaded')
-                
-                # 获取页面内容
-                html_content = self.simulator.page.content()
+                # 等待正文渲染
+                self.simulator.wait_until_ready('detail')
                 
-                # 清洗文档内容
-                cleaned_text = self.cleaner.clean_document_to_text(html_content)
+                # 提取并清洗文档内容，同时得到用于命名的文档信息
+                cleaned_text, doc_info = self.extract_document(doc_id, link, date_str)
                 
                 if cleaned_text == "未找到文档内容":
                     print(f"✗ 未找到文档内容")
+                    self.ledger.mark_failed(doc_id, "未找到文档内容")
                     fail_count += 1
                     continue
                 
-                # 提取文档信息用于命名
-                doc_info = self.cleaner.extract_document_info(html_content)
                 case_number = doc_info.get('case_number', '未知案件')
                 case_reason = doc_info.get('case_reason', '未知案由')
                 
-                # 生成文件名（使用文档标题）
-                safe_title = self.clean_filename(url['title'])
-                filename = f"{safe_title}.txt"
-                
-                # 如果文件名太长，使用案件编号
-                if len(filename) > 100:
-                    filename = f"{case_number}_{case_reason}.txt"
-                    filename = self.clean_filename(filename)
+                # 生成文件名（使用文档标题，太长时使用案件编号），与批量重新清洗的命名一致
+                filename = document_filename(link.title, doc_info)
                 
                 # 保存文件
                 file_path = os.path.join(date_folder, filename)
@@ -232,17 +337,22 @@ class ShanghaiDocumentCollector:
                 # 检查文件是否已存在（避免重复）
                 if os.path.exists(file_path):
                     print(f"⚠ 文件已存在，跳过: {filename}")
+                    self.ledger.mark_cleaned(doc_id, file_path)
                     continue
                 
                 with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(f"# 文档标题: {url['title']}\n")
-                    f.write(f"# 案件编号: {case_number}\n")
-                    f.write(f"# 案由: {case_reason}\n")
-                    f.write(f"# 收集时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    f.write(f"# 原始URL: {url['url']}\n\n")
-                    f.write(cleaned_text)
+                    f.write(self.cleaner.format_document(
+                        link.title, case_number, case_reason,
+                        datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                        link.url, cleaned_text
+                    ))
                 
+                self.ledger.mark_cleaned(doc_id, file_path)
                 print(f"✓ 保存文档: {filename}")
+                try:
+                    self.catalog.upsert_file(file_path, date_str)
+                except Exception as e:
+                    print(f"⚠ 文书目录索引失败（可稍后运行 python -m document_catalog index 补建）: {str(e)}")
                 success_count += 1
                 
                 # 每文书后极致延时
@@ -251,34 +361,88 @@ class ShanghaiDocumentCollector:
                 
             except Exception as e:
                 print(f"✗ 处理文档失败: {str(e)}")
+                self.ledger.mark_failed(doc_id, e)
+                self.session.record_error()
                 fail_count += 1
                 continue
         
         print(f"\n{date_str} 文档处理完成:")
         print(f"  ✓ 成功: {success_count}")
         print(f"  ✗ 失败: {fail_count}")
+        if skip_count:
+            print(f"  ⚠ 已完成跳过: {skip_count}")
+    
+    def extract_document(self, doc_id, link, date_str):
+        """
+        从当前文书页面提取清洗后的文本和文档信息
+        
+        'page'模式在页面内完成提取，只传回正文文本片段和案由；页面结构
+        需要整页HTML才能保证结果一致时，自动改用'html'模式。'html'模式
+        取整页HTML，归档后单次解析清洗。
+        
+        Returns:
+            tuple: (清洗后的文本, 文档信息)
+        """
+        if self.extract_mode == 'page':
+            payload = self.simulator.page.evaluate(self.cleaner.PAGE_EXTRACT_JS)
+            result = self.cleaner.process_extracted(payload)
+            if result is not None:
+                # 页面内提取时台账记录正文片段的哈希
+                body = '\n'.join(payload.get('strings') or [])
+                self.ledger.mark_fetched(doc_id, hashlib.sha1(body.encode('utf-8')).hexdigest())
+                return result
+            print("⚠ 页面结构需要整页HTML，改用HTML模式提取")
+        
+        # 获取页面内容
+        html_content = self.simulator.page.content()
+        self.ledger.mark_fetched(doc_id, hashlib.sha1(html_content.encode('utf-8')).hexdigest())
+        
+        # 先归档原始HTML，清洗规则改进后可离线重新处理而无需再次访问
+        try:
+            self.archive.append(date_str, doc_id, html_content, link.url, link.title)
+        except Exception as e:
+            print(f"⚠ 归档原始网页失败: {str(e)}")
+        
+        # 单次解析完成清洗和信息提取
+        return self.cleaner.process(html_content)
     
     def clean_filename(self, filename):
-        """清理文件名中的特殊字符"""
-        # 移除或替换特殊字符
-        filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-        # 限制文件名长度
-        if len(filename) > 100:
-            filename = filename[:100]
-        return filename
+        """清理文件名中的特殊字符（规则见document_cleaner.clean_filename）"""
+        return clean_filename(filename)
     
     def process_date(self, date_str):
         """处理单个日期的完整流程"""
         try:
-            # 步骤1：收集URL
-            links = self.collect_urls_for_date(date_str)
-            
-            # 步骤2：保存URL到文件
-            url_file = self.save_urls_to_file(date_str, links)
+            if self.ledger.get_date_status(date_str) == DATE_LINKS_COLLECTED:
+                # 上次中途中断：链接已在台账中，无需重新检索
+                links = self.ledger.unfinished_links(date_str)
+                print(f"✓ {date_str} 从采集台账恢复 {len(links)} 个未完成的文书")
+            else:
+                # 步骤1：收集URL
+                links = self.collect_urls_for_date(date_str)
+                
+                # 步骤2：保存URL到文件，并登记到台账
+                url_file = self.save_urls_to_file(date_str, links)
+                if links:
+                    self.ledger.add_links(date_str, links)
+                    self.ledger.mark_date_links_collected(date_str, len(links))
+                    # 登记到台账之后再记入去重集合，收集中途崩溃不会丢失链接
+                    self.url_store.add_many(link.doc_id for link in links)
+                    links = self.ledger.unfinished_links(date_str)
             
             # 步骤3：下载并清洗文档
             if links:
                 self.download_and_clean_documents(links, date_str)
+            if self.ledger.get_date_status(date_str) == DATE_LINKS_COLLECTED:
+                self.ledger.finish_date(date_str)
+            
+            # 步骤4：为当天的文书建立索引段（后台进程），索引工作量只与当天的文书数有关
+            date_folder = os.path.join(self.doc_folder, date_str)
+            if os.path.isdir(date_folder):
+                try:
+                    self.search_index.add_shard(date_folder, date_str)
+                except Exception as e:
+                    print(f"⚠ 索引段建立失败（可稍后运行 python -m index_segments update 补建）: {str(e)}")
             
             return len(links)
             
@@ -303,7 +467,7 @@ class ShanghaiDocumentCollector:
         
         print(f"\n第二步：开始收集文档...")
         print(f"总共需要处理 {total_dates} 个日期")
-        print("每个日期都会重新启动浏览器进程（无头模式）")
+        print("全程复用同一个浏览器进程（无头模式），异常或内存增长过多时重建上下文")
         
         # 询问用户是否继续
         confirm = input(f"\n即将开始收集上海市近{years_back}年的裁判文书，预计需要很长时间。\n是否继续？(y/n): ")
@@ -311,77 +475,68 @@ class ShanghaiDocumentCollector:
             print("用户取消操作")
             return False
         
-        # 按日期遍历收集，每个日期重新启动浏览器
-        for i, date_str in enumerate(dates):
-            # 极致安全：夜间暂停、长延时、复杂行为模拟、异常检测
-            self.simulator.night_pause()
-            self.simulator.extreme_random_sleep(180, 600)  # 3~10分钟
-            self.simulator.simulate_extreme_human_behavior()
-            self.simulator.check_captcha_or_exception()
-            # 偶尔跳过某一天，模拟人类疏漏
-            if random.random() < 0.01:
-                print(f"[极致安全] 偶尔跳过日期 {date_str}，模拟人类疏漏")
-                continue
-
-            print(f"\n{'='*100}")
-            print(f"进度: {i+1}/{total_dates} ({(i+1)/total_dates*100:.1f}%) - 处理日期: {date_str}")
-            print(f"{'='*100}")
-            
-            # 检查是否已经处理过
-            if self.is_date_processed(date_str):
-                print(f"⚠ {date_str} 已经处理过，跳过")
-                processed_dates += 1
-                continue
-            
-            try:
-                # 重新创建浏览器模拟器
-                self.simulator = WenshuBrowserSimulator()
-                
-                # 初始化浏览器（无头模式）
-                print("启动浏览器...")
-                if not self.simulator.start_browser(headless=True):
-                    print(f"✗ {date_str} 浏览器启动失败，跳过")
+        # 启动浏览器，按日期遍历收集时复用
+        if not self.session.start():
+            print("✗ 浏览器启动失败")
+            return False
+        
+        try:
+            for i, date_str in enumerate(dates):
+                # 极致安全：夜间暂停、长延时、复杂行为模拟、异常检测
+                self.simulator.night_pause()
+                self.simulator.extreme_random_sleep(180, 600)  # 3~10分钟
+                self.simulator.simulate_extreme_human_behavior()
+                self.simulator.check_captcha_or_exception()
+                # 偶尔跳过某一天，模拟人类疏漏
+                if random.random() < 0.01:
+                    print(f"[极致安全] 偶尔跳过日期 {date_str}，模拟人类疏漏")
                     continue
                 
-                # 设置cookies
-                if not self.simulator.setup_cookies():
-                    print(f"✗ {date_str} Cookie设置失败，跳过")
-                    self.simulator.close_browser()
-                    continue
+                print(f"\n{'='*100}")
+                print(f"进度: {i+1}/{total_dates} ({(i+1)/total_dates*100:.1f}%) - 处理日期: {date_str}")
+                print(f"{'='*100}")
                 
-                # 打开页面
-                if not self.simulator.open_page():
-                    print(f"✗ {date_str} 页面打开失败，跳过")
-                    self.simulator.close_browser()
+                # 检查是否已经处理过
+                if self.is_date_processed(date_str):
+                    print(f"⚠ {date_str} 已经处理过，跳过")
+                    processed_dates += 1
                     continue
                 
-                # 处理当前日期
-                doc_count = self.process_date(date_str)
-                total_documents += doc_count
-                processed_dates += 1
+                success = False
+                try:
+                    # 检查浏览器状态（必要时重建上下文）并打开首页
+                    if not self.session.prepare_date():
+                        print(f"✗ {date_str} 页面打开失败，跳过")
+                        continue
+                    
+                    # 处理当前日期
+                    doc_count = self.process_date(date_str)
+                    total_documents += doc_count
+                    processed_dates += 1
+                    success = True
+                    
+                    print(f"✓ {date_str} 处理完成，收集到 {doc_count} 个文档")
+                    
+                except Exception as e:
+                    print(f"✗ 处理日期 {date_str} 时出错: {str(e)}")
+                finally:
+                    # 保存Cookie和本地存储，重建上下文时恢复
+                    self.session.finish_date(success)
                 
-                print(f"✓ {date_str} 处理完成，收集到 {doc_count} 个文档")
+                # 每处理10个日期显示一次统计
+                if processed_dates % 10 == 0:
+                    print(f"\n--- 阶段统计 ---")
+                    print(f"已处理日期: {processed_dates}/{total_dates}")
+                    print(f"累计收集文档: {total_documents}")
+                    print(f"平均每日文档: {total_documents/processed_dates:.1f}")
+                    print(f"资源拦截: {self.simulator.route_policy.summary()}")
                 
-            except Exception as e:
-                print(f"✗ 处理日期 {date_str} 时出错: {str(e)}")
-            finally:
-                # 关闭当前日期的浏览器
-                try:
-                    self.simulator.close_browser()
-                    print(f"✓ 关闭 {date_str} 的浏览器进程")
-                except:
-                    pass
-            
-            # 每处理10个日期显示一次统计
-            if processed_dates % 10 == 0:
-                print(f"\n--- 阶段统计 ---")
-                print(f"已处理日期: {processed_dates}/{total_dates}")
-                print(f"累计收集文档: {total_documents}")
-                print(f"平均每日文档: {total_documents/processed_dates:.1f}")
-            
-            # 每天后极致延时
-            self.simulator.extreme_random_sleep(180, 600)
-            self.simulator.simulate_extreme_human_behavior()
+                # 每天后极致延时
+                self.simulator.extreme_random_sleep(180, 600)
+                self.simulator.simulate_extreme_human_behavior()
+        finally:
+            self.session.close()
+            self.search_index.close()  # 等待后台的索引建立和合并完成
         
         # 最终统计
         print(f"\n{'='*80}")
@@ -391,6 +546,11 @@ class ShanghaiDocumentCollector:
         print(f"总收集文档数: {total_documents}")
         if processed_dates > 0:
             print(f"平均每日文档: {total_documents/processed_dates:.1f}")
+        print(f"资源拦截: {self.simulator.route_policy.summary()}")
+        for line in self.simulator.selector_cache.summary():
+            print(f"选择器缓存 {line}")
+        for line in self.simulator.latency.summary():
+            print(f"操作耗时 {line}")
         print(f"URL文件保存位置: {self.url_folder}")
         print(f"文书文件保存位置: {self.doc_folder}")
         
@@ -419,8 +579,12 @@ def main():
         print("  pip install beautifulsoup4")
         return False
     
+    # 询问是否归档原始网页
+    archive_input = input("\n是否归档原始网页？(y/n，默认y；选n时在页面内提取正文，内存占用更低): ").strip()
+    extract_mode = 'page' if archive_input.lower() == 'n' else 'html'
+    
     # 创建收集器实例
-    collector = ShanghaiDocumentCollector()
+    collector = ShanghaiDocumentCollector(extract_mode)
     
     # 询问收集年限
     years_input = input("\n请输入要收集的年限 (1-5年，默认3年): ").strip()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文书docId提取
+裁判文书网的文书URL形如 .../index.html?docId=xxx，docId是文书的稳定标识
+"""
+
+import re
+import hashlib
+from urllib.parse import unquote
+
+# docId本身含有"+"和"/"，因此只取到下一个"&"或"#"为止
+DOC_ID_PATTERN = re.compile(r'[?&]docId=([^&#]+)')
+
+
+def extract_doc_id(url):
+    """
+    从文书URL中提取docId
+    
+    docId中的"+"是原文字符而不是空格，因此只做百分号解码（unquote），
+    不能用unquote_plus。URL中没有docId时，用整个URL的sha1代替。
+    
+    Args:
+        url (str): 文书URL
+        
+    Returns:
+        str: docId
+    """
+    match = DOC_ID_PATTERN.search(url)
+    if match:
+        return unquote(match.group(1))
+    return 'url-' + hashlib.sha1(url.encode('utf-8')).hexdigest()
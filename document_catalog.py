@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 文书目录
+功能：把 文书/<日期>/ 下的txt文书（文件头 + 正文）载入SQLite，用FTS5建立全文索引，
+按docId增量更新，检索结果按相关度排序并附带摘要
+
+中文分词：文本先做NFKC规范化并转小写，汉字、数字、字母组成的连续串切成重叠的二元组
+（"合同纠纷" -> 合同 同纠 纠纷），每个串末尾再加上最后一个字的单字（纠纷 之后为 纷），
+标点和空白丢弃；查询词按同样方式切分后作为短语检索，因此两个字以上的片段都能命中（忽略标点），
+单字查询按前缀匹配，串中任何位置的字都能命中，且二元组比单字的倒排表短得多。
+"""
+
+import os
+import re
+import sys
+import zlib
+import sqlite3
+import argparse
+import unicodedata
+
+from doc_id import extract_doc_id
+
+# 文书文件头字段
+HEADER_FIELDS = {
+    '文档标题': 'title',
+    '案件编号': 'case_number',
+    '案由': 'case_reason',
+    '收集时间': 'collected_at',
+    '原始URL': 'url',
+}
+
+# 汉字（含日期中的"〇"）、数字、字母组成的连续串，其余字符（标点、空白）作为分隔
+RUN_PATTERN = re.compile(r'[\u3007\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff0-9a-z]+')
+# 日期中的"〇"常写成形近的"○"（U+25CB）或"◯"（U+25EF），索引和查询前统一为"〇"
+ZERO_VARIANTS = str.maketrans({'\u25cb': '\u3007', '\u25ef': '\u3007'})
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL UNIQUE,
+    date TEXT,
+    title TEXT,
+    case_number TEXT,
+    case_reason TEXT,
+    collected_at TEXT,
+    url TEXT,
+    file_path TEXT,
+    mtime REAL,
+    size INTEGER,
+    body BLOB
+);
+CREATE INDEX IF NOT EXISTS documents_file ON documents(file_path);
+CREATE INDEX IF NOT EXISTS documents_date ON documents(date);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    title, case_number, case_reason, body,
+    content='', tokenize='unicode61 remove_diacritics 0'
+);
+"""
+
+# bm25各列权重：标题、案号、案由命中比正文命中更相关
+BM25_WEIGHTS = (10.0, 8.0, 5.0, 1.0)
+
+
+def parse_document_text(text):
+    """
+    解析文书txt：开头的"# 字段: 值"文件头和之后的正文
+    
+    Args:
+        text (str): 文件内容
+    
+    Returns:
+        dict: title、case_number、case_reason、collected_at、url（缺失时为空字符串）和body
+    """
+    document = {field: '' for field in HEADER_FIELDS.values()}
+    lines = text.split('\n')
+    i = 0
+    while i < len(lines) and lines[i].startswith('# '):
+        name, sep, value = lines[i][2:].partition(':')
+        if sep and name.strip() in HEADER_FIELDS:
+            document[HEADER_FIELDS[name.strip()]] = value.strip()
+        i += 1
+    document['body'] = '\n'.join(lines[i:]).strip('\n')
+    return document
+
+
+def split_runs(text):
+    """规范化（见normalize_text）后，取出汉字、数字、字母组成的连续串"""
+    return RUN_PATTERN.findall(normalize_text(text))
+
+
+def bigrams(run):
+    """把一个连续串切成重叠二元组，只有一个字时保留单字"""
+    return [run[i:i + 2] for i in range(len(run) - 1)] if len(run) > 1 else [run]
+
+
+def run_tokens(run):
+    """
+    一个连续串的索引词：重叠二元组，再加上最后一个字的单字
+    
+    串中每个字都是某个词的第一个字，单字查询按前缀匹配即可命中串尾的字。
+    """
+    tokens = bigrams(run)
+    if len(run) > 1:
+        tokens.append(run[-1])
+    return tokens
+
+
+def query_tokens(runs):
+    """
+    查询短语的词序列：与索引时相同，但最后一个串不加末尾单字（短语可以在串中间结束）
+    
+    Args:
+        runs (list): split_runs()切分出的连续串
+    """
+    return [token for run in runs[:-1] for token in run_tokens(run)] + bigrams(runs[-1])
+
+
+def tokenize(text):
+    """
+    切分为索引用的词：每个连续串切成重叠二元组并加上末尾单字（见run_tokens）
+    
+    Returns:
+        list: 词列表
+    """
+    return [token for run in split_runs(text) for token in run_tokens(run)]
+
+
+def index_text(text):
+    """供FTS5（unicode61分词）索引的文本：各词以空格分隔"""
+    return ' '.join(tokenize(text))
+
+
+def build_match_query(query):
+    """
+    把用户查询转换为FTS5 MATCH表达式：按空白分成多个词，各词切分后作为短语，词之间为AND
+    
+    查询词两端被标点隔开的单字无法用二元组表示：末尾的单字按前缀匹配；
+    开头的单字从短语中去掉，由调用方对候选结果逐篇核对原文。
+    只有一个字的查询词按前缀匹配，索引中每个串都有末尾单字，串中任何位置都能命中。
+    
+    Returns:
+        tuple: (MATCH表达式, 需要核对原文的查询词列表)，查询中没有可检索的字符时表达式为None
+    """
+    phrases = []
+    verify_terms = []
+    for term in query.split():
+        runs = split_runs(term)
+        if len(runs) > 1 and len(runs[0]) == 1:
+            runs = runs[1:]
+            verify_terms.append(term)
+        if not runs:
+            continue
+        phrase = '"' + ' '.join(query_tokens(runs)) + '"'
+        if len(runs[-1]) == 1:
+            phrase += '*'
+        phrases.append(phrase)
+    return (' AND '.join(phrases) if phrases else None), verify_terms
+
+
+def normalize_text(text):
+    """NFKC规范化、转小写并把"○"等统一为"〇"，用于切分和核对原文"""
+    return unicodedata.normalize('NFKC', text).lower().translate(ZERO_VARIANTS)
+
+
+def make_snippet(body, query, width=40):
+    """
+    在正文中截取第一个查询词附近的片段，命中处用【】标出
+    
+    Args:
+        body (str): 正文
+        query (str): 用户查询
+        width (int): 命中处前后保留的字数
+    
+    Returns:
+        str: 摘要
+    """
+    normalized = unicodedata.normalize('NFKC', body)
+    searchable = normalize_text(normalized)  # 逐字对应，命中位置在normalized中同样适用
+    for term in query.split():
+        term = unicodedata.normalize('NFKC', term)
+        pos = searchable.find(normalize_text(term))
+        if pos < 0:
+            continue
+        start = max(pos - width, 0)
+        end = min(pos + len(term) + width, len(normalized))
+        snippet = (normalized[start:pos] + '【' + normalized[pos:pos + len(term)] + '】'
+                   + normalized[pos + len(term):end])
+        snippet = ' '.join(snippet.split())
+        return ('…' if start > 0 else '') + snippet + ('…' if end < len(normalized) else '')
+    return ' '.join(normalized[:width * 2].split())
+
+
+class DocumentCatalog:
+    """文书目录：documents表保存元数据和压缩正文，documents_fts为无内容的FTS5索引"""
+    
+    def __init__(self, db_path='文书目录.db'):
+        """
+        打开（或创建）目录
+        
+        Args:
+            db_path (str): SQLite数据库路径
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+    
+    def _fts_values(self, document):
+        return (index_text(document['title']), index_text(document['case_number']),
+                index_text(document['case_reason']), index_text(document['body']))
+    
+    def upsert(self, document, date_str='', file_path='', mtime=None, size=None):
+        """
+        按docId插入或更新一篇文书
+        
+        Args:
+            document (dict): parse_document_text的结果，docId从url中提取
+            date_str (str): 日期
+            file_path (str): 文件路径
+            mtime (float): 文件修改时间，用于增量索引时跳过未变化的文件
+            size (int): 文件大小
+        
+        Returns:
+            str: docId
+        """
+        doc_id = extract_doc_id(document['url']) if document['url'] else 'file-' + file_path
+        body = zlib.compress(document['body'].encode('utf-8'))
+        with self.conn:
+            row = self.conn.execute('SELECT id, title, case_number, case_reason, body FROM documents '
+                                    'WHERE doc_id = ?', (doc_id,)).fetchone()
+            if row is not None:
+                # 无内容的FTS5表删除时需要提供原来索引的文本
+                rowid, title, case_number, case_reason, old_body = row
+                old = {'title': title, 'case_number': case_number, 'case_reason': case_reason,
+                       'body': zlib.decompress(old_body).decode('utf-8')}
+                self.conn.execute(
+                    "INSERT INTO documents_fts (documents_fts, rowid, title, case_number, case_reason, body) "
+                    "VALUES ('delete', ?, ?, ?, ?, ?)", (rowid,) + self._fts_values(old))
+                self.conn.execute(
+                    'UPDATE documents SET date = ?, title = ?, case_number = ?, case_reason = ?, '
+                    'collected_at = ?, url = ?, file_path = ?, mtime = ?, size = ?, body = ? WHERE id = ?',
+                    (date_str, document['title'], document['case_number'], document['case_reason'],
+                     document['collected_at'], document['url'], file_path, mtime, size, body, rowid))
+            else:
+                rowid = self.conn.execute(
+                    'INSERT INTO documents (doc_id, date, title, case_number, case_reason, collected_at, '
+                    'url, file_path, mtime, size, body) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (doc_id, date_str, document['title'], document['case_number'], document['case_reason'],
+                     document['collected_at'], document['url'], file_path, mtime, size, body)).lastrowid
+            self.conn.execute(
+                'INSERT INTO documents_fts (rowid, title, case_number, case_reason, body) VALUES (?, ?, ?, ?, ?)',
+                (rowid,) + self._fts_values(document))
+        return doc_id
+    
+    def upsert_file(self, file_path, date_str=None):
+        """
+        读取并索引一个文书文件
+        
+        Args:
+            file_path (str): txt文件路径
+            date_str (str): 日期，默认取所在文件夹名
+        
+        Returns:
+            str: docId
+        """
+        stat = os.stat(file_path)
+        with open(file_path, 'r', encoding='utf-8') as f:
+            document = parse_document_text(f.read())
+        if date_str is None:
+            date_str = os.path.basename(os.path.dirname(os.path.abspath(file_path)))
+        return self.upsert(document, date_str, file_path, stat.st_mtime, stat.st_size)
+    
+    def index_directory(self, root='文书'):
+        """
+        增量索引 文书/<日期>/ 下的全部txt，修改时间和大小都没变的文件跳过
+        
+        Args:
+            root (str): 文书根目录
+        
+        Returns:
+            tuple: (新索引或更新的数量, 跳过的数量)
+        """
+        known = {path: (mtime, size) for path, mtime, size in
+                 self.conn.execute('SELECT file_path, mtime, size FROM documents')}
+        indexed = skipped = 0
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                if not filename.endswith('.txt'):
+                    continue
+                file_path = os.path.join(dirpath, filename)
+                stat = os.stat(file_path)
+                if known.get(file_path) == (stat.st_mtime, stat.st_size):
+                    skipped += 1
+                    continue
+                try:
+                    self.upsert_file(file_path)
+                    indexed += 1
+                except (OSError, UnicodeDecodeError) as e:
+                    print(f"⚠ 跳过无法读取的文件 {file_path}: {str(e)}")
+        print(f"✓ 目录索引完成: 新增或更新 {indexed} 篇，未变化跳过 {skipped} 篇")
+        return indexed, skipped
+    
+    def search(self, query, limit=20, date_from=None, date_to=None):
+        """
+        全文检索
+        
+        Args:
+            query (str): 查询，空白分隔的多个词需同时命中
+            limit (int): 最多返回条数
+            date_from (str): 起始日期（含）
+            date_to (str): 结束日期（含）
+        
+        Returns:
+            list: 按相关度排序的dict，含doc_id、date、title、case_number、case_reason、url、file_path、score、snippet
+        """
+        match, verify_terms = build_match_query(query)
+        if match is None:
+            return []
+        verify_terms = [normalize_text(term) for term in verify_terms]
+        # 先只在FTS表中排序取前limit条，再回表取元数据和正文，避免把所有命中的正文带进排序
+        ranked = ('SELECT rowid, bm25(documents_fts, ' + ', '.join(str(w) for w in BM25_WEIGHTS) + ') AS score '
+                  'FROM documents_fts WHERE documents_fts MATCH ?')
+        params = [match]
+        if date_from or date_to:
+            ranked += ' AND rowid IN (SELECT id FROM documents WHERE date >= ? AND date <= ?)'
+            params += [date_from or '', date_to or '\uffff']
+        ranked += ' ORDER BY score'
+        if not verify_terms:
+            ranked += ' LIMIT ?'
+            params.append(limit)
+        sql = ('SELECT d.doc_id, d.date, d.title, d.case_number, d.case_reason, d.url, d.file_path, d.body, f.score '
+               f'FROM ({ranked}) f JOIN documents d ON d.id = f.rowid ORDER BY f.score')
+        
+        hits = []
+        for doc_id, date, title, case_number, case_reason, url, file_path, body, score in \
+                self.conn.execute(sql, params):
+            body = zlib.decompress(body).decode('utf-8')
+            if verify_terms:
+                text = normalize_text('\n'.join((title, case_number, case_reason, body)))
+                if not all(term in text for term in verify_terms):
+                    continue
+            hits.append({
+                'doc_id': doc_id,
+                'date': date,
+                'title': title,
+                'case_number': case_number,
+                'case_reason': case_reason,
+                'url': url,
+                'file_path': file_path,
+                'score': -score,
+                'snippet': make_snippet(body, query),
+            })
+            if len(hits) >= limit:
+                break
+        return hits
+    
+    def count(self):
+        """已索引的文书数"""
+        return self.conn.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+    
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
+
+
+def main(argv=None):
+    """命令行入口：python -m document_catalog index [目录] / search <查询>"""
+    parser = argparse.ArgumentParser(prog='python -m document_catalog', description='文书目录与全文检索')
+    parser.add_argument('--db', default='文书目录.db', help='目录数据库（默认: 文书目录.db）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    index_parser = subparsers.add_parser('index', help='增量索引文书目录')
+    index_parser.add_argument('root', nargs='?', default='文书', help='文书根目录（默认: 文书）')
+    search_parser = subparsers.add_parser('search', help='全文检索')
+    search_parser.add_argument('query', help='查询，多个词用空格分隔')
+    search_parser.add_argument('--limit', type=int, default=20, help='最多返回条数（默认: 20）')
+    search_parser.add_argument('--from', dest='date_from', help='起始日期')
+    search_parser.add_argument('--to', dest='date_to', help='结束日期')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    
+    catalog = DocumentCatalog(args.db)
+    try:
+        if args.command == 'index':
+            if not os.path.isdir(args.root):
+                print(f"✗ 目录不存在: {args.root}")
+                return False
+            catalog.index_directory(args.root)
+        else:
+            hits = catalog.search(args.query, args.limit, args.date_from, args.date_to)
+            print(f"共 {len(hits)} 条结果:")
+            for i, hit in enumerate(hits):
+                print(f"{i+1}. [{hit['date']}] {hit['title']} {hit['case_number']}")
+                print(f"   {hit['snippet']}")
+                print(f"   {hit['file_path']}")
+        return True
+    finally:
+        catalog.close()
+
+
+if __name__ == "__main__":
+    main()
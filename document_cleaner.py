@@ -1,12 +1,328 @@
 import re
+import sys
+import argparse
+import datetime
+import hashlib
+import shutil
+import codecs
+from collections import deque
+from html.parser import HTMLParser
+from html.entities import name2codepoint
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from bs4 import BeautifulSoup
+from bs4.dammit import EntitySubstitution
+from lxml import etree
+from raw_archive import RawHtmlArchive, SEGMENT_SUFFIX
 import os
 
 class DocumentCleaner:
     """法律文档数据清洗器 - 提取完整文本内容"""
     
+    # BeautifulSoup不计入get_text的字符串容器标签（脚本、样式、模板、注音）
+    _SKIPPED_STRING_TAGS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+    # BeautifulSoup保留原样空白的标签及其视为空白的字符
+    _PRESERVE_WHITESPACE_TAGS = frozenset(['pre', 'textarea'])
+    _ASCII_SPACES = ' \n\t\x0c\r'
+    
+    # 段落格式化规则，类加载时编译为一个正则，每行一次match完成分类。
+    # 分支顺序即规则优先级：
+    #   block: 含法院名称/文书类型的标题行，或整行为案件编号
+    #   lead:  以原告、被告、本院认为等开头的段落，或含法官信息、中文日期的行
+    _LINE_RULES = re.compile(
+        r'(?P<block>(?=.*?(?:人民法院|裁定书|判决书|决定书))|\（\d{4}\）.*号$)'
+        r'|(?P<lead>原告|被告|本院认为|判决如下|裁定如下'
+        r'|(?=.*?(?:审判员|审判长|书记员))'
+        r'|(?=.*?[一二三四五六七八九十○〇]{4}年.*[一二三四五六七八九十○〇]月.*[一二三四五六七八九十○〇]日))'
+    )
+    # lxml与html.parser解码结果不同的写法：CDATA、不在HTML4实体表中或缺少分号的
+    # 命名引用、格式不完整的数字引用
+    _SAFE_ENTITY_NAMES = (set(name2codepoint) - {'lang', 'rang'}) | {'apos'}
+    _UNSAFE_REFERENCE_PATTERN = re.compile(
+        r'<!\[CDATA\[|&(?!(?:' + '|'.join(sorted(_SAFE_ENTITY_NAMES)) + r');'
+        r'|#[0-9]+;|#[xX][0-9a-fA-F]+;)(?:#|[a-zA-Z])'
+    )
+    _NUMERIC_REFERENCE_PATTERN = re.compile(r'&#(?:([0-9]+)|[xX]([0-9a-fA-F]+));')
+    # lxml会丢掉的原始控制字符和非字符（PDF转换的正文中可能有换页符等），html.parser原样保留
+    _RAW_CONTROL_PATTERN = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+    _CASE_NUMBER_PATTERN = re.compile(r'\（\d{4}\）.*?号')
+    _CASE_REASON_PATTERN = re.compile(r'案由：')
+    
+    # 页面内提取：在浏览器中取出PDF_pox的文本片段和案由原文，只把这些传回Python。
+    # 模拟BeautifulSoup(page.content(), 'html.parser')对序列化结果的处理：
+    # 相邻文本节点合并、纯ASCII空白折叠、跳过脚本/样式/模板/注音容器内的文本、
+    # 不进入空元素（序列化时不输出其子节点）、Tag.string的取法。
+    # 原样序列化的元素（noscript等）或template中的内容可能被html.parser解析成
+    # 不同的结构，遇到时返回fallback，由调用方改用整页HTML。
+    PAGE_EXTRACT_JS = r"""
+() => {
+    const SKIP = new Set(['script', 'style', 'template', 'rt', 'rp']);
+    const PRESERVE = new Set(['pre', 'textarea']);
+    const VOID = new Set(['area', 'base', 'basefont', 'bgsound', 'br', 'col', 'embed', 'frame', 'hr',
+                          'img', 'input', 'keygen', 'link', 'meta', 'param', 'source', 'track', 'wbr']);
+    const RAW = 'xmp, iframe, noembed, noframes, noscript, plaintext';
+    // BeautifulSoup视为空元素、但HTML5中可以有子节点的标签
+    const BS4_EMPTY = 'command, image, isindex, menuitem, nextid, spacer';
+    const RISKY_MARKUP = /PDF_pox|gaiyao_center|<\s*\/?\s*(pre|textarea|script|style|template|rt|rp)\b|<[!?]|&#/i;
+    const BLANK = /^[ \n\t\f\r]*$/;
+    const nameOf = (node) => (node.localName || '').toLowerCase();
+    const findDiv = (cls) => {
+        for (const el of document.getElementsByTagName('div')) {
+            if (el.classList.contains(cls)) return el;
+        }
+        return null;
+    };
+    const context = (node) => {
+        let skip = false, preserve = false;
+        for (let el = node; el; el = el.parentElement) {
+            if (SKIP.has(nameOf(el))) skip = true;
+            if (PRESERVE.has(nameOf(el))) preserve = true;
+        }
+        return {skip, preserve};
+    };
+    const collapse = (text, preserve) => (preserve || !BLANK.test(text)) ? text : (text.includes('\n') ? '\n' : ' ');
+    // 按文档顺序取出元素内的文本（与get_text一致）
+    const strings = (root) => {
+        const out = [];
+        const walk = (node, preserve) => {
+            let pending = null;
+            for (let child = node.firstChild; child; child = child.nextSibling) {
+                if (child.nodeType === 3) {
+                    if (child.data) pending = (pending === null ? '' : pending) + child.data;
+                    continue;
+                }
+                if (pending !== null) {
+                    out.push(collapse(pending, preserve));
+                    pending = null;
+                }
+                const name = nameOf(child);
+                if (child.nodeType === 1 && !SKIP.has(name) && !VOID.has(name)) {
+                    walk(child, preserve || PRESERVE.has(name));
+                }
+            }
+            if (pending !== null) out.push(collapse(pending, preserve));
+        };
+        const ctx = context(root);
+        if (!ctx.skip) walk(root, ctx.preserve);
+        return out;
+    };
+    // Tag.string：唯一子节点为文本（含注释）时返回它，为标签时递归
+    const singleString = (el) => {
+        while (true) {
+            if (VOID.has(nameOf(el))) return null;
+            const nodes = [];
+            for (let child = el.firstChild; child; child = child.nextSibling) {
+                if (child.nodeType === 3) {
+                    if (!child.data) continue;
+                    if (nodes.length && typeof nodes[nodes.length - 1] === 'string') {
+                        nodes[nodes.length - 1] += child.data;
+                        continue;
+                    }
+                    nodes.push(child.data);
+                } else if (child.nodeType === 1 || child.nodeType === 8) {
+                    nodes.push(child);
+                }
+                if (nodes.length > 1) return null;
+            }
+            if (nodes.length !== 1) return null;
+            const node = nodes[0];
+            if (typeof node === 'string') return collapse(node, context(el).preserve);
+            if (node.nodeType === 8) return collapse(node.data, context(el).preserve);
+            el = node;
+        }
+    };
+
+    for (const el of document.querySelectorAll(RAW)) {
+        if (RISKY_MARKUP.test(el.textContent)) return {fallback: true};
+    }
+    for (const el of document.querySelectorAll('template')) {
+        if (/PDF_pox|gaiyao_center/.test(el.innerHTML)) return {fallback: true};
+    }
+    const pdfBox = findDiv('PDF_pox');
+    const section = findDiv('gaiyao_center');
+    for (const root of [pdfBox, section]) {
+        if (root && root.querySelector(RAW + ', template, ' + BS4_EMPTY)) return {fallback: true};
+    }
+
+    let caseReason = null;
+    if (section) {
+        for (const h4 of section.getElementsByTagName('h4')) {
+            const h4String = singleString(h4);
+            if (h4String !== null && h4String.includes('案由：')) {
+                const reasonA = h4.getElementsByTagName('a')[0];
+                if (reasonA) caseReason = strings(reasonA).join('');
+                break;
+            }
+        }
+    }
+    return {fallback: false, strings: pdfBox ? strings(pdfBox) : null, caseReason};
+}
+"""
+    
     def __init__(self):
-        pass
+        self._parser = etree.HTMLParser(encoding='utf-8', huge_tree=True)
+    
+    def process(self, html_content):
+        """
+        单次解析HTML，同时得到清洗后的文本和文档信息
+        
+        使用lxml解析一次，输出与clean_document_to_text、extract_document_info
+        分别调用的结果完全一致。lxml遇到标签错配时会丢弃多余的结束标签，
+        少数实体和字符引用的解码也与html.parser不同，此时退回原有的
+        BeautifulSoup流程。
+        
+        Args:
+            html_content (str): HTML源代码
+            
+        Returns:
+            tuple: (清洗后的完整文本内容, 包含案件编号、案由等信息的dict)
+        """
+        info = {}
+        root = self._parse_html(html_content)
+        if root is None:
+            return "未找到文档内容", info
+        if self._has_tag_mismatch() or self._has_unsafe_reference(html_content):
+            return self.clean_document_to_text(html_content), self.extract_document_info(html_content)
+        
+        pdf_box = self._find_div_by_class(root, 'PDF_pox')
+        if pdf_box is not None:
+            strings = list(self._iter_strings(pdf_box))
+            
+            # 查找案件编号（与get_text()一致：不加分隔符、不去空白）
+            case_number_match = self._CASE_NUMBER_PATTERN.search(''.join(strings))
+            if case_number_match:
+                info['case_number'] = case_number_match.group()
+        
+        # 从概要区域提取案由
+        basic_info_section = self._find_div_by_class(root, 'gaiyao_center')
+        if basic_info_section is not None:
+            for h4 in basic_info_section.iter('h4'):
+                h4_string = self._single_string(h4)
+                if h4_string is not None and self._CASE_REASON_PATTERN.search(h4_string):
+                    reason_a = next(h4.iter('a'), None)
+                    if reason_a is not None:
+                        info['case_reason'] = ''.join(self._iter_strings(reason_a)).strip()
+                    break
+        
+        if pdf_box is None:
+            return "未找到文档内容", info
+        
+        # 与get_text(separator='\n', strip=True)后再_clean_text一致
+        return '\n'.join(self._format_lines(self._clean_lines(strings))), info
+    
+    def process_extracted(self, payload):
+        """
+        由页面内提取的结果得到清洗后的文本和文档信息
+        
+        payload为在文书页面中执行PAGE_EXTRACT_JS的返回值，输出与对page.content()
+        调用process()一致，但整页HTML不必传回Python。
+        
+        Args:
+            payload (dict): PAGE_EXTRACT_JS的返回值
+            
+        Returns:
+            tuple: (清洗后的文本, 文档信息)；页面需要改用整页HTML时返回None
+        """
+        if payload.get('fallback'):
+            return None
+        
+        info = {}
+        if payload.get('caseReason') is not None:
+            info['case_reason'] = payload['caseReason'].strip()
+        strings = payload.get('strings')
+        if strings is None:
+            return "未找到文档内容", info
+        
+        case_number_match = self._CASE_NUMBER_PATTERN.search(''.join(strings))
+        if case_number_match:
+            info['case_number'] = case_number_match.group()
+        return '\n'.join(self._format_lines(self._clean_lines(strings))), info
+    
+    def stream(self, chunks):
+        """
+        流式清洗：增量解析HTML，逐行产出清洗后的正文
+        
+        与process()的输出一致，但不在内存中保留整页HTML和中间字符串，
+        适合几MB的大文书。
+        
+        Args:
+            chunks (iterable): HTML内容分块，str或utf-8编码的bytes
+            
+        Returns:
+            DocumentStream: 可迭代的文本行；迭代结束后found、info可用
+        """
+        return DocumentStream(self, chunks)
+    
+    def _parse_html(self, html_content):
+        """用lxml解析HTML，返回根元素；内容为空时返回None"""
+        if isinstance(html_content, str):
+            html_content = html_content.encode('utf-8')
+        try:
+            return etree.fromstring(html_content, self._parser)
+        except (etree.ParserError, etree.XMLSyntaxError):
+            return None
+    
+    def _has_tag_mismatch(self):
+        """检查上一次lxml解析是否出现标签错配"""
+        return any(error.type == etree.ErrorTypes.ERR_TAG_NAME_MISMATCH
+                   for error in self._parser.error_log)
+    
+    def _has_unsafe_reference(self, html_content):
+        """检查HTML中是否有lxml与html.parser解码不一致的实体、字符引用、CDATA或原始控制字符"""
+        if self._UNSAFE_REFERENCE_PATTERN.search(html_content) or self._RAW_CONTROL_PATTERN.search(html_content):
+            return True
+        for match in self._NUMERIC_REFERENCE_PATTERN.finditer(html_content):
+            code = int(match.group(1)) if match.group(1) else int(match.group(2), 16)
+            # 控制字符、windows-1252映射区、代理区、非字符及超出Unicode范围的码位
+            if ((code < 32 and code not in (9, 10, 13)) or 128 <= code <= 159
+                    or 0xD800 <= code <= 0xDFFF or code in (0xFFFE, 0xFFFF) or code > 0x10FFFF):
+                return True
+        return False
+    
+    def _find_div_by_class(self, root, class_name):
+        """按文档顺序查找第一个class中包含class_name的div"""
+        for div in root.iter('div'):
+            if class_name in (div.get('class') or '').split():
+                return div
+        return None
+    
+    def _iter_strings(self, element, preserve=False):
+        """按文档顺序产出元素内的文本片段，跳过注释及脚本、样式等容器内的文本"""
+        if element.tag in self._SKIPPED_STRING_TAGS:
+            return
+        inner_preserve = preserve or element.tag in self._PRESERVE_WHITESPACE_TAGS
+        if element.text:
+            yield self._collapse_blank(element.text, inner_preserve)
+        for child in element:
+            # 注释、处理指令的tag不是字符串，只保留其后的文本
+            if isinstance(child.tag, str):
+                yield from self._iter_strings(child, inner_preserve)
+            if child.tail:
+                yield self._collapse_blank(child.tail, inner_preserve)
+    
+    def _collapse_blank(self, text, preserve):
+        """与BeautifulSoup一致：纯ASCII空白的文本折叠为单个换行或空格"""
+        if preserve or text.strip(self._ASCII_SPACES):
+            return text
+        return '\n' if '\n' in text else ' '
+    
+    def _single_string(self, element):
+        """等价于BeautifulSoup的Tag.string：仅有唯一子节点时返回其文本，否则返回None"""
+        while True:
+            nodes = [element.text] if element.text else []
+            for child in element:
+                nodes.append(child)
+                if child.tail:
+                    nodes.append(child.tail)
+                if len(nodes) > 1:
+                    return None
+            if len(nodes) != 1:
+                return None
+            node = nodes[0]
+            if isinstance(node, str):
+                return node
+            if not isinstance(node.tag, str):
+                return node.text
+            element = node
     
     def clean_document_to_text(self, html_content):
         """
@@ -43,19 +359,23 @@ class DocumentCleaner:
         Returns:
             str: 清洗后的文本
         """
-        # 去除多余的空白行
-        text = re.sub(r'\n\s*\n', '\n', text)
-        
-        # 去除行首行尾的空白
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        
-        # 重新组合文本
-        cleaned_text = '\n'.join(lines)
-        
-        # 添加适当的分段
-        cleaned_text = self._format_paragraphs(cleaned_text)
+        return '\n'.join(self._format_lines(self._clean_lines([text])))
+    
+    def _clean_lines(self, strings):
+        """
+        逐行去除空白行和行首行尾空白
         
-        return cleaned_text
+        Args:
+            strings (iterable): 文本片段，可含换行
+            
+        Yields:
+            str: 非空的文本行
+        """
+        for text in strings:
+            for line in text.split('\n'):
+                line = line.strip()
+                if line:
+                    yield line
     
     def _format_paragraphs(self, text):
         """
@@ -67,41 +387,55 @@ class DocumentCleaner:
         Returns:
             str: 格式化后的文本
         """
-        lines = text.split('\n')
-        formatted_lines = []
+        return '\n'.join(self._format_lines(text.split('\n')))
+    
+    def _format_lines(self, lines):
+        """
+        逐行添加适当的分段空行
         
-        for line in lines:
-            # 如果是标题行（包含法院名称、文书类型等），前后加空行
-            if any(keyword in line for keyword in ['人民法院', '裁定书', '判决书', '决定书']):
-                if formatted_lines and formatted_lines[-1] != '':
-                    formatted_lines.append('')
-                formatted_lines.append(line)
-                formatted_lines.append('')
-            
-            # 如果是案件编号，前后加空行
-            elif re.match(r'^\（\d{4}\）.*号$', line):
-                if formatted_lines and formatted_lines[-1] != '':
-                    formatted_lines.append('')
-                formatted_lines.append(line)
-                formatted_lines.append('')
+        Args:
+            lines (iterable): 文本行
             
-            # 如果是重要的开始段落，前面加空行
-            elif any(line.startswith(keyword) for keyword in ['原告', '被告', '本院认为', '判决如下', '裁定如下']):
-                if formatted_lines and formatted_lines[-1] != '':
-                    formatted_lines.append('')
-                formatted_lines.append(line)
+        Yields:
+            str: 格式化后的行（含插入的空行）
+        """
+        last_line = None
+        
+        for line in lines:
+            rule = self._LINE_RULES.match(line)
             
-            # 如果是法官信息和日期，前面加空行
-            elif any(keyword in line for keyword in ['审判员', '审判长', '书记员']) or re.search(r'[一二三四五六七八九十○〇]{4}年.*[一二三四五六七八九十○〇]月.*[一二三四五六七八九十○〇]日', line):
-                if formatted_lines and formatted_lines[-1] != '':
-                    formatted_lines.append('')
-                formatted_lines.append(line)
+            # 标题行、案件编号、重要的开始段落、法官信息和日期，前面加空行
+            if rule and last_line:
+                yield ''
+            yield line
+            last_line = line
             
-            # 普通内容行
-            else:
-                formatted_lines.append(line)
+            # 标题行（法院名称、文书类型等）和案件编号，后面也加空行
+            if rule and rule.lastgroup == 'block':
+                yield ''
+                last_line = ''
+    
+    def format_document(self, title, case_number, case_reason, collected_at, url, cleaned_text):
+        """
+        生成文书txt的完整内容（文件头 + 正文），与文书/<日期>/下的文件格式一致
         
-        return '\n'.join(formatted_lines)
+        Args:
+            title (str): 文档标题
+            case_number (str): 案件编号
+            case_reason (str): 案由
+            collected_at (str): 收集时间
+            url (str): 原始URL
+            cleaned_text (str): 清洗后的正文
+            
+        Returns:
+            str: 文件内容
+        """
+        return (f"# 文档标题: {title}\n"
+                f"# 案件编号: {case_number}\n"
+                f"# 案由: {case_reason}\n"
+                f"# 收集时间: {collected_at}\n"
+                f"# 原始URL: {url}\n\n"
+                f"{cleaned_text}")
     
     def save_to_txt(self, filename, text_content):
         """
@@ -132,14 +466,14 @@ class DocumentCleaner:
         pdf_box = soup.find('div', class_='PDF_pox')
         if pdf_box:
             # 查找案件编号
-            case_number_match = re.search(r'\（\d{4}\）.*?号', pdf_box.get_text())
+            case_number_match = self._CASE_NUMBER_PATTERN.search(pdf_box.get_text())
             if case_number_match:
                 info['case_number'] = case_number_match.group()
         
         # 从概要区域提取案由
         basic_info_section = soup.find('div', class_='gaiyao_center')
         if basic_info_section:
-            case_reason = basic_info_section.find('h4', string=re.compile(r'案由：'))
+            case_reason = basic_info_section.find('h4', string=self._CASE_REASON_PATTERN)
             if case_reason:
                 reason_a = case_reason.find('a')
                 if reason_a:
@@ -147,8 +481,610 @@ class DocumentCleaner:
         
         return info
 
-def main():
+class _StreamingDocumentParser(HTMLParser):
+    """
+    增量解析HTML，只保留PDF_pox内的文本片段和概要区域
+    
+    事件处理与BeautifulSoup的html.parser后端一致（字符串切分、空白折叠、
+    结束标签出栈规则），因此产出的文本与clean_document_to_text相同，
+    但不构建整页的文档树。
+    """
+    
+    # 案件编号的起点（与DocumentCleaner._CASE_NUMBER_PATTERN的开头一致）
+    _CASE_START_PATTERN = re.compile(r'\（\d{4}\）')
+    
+    # BeautifulSoup中不需要结束标签的空元素
+    _EMPTY_ELEMENT_TAGS = frozenset([
+        'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed',
+        'frame', 'hr', 'image', 'img', 'input', 'isindex', 'keygen', 'link',
+        'menuitem', 'meta', 'nextid', 'param', 'source', 'spacer', 'track', 'wbr'
+    ])
+    
+    def __init__(self, cleaner):
+        super().__init__(convert_charrefs=False)
+        self.cleaner = cleaner
+        self.pending = deque()        # 已完成、待清洗的PDF_pox文本片段
+        self.found = False            # 是否遇到过PDF_pox
+        self.case_number = None
+        self.summary = None           # 概要区域(gaiyao_center)的小型节点树
+        self._stack = []              # 打开的标签: [名称, 是否PDF_pox, 是否概要区域, 概要节点]
+        self._open_counter = {}
+        self._container_depth = 0     # 脚本、样式等容器标签的嵌套层数
+        self._preserve_depth = 0      # pre、textarea的嵌套层数
+        self._pdf_open = False
+        self._summary_seen = False
+        self._summary_node = None     # 当前概要区域内的节点
+        self._current_data = []
+        self._already_closed_empty_element = []
+        self._case_line = []          # 案件编号匹配用的当前行尾部
+        self._case_started = False    # 当前行是否已出现案件编号起点
+    
+    def handle_starttag(self, name, attrs, handle_empty_element=True):
+        attr_dict = {}
+        for key, value in attrs:
+            attr_dict[key] = '' if value is None else value
+        self._end_data()
+        
+        classes = attr_dict.get('class', '').split() if name == 'div' else []
+        is_pdf = not self.found and 'PDF_pox' in classes
+        is_summary = not self._summary_seen and 'gaiyao_center' in classes
+        node = None
+        if is_pdf:
+            self.found = True
+            self._pdf_open = True
+        if is_summary:
+            self._summary_seen = True
+            self.summary = node = {'name': name, 'children': []}
+        elif self._summary_node is not None:
+            node = {'name': name, 'children': []}
+            self._summary_node['children'].append(node)
+        if node is not None:
+            self._summary_node = node
+        
+        self._stack.append([name, is_pdf, is_summary, node])
+        self._open_counter[name] = self._open_counter.get(name, 0) + 1
+        if name in self.cleaner._SKIPPED_STRING_TAGS:
+            self._container_depth += 1
+        if name in self.cleaner._PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth += 1
+        
+        if name in self._EMPTY_ELEMENT_TAGS and handle_empty_element:
+            self.handle_endtag(name, check_already_closed=False)
+            self._already_closed_empty_element.append(name)
+    
+    def handle_startendtag(self, name, attrs):
+        self.handle_starttag(name, attrs, handle_empty_element=False)
+        self.handle_endtag(name)
+    
+    def handle_endtag(self, name, check_already_closed=True):
+        if check_already_closed and name in self._already_closed_empty_element:
+            self._already_closed_empty_element.remove(name)
+            return
+        self._end_data()
+        # 出栈到最近一个同名标签为止；没有同名标签时不出栈
+        while self._stack and self._open_counter.get(name):
+            if self._pop_tag() == name:
+                break
+    
+    def _pop_tag(self):
+        name, is_pdf, is_summary, node = self._stack.pop()
+        self._open_counter[name] -= 1
+        if name in self.cleaner._SKIPPED_STRING_TAGS:
+            self._container_depth -= 1
+        if name in self.cleaner._PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth -= 1
+        if is_pdf:
+            self._pdf_open = False
+            self._case_line = []
+            self._case_started = False
+        if node is not None:
+            self._summary_node = None if is_summary else self._parent_summary_node()
+        return name
+    
+    def _parent_summary_node(self):
+        for entry in reversed(self._stack):
+            if entry[3] is not None:
+                return entry[3]
+        return None
+    
+    def handle_data(self, data):
+        self._current_data.append(data)
+    
+    def handle_charref(self, name):
+        if name.startswith('x'):
+            code = int(name.lstrip('x'), 16)
+        elif name.startswith('X'):
+            code = int(name.lstrip('X'), 16)
+        else:
+            code = int(name)
+        data = None
+        if code < 256:
+            try:
+                data = bytearray([code]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(code)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or "\N{REPLACEMENT CHARACTER}")
+    
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(character if character is not None else "&%s" % name)
+    
+    def handle_comment(self, data):
+        self._end_data()
+        self.handle_data(data)
+        self._end_data('comment')
+    
+    def handle_decl(self, data):
+        self._end_data()
+        self.handle_data(data[len("DOCTYPE "):])
+        self._end_data('other')
+    
+    def unknown_decl(self, data):
+        self._end_data()
+        if data.upper().startswith('CDATA['):
+            self.handle_data(data[len('CDATA['):])
+            self._end_data('cdata')
+        else:
+            self.handle_data(data)
+            self._end_data('other')
+    
+    def handle_pi(self, data):
+        self._end_data()
+        self.handle_data(data)
+        self._end_data('other')
+    
+    def close(self):
+        super().close()
+        self._end_data()
+        while self._stack:
+            self._pop_tag()
+    
+    def _end_data(self, kind=None):
+        """一段连续文本结束，按BeautifulSoup的规则生成一个字符串节点"""
+        if not self._current_data:
+            return
+        text = ''.join(self._current_data)
+        self._current_data = []
+        if not self._preserve_depth and not text.strip(self.cleaner._ASCII_SPACES):
+            text = '\n' if '\n' in text else ' '
+        if kind is None:
+            kind = 'skip' if self._container_depth else 'text'
+        
+        if self._pdf_open and kind in ('text', 'cdata'):
+            self.pending.append(text)
+            if self.case_number is None:
+                self._search_case_number(text)
+        if self._summary_node is not None:
+            self._summary_node['children'].append((text, kind))
+    
+    def _search_case_number(self, text):
+        """
+        逐段查找案件编号，结果与在整段文本上re.search一致
+        
+        匹配不跨越换行，且同一行内最左边的"（dddd）"只要其后出现"号"即为结果，
+        因此未出现起点时只需保留末尾几个字符，出现起点后只保留起点之后的内容。
+        """
+        for k, segment in enumerate(text.split('\n')):
+            if k:
+                self._case_line = []
+                self._case_started = False
+            if self._case_started and '号' not in segment:
+                self._case_line.append(segment)
+                continue
+            line = ''.join(self._case_line) + segment
+            match = self.cleaner._CASE_NUMBER_PATTERN.search(line)
+            if match:
+                self.case_number = match.group()
+                self._case_line = []
+                return
+            start = self._CASE_START_PATTERN.search(line)
+            self._case_started = start is not None
+            self._case_line = [line[start.start():] if start else line[-5:]]
+    
+    def case_reason(self):
+        """按extract_document_info的规则从概要区域取案由"""
+        if self.summary is None:
+            return None
+        for h4 in self._iter_nodes(self.summary, 'h4'):
+            h4_string = self._node_string(h4)
+            if h4_string is not None and self.cleaner._CASE_REASON_PATTERN.search(h4_string):
+                reason_a = next(self._iter_nodes(h4, 'a', include_self=False), None)
+                if reason_a is not None:
+                    return ''.join(self._node_strings(reason_a)).strip()
+                return None
+        return None
+    
+    def _iter_nodes(self, node, name, include_self=False):
+        if include_self and node['name'] == name:
+            yield node
+        for child in node['children']:
+            if isinstance(child, dict):
+                yield from self._iter_nodes(child, name, include_self=True)
+    
+    def _node_string(self, node):
+        while True:
+            if len(node['children']) != 1:
+                return None
+            child = node['children'][0]
+            if not isinstance(child, dict):
+                return child[0]
+            node = child
+    
+    def _node_strings(self, node):
+        for child in node['children']:
+            if isinstance(child, dict):
+                yield from self._node_strings(child)
+            elif child[1] in ('text', 'cdata'):
+                yield child[0]
+
+
+class DocumentStream:
+    """
+    流式清洗单个文档：逐行产出清洗后的正文
+    
+    迭代结束后，found表示是否找到PDF_pox，info为案件编号、案由等信息
+    （与extract_document_info一致）。峰值内存与单个文本节点而非整页成正比。
+    
+    Args:
+        cleaner (DocumentCleaner): 清洗器
+        chunks (iterable): HTML内容分块，str或utf-8编码的bytes
+    """
+    
+    # 不构成合法数字字符引用的"&#"（分块末尾无法判断时也算在内）
+    _STALLING_CHARREF_PATTERN = re.compile(r'&#(?![0-9]+[^0-9a-fA-F]|[xX][0-9a-fA-F]+[^0-9a-fA-F])')
+    
+    def __init__(self, cleaner, chunks):
+        self.cleaner = cleaner
+        self.chunks = chunks
+        self.found = False
+        self.info = {}
+    
+    def __iter__(self):
+        parser = _StreamingDocumentParser(self.cleaner)
+        lines = self.cleaner._format_lines(self.cleaner._clean_lines(self._iter_strings(parser)))
+        yield from lines
+        
+        self.found = parser.found
+        if parser.case_number is not None:
+            self.info['case_number'] = parser.case_number
+        case_reason = parser.case_reason()
+        if case_reason is not None:
+            self.info['case_reason'] = case_reason
+    
+    def _iter_strings(self, parser):
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        chunks = (decoder.decode(chunk) if isinstance(chunk, bytes) else chunk for chunk in self.chunks)
+        last = ''
+        for chunk in chunks:
+            if self._STALLING_CHARREF_PATTERN.search(last + chunk):
+                # html.parser遇到无法解析的"&#"会停在原处直到下一次feed，
+                # BeautifulSoup只feed一次，此后剩余内容必须一次性送入才能保持一致
+                chunk += ''.join(chunks) + decoder.decode(b'', final=True)
+                parser.feed(chunk)
+                break
+            parser.feed(chunk)
+            last = chunk[-1:]
+            while parser.pending:
+                yield parser.pending.popleft()
+        else:
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                parser.feed(tail)
+        parser.close()
+        while parser.pending:
+            yield parser.pending.popleft()
+
+
+# 批量清洗：每个工作进程复用一个清洗器实例
+_bulk_cleaner = None
+
+BULK_PROGRESS_FILE = '.bulk_progress'
+# 超过该大小（字节）的HTML走流式清洗，以限制工作进程内存
+STREAM_THRESHOLD = 2 * 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def find_html_files(source_dir):
+    """
+    遍历目录树，收集保存的原始HTML文件及其对应日期
+    
+    日期取路径中最近一级形如YYYY-MM-DD的目录名，找不到时记为"未知日期"。
+    原始网页归档的记录段（<日期>.seg）整体作为一项，日期取自文件名。
+    
+    Args:
+        source_dir (str): 原始HTML所在目录
+        
+    Returns:
+        list: 按路径排序的(文件路径, 日期)列表
+    """
+    tasks = []
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        dirnames.sort()
+        date_str = '未知日期'
+        for part in reversed(os.path.relpath(dirpath, source_dir).split(os.sep)):
+            if re.fullmatch(r'\d{4}-\d{2}-\d{2}', part):
+                date_str = part
+                break
+        for name in sorted(filenames):
+            if name.lower().endswith(('.html', '.htm')):
+                tasks.append((os.path.join(dirpath, name), date_str))
+            elif name.endswith(SEGMENT_SUFFIX):
+                tasks.append((os.path.join(dirpath, name), name[:-len(SEGMENT_SUFFIX)]))
+    return tasks
+
+
+def _file_key(html_path):
+    """按文件路径、大小和修改时间生成文件标识，用于断点续跑（文件改动或记录段追加后视为未完成）"""
+    stat = os.stat(html_path)
+    digest = hashlib.sha1(f"{html_path}\0{stat.st_size}\0{stat.st_mtime_ns}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def clean_filename(filename):
+    """清理文件名中的特殊字符，并限制为100个字符"""
+    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    return filename[:100]
+
+
+def document_filename(title, doc_info):
+    """
+    文书保存时的文件名：<标题>.txt，过长时改用<案件编号>_<案由>.txt
+    
+    采集和批量重新清洗都按此命名，同一篇文书在 文书/<日期>/ 下只有一个文件。
+    
+    Args:
+        title (str): 文书标题
+        doc_info (dict): process()等提取的文档信息（case_number、case_reason）
+        
+    Returns:
+        str: 文件名
+    """
+    filename = f"{clean_filename(title)}.txt"
+    if len(filename) > 100:
+        case_number = doc_info.get('case_number', '未知案件')
+        case_reason = doc_info.get('case_reason', '未知案由')
+        filename = clean_filename(f"{case_number}_{case_reason}.txt")
+    return filename
+
+
+def _bulk_date_folder(output_dir, date_str):
+    """<output_dir>/<日期>，必要时创建"""
+    date_folder = os.path.join(output_dir, date_str)
+    os.makedirs(date_folder, exist_ok=True)
+    return date_folder
+
+
+def _bulk_save_document(date_folder, title, url, collected_at, html_content, source):
+    """
+    清洗内存中的一篇HTML并写入date_folder，文件名同采集时（document_filename）
+    
+    Returns:
+        bool: 是否成功
+    """
+    cleaned_text, doc_info = _bulk_cleaner.process(html_content)
+    if cleaned_text == "未找到文档内容":
+        print(f"✗ 未找到文档内容: {source}")
+        return False
+    file_path = os.path.join(date_folder, document_filename(title, doc_info))
+    # 先写临时文件再替换，崩溃时不会留下半个文件
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(_bulk_cleaner.format_document(
+            title,
+            doc_info.get('case_number', '未知案件'),
+            doc_info.get('case_reason', '未知案由'),
+            collected_at,
+            url,
+            cleaned_text
+        ))
+    os.replace(tmp_path, file_path)
+    return True
+
+
+def _bulk_clean_segment(seg_path, date_str, output_dir):
+    """
+    清洗原始网页归档中一个日期的全部文书，同一docId只取最新的记录
+    
+    标题、URL和收集时间取自归档记录。
+    
+    Returns:
+        tuple: (成功数, 失败数)
+    """
+    # 只读打开：采集程序可能正在向同一日期追加，不能截掉其写到一半的记录或替换索引
+    archive = RawHtmlArchive(os.path.dirname(seg_path) or '.', read_only=True)
+    date_folder = _bulk_date_folder(output_dir, date_str)
+    success_count = 0
+    fail_count = 0
+    for doc_id in archive.doc_ids(date_str):
+        try:
+            meta, html_content = archive.read(date_str, doc_id)
+            title = meta.get('title') or doc_id
+            source = f"{seg_path} {doc_id}"
+            if _bulk_save_document(date_folder, title, meta.get('url') or '未知URL',
+                                   meta.get('collected_at', ''), html_content, source):
+                success_count += 1
+            else:
+                fail_count += 1
+        except Exception as e:
+            print(f"✗ 清洗失败 {seg_path} {doc_id}: {e}")
+            fail_count += 1
+    return success_count, fail_count
+
+
+def _bulk_clean_file(html_path, date_str, output_dir):
+    """
+    清洗单个HTML文件并写入<output_dir>/<日期>/
+    
+    超过STREAM_THRESHOLD的文件走流式清洗，正文先逐行写入临时文件，
+    再与文件头拼接，避免整页HTML和正文同时驻留内存。
+    
+    Returns:
+        bool: 是否成功
+    """
+    title = os.path.splitext(os.path.basename(html_path))[0]
+    collected_at = datetime.datetime.fromtimestamp(
+        os.path.getmtime(html_path)).strftime('%Y-%m-%d %H:%M:%S')
+    
+    date_folder = _bulk_date_folder(output_dir, date_str)
+    
+    if os.path.getsize(html_path) < STREAM_THRESHOLD:
+        with open(html_path, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+        return _bulk_save_document(date_folder, title, '未知URL', collected_at, html_content, html_path)
+    
+    # 文件名可能取决于正文中的案件编号，流式清洗结束后才能确定
+    body_path = os.path.join(date_folder, clean_filename(title) + '.body')
+    try:
+        with open(html_path, 'r', encoding='utf-8') as f, \
+                open(body_path, 'w', encoding='utf-8') as body:
+            stream = _bulk_cleaner.stream(iter(lambda: f.read(STREAM_CHUNK_SIZE), ''))
+            for i, line in enumerate(stream):
+                if i:
+                    body.write('\n')
+                body.write(line)
+        if not stream.found:
+            print(f"✗ 未找到文档内容: {html_path}")
+            return False
+        
+        file_path = os.path.join(date_folder, document_filename(title, stream.info))
+        tmp_path = file_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f, \
+                open(body_path, 'r', encoding='utf-8') as body:
+            f.write(_bulk_cleaner.format_document(
+                title,
+                stream.info.get('case_number', '未知案件'),
+                stream.info.get('case_reason', '未知案由'),
+                collected_at,
+                '未知URL',
+                ''
+            ))
+            shutil.copyfileobj(body, f)
+        os.replace(tmp_path, file_path)
+        return True
+    finally:
+        if os.path.exists(body_path):
+            os.remove(body_path)
+
+
+def _bulk_clean_chunk(chunk, output_dir):
+    """
+    工作进程：清洗一个块内的所有HTML文件并写入文书/<日期>/
+    
+    Args:
+        chunk (list): (文件路径, 日期)列表，文件可以是HTML或归档记录段
+        output_dir (str): 输出根目录
+        
+    Returns:
+        tuple: (成功数, 失败数)
+    """
+    global _bulk_cleaner
+    if _bulk_cleaner is None:
+        _bulk_cleaner = DocumentCleaner()
+    
+    success_count = 0
+    fail_count = 0
+    for html_path, date_str in chunk:
+        if html_path.endswith(SEGMENT_SUFFIX):
+            ok, failed = _bulk_clean_segment(html_path, date_str, output_dir)
+            success_count += ok
+            fail_count += failed
+            continue
+        try:
+            if _bulk_clean_file(html_path, date_str, output_dir):
+                success_count += 1
+            else:
+                fail_count += 1
+        except Exception as e:
+            print(f"✗ 清洗失败 {html_path}: {e}")
+            fail_count += 1
+    return success_count, fail_count
+
+
+def bulk_clean(source_dir, output_dir='文书', workers=None, chunk_size=200, restart=False):
+    """
+    离线批量重新清洗：多进程并行清洗目录树下保存的原始HTML
+    
+    文件按块分配给进程池，每完成一块就把块内各文件记入输出目录下的进度文件，
+    中断后重新运行会跳过已完成的文件；全部完成后删除进度文件，下次运行重新清洗全部文件。
+    
+    Args:
+        source_dir (str): 原始HTML所在目录
+        output_dir (str): 输出根目录，结构为<output_dir>/<日期>/
+        workers (int): 进程数，默认为CPU核数
+        chunk_size (int): 每块文件数
+        restart (bool): 忽略上次中断留下的进度，重新清洗全部文件
+        
+    Returns:
+        tuple: (成功数, 失败数)
+    """
+    tasks = find_html_files(source_dir)
+    
+    os.makedirs(output_dir, exist_ok=True)
+    progress_path = os.path.join(output_dir, BULK_PROGRESS_FILE)
+    if restart and os.path.exists(progress_path):
+        os.remove(progress_path)
+    done_keys = set()
+    if os.path.exists(progress_path):
+        with open(progress_path, 'r', encoding='utf-8') as f:
+            done_keys = set(line.strip() for line in f if line.strip())
+    
+    # 先去掉已完成的文件再分块，新增文件不会改变其他文件的进度
+    pending = [(task, _file_key(task[0])) for task in tasks]
+    pending = [(task, key) for task, key in pending if key not in done_keys]
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    print(f"共找到 {len(tasks)} 个HTML文件或归档记录段，其中 {len(tasks) - len(pending)} 个已在上次中断前完成，"
+          f"剩余分为 {len(chunks)} 块")
+    
+    success_count = 0
+    fail_count = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor, \
+            open(progress_path, 'a', encoding='utf-8') as progress:
+        futures = {executor.submit(_bulk_clean_chunk, [task for task, _ in chunk], output_dir): chunk
+                   for chunk in chunks}
+        for finished, future in enumerate(as_completed(futures), 1):
+            ok, failed = future.result()
+            success_count += ok
+            fail_count += failed
+            progress.write(''.join(key + '\n' for _, key in futures[future]))
+            progress.flush()
+            os.fsync(progress.fileno())
+            print(f"✓ 完成第 {finished}/{len(chunks)} 块（成功 {ok}，失败 {failed}）")
+    # 全部完成，进度只用于中断后续跑
+    os.remove(progress_path)
+    
+    print(f"\n批量清洗完成: 成功 {success_count}，失败 {fail_count}")
+    return success_count, fail_count
+
+
+def bulk_main(argv):
+    """批量清洗命令行入口：python -m document_cleaner bulk <目录>"""
+    parser = argparse.ArgumentParser(prog='python -m document_cleaner bulk',
+                                     description='离线批量重新清洗保存的原始HTML')
+    parser.add_argument('source_dir', help='原始HTML所在目录')
+    parser.add_argument('--output', default='文书', help='输出根目录（默认: 文书）')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认: CPU核数）')
+    parser.add_argument('--chunk-size', type=int, default=200, help='每块文件数（默认: 200）')
+    parser.add_argument('--restart', action='store_true', help='忽略上次中断留下的进度，重新清洗全部文件')
+    args = parser.parse_args(argv)
+    
+    if not os.path.isdir(args.source_dir):
+        print(f"✗ 目录不存在: {args.source_dir}")
+        return False
+    
+    _, fail_count = bulk_clean(args.source_dir, args.output, args.workers, args.chunk_size, args.restart)
+    return fail_count == 0
+
+def main(argv=None):
     """主函数，用于测试数据清洗功能"""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == 'bulk':
+        return bulk_main(argv[1:])
+    
     # 读取之前保存的HTML文件
     try:
         with open('single_document_source.html', 'r', encoding='utf-8') as f:
@@ -157,12 +1093,9 @@ def main():
         # 创建清洗器实例
         cleaner = DocumentCleaner()
         
-        # 提取文档信息
-        doc_info = cleaner.extract_document_info(html_content)
-        
-        # 清洗文档内容
+        # 清洗文档内容并提取文档信息
         print("正在清洗文档数据...")
-        cleaned_text = cleaner.clean_document_to_text(html_content)
+        cleaned_text, doc_info = cleaner.process(html_content)
         
         # 生成文件名
         case_number = doc_info.get('case_number', '未知案件')
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 采集台账
+功能：用SQLite按docId记录每篇文书的采集状态，重启后按文书粒度断点续采
+"""
+
+import sqlite3
+import datetime
+
+from link_record import LinkRecord
+
+# 文书状态
+STATUS_PENDING = 'pending'    # 已收集链接，尚未访问
+STATUS_FETCHED = 'fetched'    # 已获取页面，尚未保存
+STATUS_CLEANED = 'cleaned'    # 已清洗保存
+STATUS_FAILED = 'failed'      # 处理失败，下次重试
+STATUS_SKIPPED = 'skipped'    # 按标题筛选规则跳过，未访问
+
+# 日期状态
+DATE_LINKS_COLLECTED = 'links_collected'  # 链接已收集完毕
+DATE_DONE = 'done'                        # 全部文书已处理
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    status TEXT NOT NULL,
+    content_hash TEXT,
+    file_path TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    skip_rules TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_date ON documents(date, status);
+CREATE TABLE IF NOT EXISTS dates (
+    date TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    link_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL
+);
+"""
+
+
+def _now():
+    return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+class DocumentLedger:
+    """文书采集台账：docId -> 状态、内容哈希、时间戳"""
+    
+    def __init__(self, db_path='采集台账.db', max_attempts=3):
+        """
+        打开（或创建）台账
+        
+        Args:
+            db_path (str): SQLite数据库路径
+            max_attempts (int): 单篇文书最多尝试次数，超过后不再阻止日期完成
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        # 早期创建的台账没有skip_rules列
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(documents)')}
+        if 'skip_rules' not in columns:
+            self.conn.execute('ALTER TABLE documents ADD COLUMN skip_rules TEXT')
+        self.conn.commit()
+    
+    def add_links(self, date_str, links):
+        """
+        登记某日期收集到的链接，已登记的docId保持原状态
+        
+        Args:
+            date_str (str): 日期
+            links (list): LinkRecord列表
+        
+        Returns:
+            int: 新登记的数量
+        """
+        now = _now()
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO documents (doc_id, date, url, title, status, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(link.doc_id, date_str, link.url, link.title, STATUS_PENDING, now, now)
+                 for link in links]
+            )
+            return self.conn.total_changes - before
+    
+    def get_status(self, doc_id):
+        """查询单篇文书状态，未登记时返回None"""
+        row = self.conn.execute('SELECT status FROM documents WHERE doc_id = ?', (doc_id,)).fetchone()
+        return row[0] if row else None
+    
+    def cleaned_doc_ids(self, date_str):
+        """
+        某日期已清洗保存的docId集合，供访问前O(1)判断是否跳过
+        
+        Returns:
+            set: docId集合
+        """
+        rows = self.conn.execute('SELECT doc_id FROM documents WHERE date = ? AND status = ?',
+                                 (date_str, STATUS_CLEANED))
+        return {row[0] for row in rows}
+    
+    def unfinished_links(self, date_str):
+        """
+        某日期尚未完成的链接（未清洗、未被筛选规则跳过且未超过最多尝试次数）
+        
+        Returns:
+            list: 按登记顺序排列的LinkRecord（台账不记录页码和序号）
+        """
+        rows = self.conn.execute(
+            'SELECT doc_id, url, title FROM documents WHERE date = ? AND status NOT IN (?, ?) '
+            'AND attempts < ? ORDER BY rowid',
+            (date_str, STATUS_CLEANED, STATUS_SKIPPED, self.max_attempts)
+        )
+        return [LinkRecord(doc_id, url, title) for doc_id, url, title in rows]
+    
+    def mark_fetched(self, doc_id, content_hash):
+        """记录页面已获取及其内容哈希"""
+        self._update(doc_id, STATUS_FETCHED, content_hash=content_hash)
+    
+    def mark_cleaned(self, doc_id, file_path):
+        """记录文书已清洗保存"""
+        self._update(doc_id, STATUS_CLEANED, file_path=file_path, error=None)
+    
+    def mark_failed(self, doc_id, error):
+        """记录处理失败并累计尝试次数，下次运行时重试"""
+        self._update(doc_id, STATUS_FAILED, attempts_increment=1, error=str(error)[:500])
+    
+    def mark_skipped(self, doc_id, reason, rules_key):
+        """
+        记录文书按筛选规则跳过（不再阻止日期完成）
+        
+        Args:
+            doc_id (str): 文书docId
+            reason (str): 跳过原因
+            rules_key (str): 当时筛选规则的指纹，规则改变后由reopen_skipped重新放回待采集
+        """
+        self._update(doc_id, STATUS_SKIPPED, error=str(reason)[:500], skip_rules=rules_key)
+    
+    def reopen_skipped(self, date_str, rules_key):
+        """
+        把按其他筛选规则跳过的文书放回待采集，由当前规则重新判断；
+        有文书放回时，已完成的日期恢复为链接已收集
+        
+        Args:
+            date_str (str): 日期
+            rules_key (str): 当前筛选规则的指纹，没有规则时为空字符串
+        
+        Returns:
+            int: 放回的文书数
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                'UPDATE documents SET status = ?, skip_rules = NULL, error = NULL, updated_at = ? '
+                'WHERE date = ? AND status = ? AND (skip_rules IS NULL OR skip_rules != ?)',
+                (STATUS_PENDING, _now(), date_str, STATUS_SKIPPED, rules_key)
+            )
+            reopened = cursor.rowcount
+            if reopened:
+                self.conn.execute('UPDATE dates SET status = ?, updated_at = ? WHERE date = ? AND status = ?',
+                                  (DATE_LINKS_COLLECTED, _now(), date_str, DATE_DONE))
+        return reopened
+    
+    def _update(self, doc_id, status, attempts_increment=0, **fields):
+        assignments = ['status = ?', 'updated_at = ?', 'attempts = attempts + ?']
+        values = [status, _now(), attempts_increment]
+        for name, value in fields.items():
+            assignments.append(f'{name} = ?')
+            values.append(value)
+        with self.conn:
+            self.conn.execute(f"UPDATE documents SET {', '.join(assignments)} WHERE doc_id = ?",
+                              values + [doc_id])
+    
+    def get_date_status(self, date_str):
+        """查询日期状态，未登记时返回None"""
+        row = self.conn.execute('SELECT status FROM dates WHERE date = ?', (date_str,)).fetchone()
+        return row[0] if row else None
+    
+    def mark_date_links_collected(self, date_str, link_count):
+        """记录某日期的链接已收集完毕"""
+        self._set_date(date_str, DATE_LINKS_COLLECTED, link_count)
+    
+    def finish_date(self, date_str):
+        """
+        若某日期已没有未完成的文书，将其标记为完成
+        
+        Returns:
+            bool: 是否已完成
+        """
+        if self.unfinished_links(date_str):
+            return False
+        row = self.conn.execute('SELECT COUNT(*) FROM documents WHERE date = ?', (date_str,)).fetchone()
+        self._set_date(date_str, DATE_DONE, row[0])
+        return True
+    
+    def is_date_done(self, date_str):
+        """检查日期是否已全部处理完成"""
+        return self.get_date_status(date_str) == DATE_DONE
+    
+    def _set_date(self, date_str, status, link_count):
+        with self.conn:
+            self.conn.execute(
+                'INSERT INTO dates (date, status, link_count, updated_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(date) DO UPDATE SET status = excluded.status, '
+                'link_count = excluded.link_count, updated_at = excluded.updated_at',
+                (date_str, status, link_count, _now())
+            )
+    
+    def date_summary(self, date_str):
+        """
+        统计某日期各状态的文书数
+        
+        Returns:
+            dict: 状态 -> 数量
+        """
+        rows = self.conn.execute('SELECT status, COUNT(*) FROM documents WHERE date = ? GROUP BY status',
+                                 (date_str,))
+        return dict(rows)
+    
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 文书分段
+功能：单遍扫描把文书正文切分为首部、当事人、审理经过、事实、本院认为、裁判主文、落款七段，
+各段只记录在文本中的起止位置；并为文书目录建立分段位置索引，检索、统计时只读取需要的一段
+（如只在"本院认为"中查找），不必读取整篇文书
+
+文书的七段总是按固定顺序相邻排列（缺少的段长度为0），因此一篇文书的分段只需8个位置：
+第k段为 [bounds[k], bounds[k+1])。
+
+索引目录结构：
+    bounds.bin     每篇文书8个uint32，为各段在txt文件中的字节位置（含文件头，首部从0开始）
+    meta.json      各日期的第一篇文书号
+    docs.dat / docs.idx   文书信息，每行"docId\t日期\t文件路径\t标题"，文书号按日期排列
+"""
+
+import os
+import re
+import sys
+import json
+import bisect
+import shutil
+import argparse
+from array import array
+from typing import NamedTuple
+from concurrent.futures import ProcessPoolExecutor
+
+from bigram_index import find_shards
+from document_catalog import parse_document_text
+from doc_id import extract_doc_id
+
+SECTION_KINDS = ('header', 'parties', 'history', 'findings', 'reasoning', 'holding', 'signature')
+SECTION_NAMES = dict(zip(SECTION_KINDS, ('首部', '当事人', '审理经过', '事实', '本院认为', '裁判主文', '落款')))
+HEADER, PARTIES, HISTORY, FINDINGS, REASONING, HOLDING, SIGNATURE = range(len(SECTION_KINDS))
+
+# 各段的开始标志（均在行首匹配，正文经DocumentCleaner清洗后每段为一行）
+PARTY_PATTERN = re.compile(
+    r'(?:原告|被告|上诉人|被上诉人|申请人|被申请人|再审申请人|申请再审人|申请执行人|被执行人|异议人|'
+    r'复议申请人|第三人|原审|公诉机关|自诉人|辩护人|委托(?:诉讼)?代理人|法定代表人|法定代理人|指定代理人|'
+    r'诉讼代表人|负责人|利害关系人|起诉人|赔偿请求人|赔偿义务机关)'
+)
+# 审理经过："……纠纷一案，本院于……立案后……公开开庭进行了审理"
+HISTORY_PATTERN = re.compile(r'.*?(?:一案|审理终结|立案(?:受理|后)|公开开庭|提起公诉|本案现已)')
+FINDINGS_PATTERN = re.compile(r'.*?(?:诉称|辩称|诉讼请求|上诉请求|再审请求|申请称|查明|认定事实|认定如下)')
+REASONING_PATTERN = re.compile(r'本院(?:经审查|经审理|再审|审查)?认为')
+# 引出裁判主文的句子在行尾，主文从下一行开始
+HOLDING_PATTERN = re.compile(r'.*(?:(?:判决|裁定|决定)如下|如下协议)[:：]?$')
+SIGNATURE_PATTERN = re.compile(
+    r'(?:审判长|审判员|代理审判员|人民陪审员|陪审员|执行员|书记员|代理书记员|法官助理|速录员)'
+    r'|[〇○零一二三四五六七八九十]{4}年[〇○零一二三四五六七八九十]{1,2}月[〇○零一二三四五六七八九十]{1,3}日$'
+)
+SIGNATURE_LINE_CHARS = 30  # 落款各行都很短，长行中的"审判员"等不是落款
+# 落款中常用空格对齐（如"审 判 长　　王　静"、"书 记 员"），匹配前去掉行内空白
+_SPACES = re.compile(r'\s+')
+
+
+class Section(NamedTuple):
+    """文书中的一段，start、end为在正文中的位置"""
+    kind: str
+    start: int
+    end: int
+    
+    def text(self, body):
+        """取出该段的文字"""
+        return body[self.start:self.end]
+
+
+def section_bounds(body):
+    """
+    单遍扫描正文，求各段的起点
+    
+    状态只向后转移：每一行按当前状态检查之后各段的开始标志，命中时跳到该段，
+    跳过的段长度为0。
+    
+    Args:
+        body (str): 文书正文（DocumentCleaner的输出，也可以是含文件头的整个txt）
+    
+    Returns:
+        list: 8个位置，第k段为[bounds[k], bounds[k+1])
+    """
+    bounds = [0] * (len(SECTION_KINDS) + 1)
+    state = HEADER
+    holding_next = False
+    pos = 0
+    length = len(body)
+    while pos < length:
+        end = body.find('\n', pos)
+        if end < 0:
+            end = length
+        line = body[pos:end].strip()
+        target = state
+        if not line:
+            pass
+        elif holding_next and state < HOLDING:
+            target = HOLDING
+        elif state >= FINDINGS and len(line) <= SIGNATURE_LINE_CHARS and SIGNATURE_PATTERN.match(_SPACES.sub('', line)):
+            target = SIGNATURE
+        elif state < REASONING and REASONING_PATTERN.match(line):
+            target = REASONING
+        elif state < HISTORY and HISTORY_PATTERN.match(line):
+            target = HISTORY
+        elif state < FINDINGS and state != HEADER and FINDINGS_PATTERN.match(line):
+            target = FINDINGS
+        elif state == HISTORY:
+            # 审理经过通常只有一段，之后即为诉辩意见和查明的事实
+            target = FINDINGS
+        elif state == HEADER and PARTY_PATTERN.match(line):
+            target = PARTIES
+        if target > state:
+            for kind in range(state + 1, target + 1):
+                bounds[kind] = pos
+            state = target
+            holding_next = False
+        if line and state < HOLDING and HOLDING_PATTERN.match(line):
+            holding_next = True
+        pos = end + 1
+    for kind in range(state + 1, len(bounds)):
+        bounds[kind] = length
+    return bounds
+
+
+def segment_document(body):
+    """
+    切分正文
+    
+    Args:
+        body (str): 文书正文
+    
+    Returns:
+        list: 非空的Section，按顺序排列
+    """
+    bounds = section_bounds(body)
+    return [Section(kind, bounds[i], bounds[i + 1])
+            for i, kind in enumerate(SECTION_KINDS) if bounds[i] < bounds[i + 1]]
+
+
+def section_at(bounds, offset):
+    """
+    位置所在的段
+    
+    Args:
+        bounds (list): section_bounds()的结果
+        offset (int): 正文中的位置
+    
+    Returns:
+        int: 段号（SECTION_KINDS中的下标）
+    """
+    return bisect.bisect_right(bounds, offset, 0, len(SECTION_KINDS)) - 1
+
+
+def _byte_bounds(text, bounds):
+    """字符位置换算为utf-8字节位置"""
+    result = []
+    last_char = last_byte = 0
+    for bound in bounds:
+        last_byte += len(text[last_char:bound].encode('utf-8'))
+        last_char = bound
+        result.append(last_byte)
+    return result
+
+
+def _segment_shard(shard_dir, shard_name):
+    """切分一个日期目录中的全部文书（在子进程中运行）"""
+    documents = []
+    for filename in sorted(os.listdir(shard_dir)):
+        if not filename.endswith('.txt'):
+            continue
+        file_path = os.path.join(shard_dir, filename)
+        try:
+            with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+        document = parse_document_text(text)
+        doc_id = extract_doc_id(document['url']) if document['url'] else 'file-' + file_path
+        # 整个文件一起切分：文件头都以"# "开头，落在首部
+        bounds = _byte_bounds(text, section_bounds(text))
+        documents.append((doc_id, shard_name, file_path, document['title'], bounds))
+    return documents
+
+
+def build_index(root='文书', output_dir='文书分段', workers=None):
+    """
+    扫描文书目录建立分段位置索引（各日期目录并行切分，先写入临时目录再替换）
+    
+    Args:
+        root (str): 文书根目录
+        output_dir (str): 索引目录
+        workers (int): 进程数，默认CPU核数
+    
+    Returns:
+        int: 索引的文书数
+    """
+    shards = find_shards(root)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shard_results = list(executor.map(_segment_shard, *zip(*shards))) if shards else []
+    
+    tmp_dir = output_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    bounds = array('I')
+    doc_offsets = array('Q', [0])
+    shard_starts = []
+    doc = 0
+    with open(os.path.join(tmp_dir, 'docs.dat'), 'wb') as f:
+        for (_, shard_name), documents in zip(shards, shard_results):
+            shard_starts.append([shard_name, doc])
+            for doc_id, _, file_path, title, document_bounds in documents:
+                bounds.extend(document_bounds)
+                line = '\t'.join(field.replace('\t', ' ').replace('\n', ' ')
+                                 for field in (doc_id, shard_name, file_path, title)) + '\n'
+                line = line.encode('utf-8')
+                f.write(line)
+                doc_offsets.append(doc_offsets[-1] + len(line))
+                doc += 1
+    with open(os.path.join(tmp_dir, 'bounds.bin'), 'wb') as f:
+        f.write(bounds.tobytes())
+    with open(os.path.join(tmp_dir, 'docs.idx'), 'wb') as f:
+        f.write(doc_offsets.tobytes())
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'shards': shard_starts, 'documents': doc}, f, ensure_ascii=False)
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.replace(tmp_dir, output_dir)
+    print(f"✓ 分段索引建立完成：{doc} 篇文书")
+    return doc
+
+
+class SectionIndex:
+    """只读的分段位置索引，按字节位置从txt文件中读取指定的段"""
+    
+    def __init__(self, path='文书分段'):
+        """
+        打开索引
+        
+        Args:
+            path (str): 索引目录
+        """
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.document_count = meta['documents']
+        self._shard_names = [name for name, _ in meta['shards']]
+        self._shard_starts = [start for _, start in meta['shards']]
+        self._bounds = array('I')
+        with open(os.path.join(path, 'bounds.bin'), 'rb') as f:
+            self._bounds.frombytes(f.read())
+        self._doc_offsets = array('Q')
+        with open(os.path.join(path, 'docs.idx'), 'rb') as f:
+            self._doc_offsets.frombytes(f.read())
+        with open(os.path.join(path, 'docs.dat'), 'rb') as f:
+            self._docs = f.read()
+    
+    def __len__(self):
+        return self.document_count
+    
+    def _doc_range(self, date_from=None, date_to=None):
+        """日期区间（含两端）对应的文书号区间[start, stop)，文书号按日期排列"""
+        first = bisect.bisect_left(self._shard_names, date_from) if date_from else 0
+        last = bisect.bisect_right(self._shard_names, date_to) if date_to else len(self._shard_names)
+        start = self._shard_starts[first] if first < len(self._shard_starts) else self.document_count
+        stop = self._shard_starts[last] if last < len(self._shard_starts) else self.document_count
+        return start, stop
+    
+    def document(self, doc):
+        """
+        Returns:
+            dict: doc_id、date、file_path、title
+        """
+        line = self._docs[self._doc_offsets[doc]:self._doc_offsets[doc + 1]]
+        doc_id, date, file_path, title = line.decode('utf-8').rstrip('\n').split('\t')
+        return {'doc': doc, 'doc_id': doc_id, 'date': date, 'file_path': file_path, 'title': title}
+    
+    def bounds(self, doc):
+        """
+        Returns:
+            list: 该文书各段在txt文件中的8个字节位置
+        """
+        base = doc * (len(SECTION_KINDS) + 1)
+        return self._bounds[base:base + len(SECTION_KINDS) + 1].tolist()
+    
+    def read(self, doc, *kinds):
+        """
+        读取文书的某几段（相邻的段一次读出）
+        
+        Args:
+            doc (int): 文书号
+            *kinds (str): 段名，如'reasoning'；不给时读取全文
+        
+        Returns:
+            str: 各段文字，不相邻的段之间以换行分隔；文件已不存在时为空字符串
+        """
+        bounds = self.bounds(doc)
+        indexes = sorted(SECTION_KINDS.index(kind) for kind in kinds) if kinds else range(len(SECTION_KINDS))
+        ranges = []
+        for i in indexes:
+            start, end = bounds[i], bounds[i + 1]
+            if start == end:
+                continue
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] = end
+            else:
+                ranges.append([start, end])
+        if not ranges:
+            return ''
+        parts = []
+        try:
+            with open(self.document(doc)['file_path'], 'rb') as f:
+                for start, end in ranges:
+                    f.seek(start)
+                    text = f.read(end - start).decode('utf-8', errors='replace')
+                    parts.append(text.replace('\r\n', '\n').strip('\n'))
+        except OSError:
+            return ''
+        return '\n'.join(parts)
+    
+    def section_bytes(self, kinds, date_from=None, date_to=None):
+        """
+        某几段的总字节数及全部文书的总字节数（用于估计只读这几段能少读多少）
+        
+        Returns:
+            tuple: (这几段的字节数, 全文字节数)
+        """
+        indexes = [SECTION_KINDS.index(kind) for kind in kinds]
+        width = len(SECTION_KINDS) + 1
+        start, stop = self._doc_range(date_from, date_to)
+        selected = total = 0
+        for doc in range(start, stop):
+            base = doc * width
+            total += self._bounds[base + width - 1]
+            selected += sum(self._bounds[base + i + 1] - self._bounds[base + i] for i in indexes)
+        return selected, total
+    
+    def scan(self, kinds, date_from=None, date_to=None):
+        """
+        依次读取各文书的某几段
+        
+        Args:
+            kinds (tuple): 段名
+            date_from (str): 起始日期（含），如'2023-01-01'
+            date_to (str): 截止日期（含）
+        
+        Yields:
+            tuple: (文书号, 文字)，这几段都为空的文书跳过
+        """
+        for doc in range(*self._doc_range(date_from, date_to)):
+            text = self.read(doc, *kinds)
+            if text:
+                yield doc, text
+    
+    def grep(self, pattern, kinds=('reasoning',), date_from=None, date_to=None, limit=20):
+        """
+        只在某几段中查找正则表达式
+        
+        Returns:
+            list: 文书信息dict，附带第一处命中的上下文
+        """
+        regex = re.compile(pattern)
+        hits = []
+        for doc, text in self.scan(kinds, date_from, date_to):
+            match = regex.search(text)
+            if match:
+                hit = self.document(doc)
+                hit['snippet'] = text[max(0, match.start() - 30):match.end() + 30].replace('\n', ' ')
+                hits.append(hit)
+                if len(hits) >= limit:
+                    break
+        return hits
+
+
+def main(argv=None):
+    """命令行入口：python -m document_sections show / build / grep"""
+    parser = argparse.ArgumentParser(prog='python -m document_sections', description='文书分段')
+    parser.add_argument('--index', default='文书分段', help='索引目录（默认: 文书分段）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    show_parser = subparsers.add_parser('show', help='显示一篇文书的分段')
+    show_parser.add_argument('file', help='文书txt文件')
+    build_parser = subparsers.add_parser('build', help='建立分段位置索引')
+    build_parser.add_argument('root', nargs='?', default='文书', help='文书根目录（默认: 文书）')
+    build_parser.add_argument('--workers', type=int, default=None, help='进程数（默认: CPU核数）')
+    grep_parser = subparsers.add_parser('grep', help='只在指定的段中查找')
+    grep_parser.add_argument('pattern', help='正则表达式')
+    grep_parser.add_argument('--section', default='reasoning',
+                             help='段名，逗号分隔（默认: reasoning）；可选 ' + ', '.join(SECTION_KINDS))
+    grep_parser.add_argument('--from', dest='date_from', help='起始日期 YYYY-MM-DD')
+    grep_parser.add_argument('--to', dest='date_to', help='截止日期 YYYY-MM-DD')
+    grep_parser.add_argument('--limit', type=int, default=20, help='最多显示条数（默认: 20）')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    
+    if args.command == 'show':
+        with open(args.file, 'r', encoding='utf-8') as f:
+            body = parse_document_text(f.read())['body']
+        for section in segment_document(body):
+            text = section.text(body).strip('\n')
+            preview = text[:60].replace('\n', ' ')
+            print(f"[{SECTION_NAMES[section.kind]}] {section.start}-{section.end}  {preview}"
+                  + ('…' if len(text) > 60 else ''))
+        return True
+    
+    if args.command == 'build':
+        if not os.path.isdir(args.root):
+            print(f"✗ 目录不存在: {args.root}")
+            return False
+        build_index(args.root, args.index, args.workers)
+        return True
+    
+    kinds = tuple(kind for kind in args.section.split(',') if kind)
+    unknown = [kind for kind in kinds if kind not in SECTION_KINDS]
+    if unknown:
+        print(f"✗ 未知的段: {', '.join(unknown)}")
+        return False
+    index = SectionIndex(args.index)
+    hits = index.grep(args.pattern, kinds, args.date_from, args.date_to, args.limit)
+    for hit in hits:
+        print(f"[{hit['date']}] {hit['title']}")
+        print(f"    {hit['snippet']}")
+    selected, total = index.section_bytes(kinds, args.date_from, args.date_to)
+    print(f"✓ 共 {len(hits)} 条；读取 {selected} / {total} 字节")
+    return True
+
+
+if __name__ == "__main__":
+    main()
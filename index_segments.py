@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 分段索引
+功能：把二元组倒排索引组织为多个不可变的段，每个日期目录单独建立一个段，
+后台按分层策略合并小段，查询时依次检索各段
+
+目录结构：
+    manifest.json  当前有效的段及各段包含的日期（先写临时文件再替换，读者总是看到完整的一代）
+    seg_000001/    段，格式与 bigram_index 的索引目录相同
+
+某个日期重新采集后为它建立新段，旧段中该日期的文书记为已删除，查询时跳过，合并时丢弃。
+同一时间只应有一个写入者（采集程序或命令行的 update/merge），查询可以随时进行。
+"""
+
+import os
+import sys
+import json
+import math
+import shutil
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from bigram_index import BigramIndex, build_segment, merge_indexes, find_shards
+
+MANIFEST_NAME = 'manifest.json'
+SEGMENT_PREFIX = 'seg_'
+
+
+def shard_fingerprint(shard_dir):
+    """
+    日期目录的指纹：文书数、总字节数和最新修改时间，用于判断是否需要重建该日期的段
+    
+    Returns:
+        list: [文书数, 总字节数, 最新修改时间(纳秒)]
+    """
+    count = size = latest = 0
+    with os.scandir(shard_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.txt') and entry.is_file():
+                stat = entry.stat()
+                count += 1
+                size += stat.st_size
+                latest = max(latest, stat.st_mtime_ns)
+    return [count, size, latest]
+
+
+def load_manifest(path):
+    """读取段清单，不存在时返回空清单"""
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {'next_segment': 1, 'segments': []}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class SegmentedIndex:
+    """分段索引的写入者：建立新段、登记删除、后台合并"""
+    
+    def __init__(self, path='分段索引', merge_factor=10, min_segment_docs=1000, workers=1):
+        """
+        打开（或新建）分段索引
+        
+        Args:
+            path (str): 索引目录
+            merge_factor (int): 同一层的段达到该数量时合并为一个段
+            min_segment_docs (int): 第0层的文书数上限，往上每层乘以merge_factor
+            workers (int): 建立和合并段的后台进程数
+        """
+        self.path = path
+        self.merge_factor = merge_factor
+        self.min_segment_docs = min_segment_docs
+        self.workers = workers
+        os.makedirs(path, exist_ok=True)
+        self.manifest = load_manifest(path)
+        self._condition = threading.Condition()
+        self._active = 0  # 已提交、尚未登记结果的任务数
+        self._merging = set()  # 正在参与合并的段
+        self._executor = None
+        self._closed = False
+        self._remove_orphans()
+    
+    def _segment_path(self, name):
+        return os.path.join(self.path, name)
+    
+    def _remove_orphans(self):
+        """删除清单中没有的段目录（上次中断的建立、合并，或当时未能删除的旧段）"""
+        live = {segment['name'] for segment in self.manifest['segments']}
+        for name in os.listdir(self.path):
+            if name.startswith(SEGMENT_PREFIX) and name not in live:
+                shutil.rmtree(self._segment_path(name), ignore_errors=True)
+    
+    def _save_manifest(self):
+        """写入段清单（调用方持有锁）"""
+        manifest_path = os.path.join(self.path, MANIFEST_NAME)
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, manifest_path)
+    
+    def _reserve_name(self):
+        """分配新段的名称（调用方持有锁）"""
+        name = f"{SEGMENT_PREFIX}{self.manifest['next_segment']:06d}"
+        self.manifest['next_segment'] += 1
+        return name
+    
+    def _owner(self, shard):
+        """当前包含该日期有效文书的段"""
+        for segment in self.manifest['segments']:
+            if shard in segment['shards']:
+                return segment
+        return None
+    
+    def _submit(self, func, args, on_done):
+        """提交后台任务，完成后在后台线程中调用on_done(future)"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._active += 1
+        future = self._executor.submit(func, *args)
+        
+        def done(finished):
+            try:
+                on_done(finished)
+            finally:
+                with self._condition:
+                    self._active -= 1
+                    self._condition.notify_all()
+        
+        future.add_done_callback(done)
+        return future
+    
+    def add_shard(self, shard_dir, shard=None):
+        """
+        为一个日期目录建立新段（后台进行），目录自上次建立后没有变化时跳过
+        
+        Args:
+            shard_dir (str): 日期目录，如'文书/2022-07-25'
+            shard (str): 分片名，默认为目录名
+        
+        Returns:
+            bool: 是否提交了建立任务
+        """
+        shard = shard or os.path.basename(os.path.normpath(shard_dir))
+        fingerprint = shard_fingerprint(shard_dir)
+        with self._condition:
+            if self._closed:
+                return False
+            owner = self._owner(shard)
+            if owner is not None and owner['shards'][shard] == fingerprint:
+                return False
+            name = self._reserve_name()
+            self._submit(build_segment, ([(shard_dir, shard)], self._segment_path(name)),
+                         lambda future: self._commit_segment(name, {shard: fingerprint}, future))
+        return True
+    
+    def update(self, root='文书', wait=True):
+        """
+        为新增或有变化的日期目录建立段
+        
+        Args:
+            root (str): 文书根目录
+            wait (bool): 是否等待建立和合并完成
+        
+        Returns:
+            int: 提交建立的日期数
+        """
+        submitted = sum(1 for shard_dir, shard in find_shards(root) if self.add_shard(shard_dir, shard))
+        if wait:
+            self.wait()
+        return submitted
+    
+    def _commit_segment(self, name, shards, future):
+        """登记建好的新段，旧段中的同一日期记为已删除，然后检查是否需要合并"""
+        try:
+            docs = future.result()
+        except Exception as e:
+            print(f"✗ 建立索引段失败 {', '.join(shards)}: {str(e)}")
+            shutil.rmtree(self._segment_path(name), ignore_errors=True)
+            return
+        with self._condition:
+            for shard in shards:
+                owner = self._owner(shard)
+                if owner is not None:
+                    del owner['shards'][shard]
+                    owner['deleted'].append(shard)
+            self.manifest['segments'].append({'name': name, 'docs': docs, 'shards': shards, 'deleted': []})
+            self._save_manifest()
+        self.maybe_merge()
+    
+    def _tier(self, segment):
+        """段所在的层：按文书数取对数分层"""
+        docs = segment['docs']
+        if docs < self.min_segment_docs:
+            return 0
+        return 1 + int(math.log(docs / self.min_segment_docs, self.merge_factor))
+    
+    def _pick_merge(self):
+        """选出需要合并的段：最低的、段数达到merge_factor的一层中最早的merge_factor个（调用方持有锁）"""
+        tiers = {}
+        for segment in self.manifest['segments']:
+            if segment['name'] not in self._merging:
+                tiers.setdefault(self._tier(segment), []).append(segment)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= self.merge_factor:
+                return tiers[tier][:self.merge_factor]
+        return None
+    
+    def maybe_merge(self):
+        """
+        按分层策略提交一次后台合并
+        
+        Returns:
+            bool: 是否提交了合并任务
+        """
+        with self._condition:
+            if self._closed:
+                return False
+            segments = self._pick_merge()
+            if not segments:
+                return False
+            names = [segment['name'] for segment in segments]
+            dropped = {segment['name']: list(segment['deleted']) for segment in segments}
+            self._merging.update(names)
+            name = self._reserve_name()
+            sources = [(self._segment_path(source), set(dropped[source])) for source in names]
+            self._submit(merge_indexes, (sources, self._segment_path(name)),
+                         lambda future: self._commit_merge(name, names, dropped, future))
+        return True
+    
+    def _commit_merge(self, name, names, dropped, future):
+        """用合并后的段替换来源段；合并期间新登记的删除转移到新段"""
+        try:
+            docs = future.result()
+        except Exception as e:
+            print(f"✗ 合并索引段失败: {str(e)}")
+            shutil.rmtree(self._segment_path(name), ignore_errors=True)
+            with self._condition:
+                self._merging.difference_update(names)
+            return
+        with self._condition:
+            segments = self.manifest['segments']
+            sources = [segment for segment in segments if segment['name'] in names]
+            merged = {'name': name, 'docs': docs, 'shards': {}, 'deleted': []}
+            for segment in sources:
+                merged['shards'].update(segment['shards'])
+                merged['deleted'].extend(shard for shard in segment['deleted']
+                                         if shard not in dropped[segment['name']])
+            position = segments.index(sources[0])
+            self.manifest['segments'] = [segment for segment in segments if segment['name'] not in names]
+            self.manifest['segments'].insert(position, merged)
+            self._save_manifest()
+            self._merging.difference_update(names)
+        # 正在查询的读者仍映射着旧段；不能删除时（如Windows）留到下次打开时清理
+        for source in names:
+            shutil.rmtree(self._segment_path(source), ignore_errors=True)
+        self.maybe_merge()
+    
+    def wait(self):
+        """等待所有后台建立和合并完成"""
+        with self._condition:
+            while self._active:
+                self._condition.wait()
+    
+    def status(self):
+        """
+        各段的文书数、层和日期范围
+        
+        Returns:
+            list: 每段一行说明
+        """
+        lines = []
+        with self._condition:
+            for segment in self.manifest['segments']:
+                shards = sorted(segment['shards'])
+                span = f"{shards[0]} ~ {shards[-1]}" if shards else "-"
+                line = f"{segment['name']}: 文书 {segment['docs']}，第{self._tier(segment)}层，日期 {span}"
+                if segment['deleted']:
+                    line += f"，已删除日期 {len(segment['deleted'])}"
+                lines.append(line)
+        return lines
+    
+    def close(self):
+        """等待后台任务完成并关闭进程池"""
+        self.wait()
+        with self._condition:
+            self._closed = True
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class SegmentReader:
+    """分段索引的读者：打开清单中的全部段，依次检索"""
+    
+    def __init__(self, path='分段索引'):
+        """
+        打开当前这一代的全部段
+        
+        Args:
+            path (str): 索引目录
+        """
+        self.path = path
+        self.segments = []
+        for attempt in range(3):
+            manifest = load_manifest(path)
+            try:
+                for segment in manifest['segments']:
+                    index = BigramIndex(os.path.join(path, segment['name']))
+                    self.segments.append((segment['name'], index, index.docs_in_shards(set(segment['deleted']))))
+                break
+            except FileNotFoundError:
+                # 读清单和打开段之间恰好完成了一次合并，重新读取清单
+                self.close()
+                if attempt == 2:
+                    raise
+    
+    def __len__(self):
+        return sum(len(index) - len(deleted) for _, index, deleted in self.segments)
+    
+    def query(self, query):
+        """
+        执行查询，语法同 BigramIndex.query
+        
+        Returns:
+            generator: (段序号, 段内文书号)
+        """
+        for i, (_, index, deleted) in enumerate(self.segments):
+            for doc in index.query(query):
+                if doc not in deleted:
+                    yield i, doc
+    
+    def search(self, query, limit=20):
+        """
+        检索并返回文书信息
+        
+        Returns:
+            list: 文书信息dict（含所在的段）
+        """
+        hits = []
+        for i, doc in self.query(query):
+            hit = self.segments[i][1].document(doc)
+            hit['segment'] = self.segments[i][0]
+            hits.append(hit)
+            if len(hits) >= limit:
+                break
+        return hits
+    
+    def count(self, query):
+        """命中的文书数"""
+        return sum(1 for _ in self.query(query))
+    
+    def close(self):
+        """释放各段的映射"""
+        for _, index, _ in self.segments:
+            index.close()
+        self.segments = []
+
+
+def main(argv=None):
+    """命令行入口：python -m index_segments update [目录] / merge / status / search <查询>"""
+    parser = argparse.ArgumentParser(prog='python -m index_segments', description='分段二元组索引')
+    parser.add_argument('--index', default='分段索引', help='索引目录（默认: 分段索引）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    update_parser = subparsers.add_parser('update', help='为新增或有变化的日期目录建立段，并按需合并')
+    update_parser.add_argument('root', nargs='?', default='文书', help='文书根目录（默认: 文书）')
+    update_parser.add_argument('--workers', type=int, default=os.cpu_count(), help='进程数（默认: CPU核数）')
+    subparsers.add_parser('merge', help='按分层策略合并，直到没有需要合并的层')
+    subparsers.add_parser('status', help='显示各段')
+    search_parser = subparsers.add_parser('search', help='检索')
+    search_parser.add_argument('query', help='查询：空格表示同时命中，OR表示任一命中，-词表示排除')
+    search_parser.add_argument('--limit', type=int, default=20, help='最多返回条数（默认: 20）')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    
+    if args.command == 'search':
+        reader = SegmentReader(args.index)
+        try:
+            hits = reader.search(args.query, args.limit)
+            print(f"共显示 {len(hits)} 条结果:")
+            for i, hit in enumerate(hits):
+                print(f"{i+1}. [{hit['date']}] {hit['title']}")
+                print(f"   {hit['file_path']}")
+        finally:
+            reader.close()
+        return True
+    
+    index = SegmentedIndex(args.index, workers=getattr(args, 'workers', 1))
+    try:
+        if args.command == 'update':
+            if not os.path.isdir(args.root):
+                print(f"✗ 目录不存在: {args.root}")
+                return False
+            submitted = index.update(args.root)
+            print(f"✓ 已为 {submitted} 个日期建立索引段")
+        elif args.command == 'merge':
+            index.maybe_merge()
+            index.wait()
+        for line in index.status():
+            print(line)
+    finally:
+        index.close()
+    return True
+
+
+if __name__ == "__main__":
+    main()
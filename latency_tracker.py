@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 操作耗时统计
+功能：按操作类型记录耗时的对数分桶直方图，由p99加余量推算超时时间，直方图跨运行持久化
+"""
+
+import os
+import json
+import math
+import time
+
+# 分桶：第i个桶覆盖 [BASE_MS * RATIO**i, BASE_MS * RATIO**(i+1))
+BASE_MS = 10.0
+RATIO = 1.2
+BUCKET_COUNT = 64  # 最大约 10ms * 1.2**64 ≈ 1.2 * 10**6 ms
+
+
+def bucket_of(elapsed_ms):
+    """耗时所在的桶"""
+    if elapsed_ms <= BASE_MS:
+        return 0
+    return min(int(math.log(elapsed_ms / BASE_MS, RATIO)), BUCKET_COUNT - 1)
+
+
+def bucket_upper_ms(index):
+    """桶的上界（毫秒）"""
+    return BASE_MS * RATIO ** (index + 1)
+
+
+class LatencyTracker:
+    """各类操作的耗时直方图与自适应超时"""
+    
+    def __init__(self, path='操作耗时.json', multiplier=1.5, margin_ms=2000,
+                 min_ms=3000, max_ms=60000, min_samples=30, window=1000, save_every=20):
+        """
+        加载（或新建）耗时统计
+        
+        Args:
+            path (str): 直方图保存路径
+            multiplier (float): 超时 = p99 * multiplier + margin_ms
+            margin_ms (int): 超时的固定余量
+            min_ms (int): 超时下限
+            max_ms (int): 超时上限
+            min_samples (int): 样本不足该数量时使用调用方给出的默认超时
+            window (int): 样本数超过该值时所有桶减半，使统计偏向近期
+            save_every (int): 每记录该数量的样本保存一次
+        """
+        self.path = path
+        self.multiplier = multiplier
+        self.margin_ms = margin_ms
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.min_samples = min_samples
+        self.window = window
+        self.save_every = save_every
+        self.histograms = {}  # 操作 -> 各桶计数
+        self._unsaved = 0
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.histograms = {op: counts for op, counts in json.load(f).items()
+                                       if len(counts) == BUCKET_COUNT}
+            except (OSError, ValueError) as e:
+                print(f"⚠ 操作耗时统计读取失败，重新开始: {str(e)}")
+    
+    def record(self, op, elapsed_ms):
+        """
+        记录一次耗时（超时的操作按超时时间记录，实际耗时只会更长）
+        
+        Args:
+            op (str): 操作类型，如'goto:networkidle'
+            elapsed_ms (float): 耗时（毫秒）
+        """
+        counts = self.histograms.setdefault(op, [0] * BUCKET_COUNT)
+        counts[bucket_of(elapsed_ms)] += 1
+        if sum(counts) > self.window:
+            self.histograms[op] = [c / 2 for c in counts]
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+    
+    def percentile(self, op, q):
+        """
+        估计某操作耗时的分位数（取所在桶的上界）
+        
+        Returns:
+            float: 毫秒，没有样本时返回None
+        """
+        counts = self.histograms.get(op)
+        if not counts:
+            return None
+        total = sum(counts)
+        if total == 0:
+            return None
+        threshold = total * q
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= threshold:
+                return bucket_upper_ms(index)
+        return bucket_upper_ms(BUCKET_COUNT - 1)
+    
+    def timeout(self, op, default_ms):
+        """
+        某操作应使用的超时时间
+        
+        Args:
+            op (str): 操作类型
+            default_ms (int): 样本不足时使用的超时
+        
+        Returns:
+            int: 超时（毫秒）
+        """
+        counts = self.histograms.get(op)
+        if not counts or sum(counts) < self.min_samples:
+            return default_ms
+        estimate = self.percentile(op, 0.99) * self.multiplier + self.margin_ms
+        return int(min(max(estimate, self.min_ms), self.max_ms))
+    
+    def run(self, op, default_ms, func, record_timeouts=True):
+        """
+        以自适应超时执行操作并记录耗时
+        
+        Args:
+            op (str): 操作类型
+            default_ms (int): 样本不足时使用的超时
+            func (callable): 参数为超时（毫秒）的操作
+            record_timeouts (bool): 是否记录超时的失败。等待元素出现时超时通常说明元素不存在，
+                而不是页面慢，这类操作应传False，否则失败会把超时越推越长
+        
+        Returns:
+            操作的返回值；操作抛出的异常原样抛出
+        """
+        timeout_ms = self.timeout(op, default_ms)
+        start = time.perf_counter()
+        try:
+            result = func(timeout_ms)
+        except Exception:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            # 只有耗尽超时的失败才说明操作比预期慢，其余失败与耗时无关
+            if record_timeouts and elapsed_ms >= timeout_ms * 0.95:
+                self.record(op, elapsed_ms)
+            raise
+        self.record(op, (time.perf_counter() - start) * 1000)
+        return result
+    
+    def save(self):
+        """写入直方图文件（先写临时文件再替换）"""
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.histograms, f)
+            os.replace(tmp_path, self.path)
+            self._unsaved = 0
+        except OSError as e:
+            print(f"⚠ 操作耗时统计保存失败: {str(e)}")
+    
+    def summary(self):
+        """
+        各操作的样本数、p50、p99和当前超时
+        
+        Returns:
+            list: 每个操作一行说明
+        """
+        lines = []
+        for op, counts in sorted(self.histograms.items()):
+            lines.append(f"{op}: 样本 {sum(counts):.0f}，p50 {self.percentile(op, 0.5) / 1000:.1f}s，"
+                         f"p99 {self.percentile(op, 0.99) / 1000:.1f}s，超时 {self.timeout(op, 30000) / 1000:.1f}s")
+        return lines
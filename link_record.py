@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 文书链接
+功能：不可变、可哈希的文书链接记录，以及按docId去重并保持顺序的链接集合
+"""
+
+from typing import NamedTuple
+
+from doc_id import extract_doc_id
+
+
+class LinkRecord(NamedTuple):
+    """一条文书链接：docId、URL、标题，以及所在的结果页和页内序号（从1开始，未知时为0）"""
+    doc_id: str
+    url: str
+    title: str
+    page: int = 0
+    position: int = 0
+    
+    @classmethod
+    def from_url(cls, url, title, page=0, position=0):
+        """由URL和标题构造，docId从URL中提取"""
+        return cls(extract_doc_id(url), url, title, page, position)
+
+
+class LinkSet:
+    """按docId去重、保持插入顺序的链接集合"""
+    
+    __slots__ = ('_records',)
+    
+    def __init__(self, records=()):
+        self._records = {}
+        self.update(records)
+    
+    def add(self, record):
+        """
+        加入一条链接，docId已存在时保留先加入的那条
+        
+        Returns:
+            bool: 是否为新增
+        """
+        if record.doc_id in self._records:
+            return False
+        self._records[record.doc_id] = record
+        return True
+    
+    def update(self, records):
+        """
+        加入多条链接
+        
+        Returns:
+            list: 其中新增的链接
+        """
+        return [record for record in records if self.add(record)]
+    
+    def get(self, doc_id, default=None):
+        """按docId取链接"""
+        return self._records.get(doc_id, default)
+    
+    def __contains__(self, item):
+        doc_id = item.doc_id if isinstance(item, LinkRecord) else item
+        return doc_id in self._records
+    
+    def __iter__(self):
+        return iter(self._records.values())
+    
+    def __len__(self):
+        return len(self._records)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 页面就绪条件
+功能：每个步骤等待它真正需要的DOM条件，而不是等待网络空闲；
+统计请求、长轮询等不影响页面内容的请求不再拖长每次等待
+"""
+
+# 条件名 -> 在页面内判断是否就绪的函数
+READY_CONDITIONS = {
+    # 首页：高级检索入口已渲染
+    'home': """() => !!document.querySelector('.advenced-search, div[class*="advenced-search"]')""",
+    # 高级检索表单：裁判日期输入框和检索按钮已渲染
+    'advanced_form': """() => !!document.querySelector('#cprqStart') && !!document.querySelector('#searchBtn')""",
+    # 检索结果：文书链接列表已填充
+    'results': """() => document.querySelectorAll('h4 a.caseName').length > 0""",
+    # 分页：分页按钮或页面大小选择框已渲染
+    'pager': """() => !!document.querySelector('a.pageButton, a[class*="pageButton"], select.pageSizeSelect')""",
+    # 文书详情：正文容器PDF_pox已有内容（gaiyao_center的概要可能先渲染，不能作为就绪依据）
+    'detail': """() => {
+        const box = document.querySelector('div.PDF_pox');
+        return !!box && box.textContent.trim().length > 0;
+    }""",
+}
+
+# 结果列表的签名：链接数量和第一条链接，用于判断翻页、筛选后列表是否已重新渲染
+RESULTS_SIGNATURE_JS = """() => {
+    const links = document.querySelectorAll('h4 a.caseName');
+    return links.length + '|' + (links.length ? links[0].getAttribute('href') : '');
+}"""
+
+# 列表已重新渲染：签名与操作前不同且列表非空
+RESULTS_CHANGED_JS = """before => {
+    const links = document.querySelectorAll('h4 a.caseName');
+    const signature = links.length + '|' + (links.length ? links[0].getAttribute('href') : '');
+    return links.length > 0 && signature !== before;
+}"""
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 原始网页归档
+功能：按日期追加写入压缩后的原始HTML，按docId随机读取，便于离线重新清洗而无需重新访问网站
+
+目录结构：
+    原始网页/<日期>.seg   记录段，只追加，每条记录单独压缩
+    原始网页/<日期>.idx   索引，每行"偏移\t长度\tdocId"
+"""
+
+import os
+import json
+import zlib
+import struct
+import hashlib
+import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 记录头：魔数、压缩方式、docId长度、元数据长度、正文长度、正文crc32
+RECORD_HEADER = struct.Struct('<4sBHIII')
+RECORD_MAGIC = b'RHA1'
+
+CODEC_ZLIB = 0
+CODEC_ZSTD = 1
+
+SEGMENT_SUFFIX = '.seg'
+INDEX_SUFFIX = '.idx'
+
+
+class RawHtmlArchive:
+    """原始网页归档：每个日期一个只追加的记录段，外加docId到偏移的索引"""
+    
+    def __init__(self, root='原始网页', level=None, read_only=False):
+        """
+        初始化归档
+        
+        Args:
+            root (str): 归档目录
+            level (int): 压缩级别，默认zstd为10、zlib为6
+            read_only (bool): 只读打开（如批量重新清洗），不修改记录段和索引文件，
+                可以与正在追加的采集程序同时运行
+        """
+        self.root = root
+        self.read_only = read_only
+        if zstandard is not None:
+            self.codec = CODEC_ZSTD
+            self._compressor = zstandard.ZstdCompressor(level=level or 10)
+        else:
+            self.codec = CODEC_ZLIB
+            self._level = level or 6
+        self._indexes = {}  # 日期 -> {docId: (偏移, 长度)}
+        
+        if not read_only and not os.path.exists(self.root):
+            os.makedirs(self.root)
+            print(f"✓ 创建文件夹: {self.root}")
+    
+    def segment_path(self, date_str):
+        """日期对应的记录段路径"""
+        return os.path.join(self.root, date_str + SEGMENT_SUFFIX)
+    
+    def index_path(self, date_str):
+        """日期对应的索引路径"""
+        return os.path.join(self.root, date_str + INDEX_SUFFIX)
+    
+    def dates(self):
+        """
+        列出已有归档的日期
+        
+        Returns:
+            list: 排序后的日期列表
+        """
+        return sorted(name[:-len(SEGMENT_SUFFIX)] for name in os.listdir(self.root)
+                      if name.endswith(SEGMENT_SUFFIX))
+    
+    def append(self, date_str, doc_id, html_content, url='', title='', collected_at=None):
+        """
+        追加一篇原始HTML
+        
+        同一docId再次写入时追加新记录，索引指向最新的一条。
+        
+        Args:
+            date_str (str): 日期，决定写入哪个记录段
+            doc_id (str): 文书docId
+            html_content (str): 原始HTML
+            url (str): 原始URL
+            title (str): 文档标题
+            collected_at (str): 收集时间，默认为当前时间
+        
+        Returns:
+            int: 记录在段内的偏移
+        
+        Raises:
+            RuntimeError: 归档以只读方式打开
+        """
+        if self.read_only:
+            raise RuntimeError(f"归档以只读方式打开，不能写入: {self.root}")
+        index = self._load_index(date_str)
+        raw = html_content.encode('utf-8')
+        meta = json.dumps({
+            'url': url,
+            'title': title,
+            'collected_at': collected_at or datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'size': len(raw),
+            'sha1': hashlib.sha1(raw).hexdigest(),
+        }, ensure_ascii=False).encode('utf-8')
+        if self.codec == CODEC_ZSTD:
+            payload = self._compressor.compress(raw)
+        else:
+            payload = zlib.compress(raw, self._level)
+        key = doc_id.encode('utf-8')
+        record = RECORD_HEADER.pack(RECORD_MAGIC, self.codec, len(key), len(meta),
+                                    len(payload), zlib.crc32(payload)) + key + meta + payload
+        
+        # 先落盘记录再写索引，崩溃时索引最多缺几条，重新打开时从段中补齐
+        with open(self.segment_path(date_str), 'ab') as f:
+            offset = f.tell()
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.index_path(date_str), 'a', encoding='utf-8') as f:
+            f.write(f"{offset}\t{len(record)}\t{doc_id}\n")
+        index[doc_id] = (offset, len(record))
+        return offset
+    
+    def doc_ids(self, date_str):
+        """
+        列出某个日期已归档的docId
+        
+        Returns:
+            list: 按记录在段内的顺序排列的docId
+        """
+        index = self._load_index(date_str)
+        return sorted(index, key=index.get)
+    
+    def has(self, date_str, doc_id):
+        """检查某篇文书是否已归档"""
+        return doc_id in self._load_index(date_str)
+    
+    def read(self, date_str, doc_id):
+        """
+        按docId读取一篇原始HTML，只解压这一条记录
+        
+        Args:
+            date_str (str): 日期
+            doc_id (str): 文书docId
+        
+        Returns:
+            tuple: (元数据dict, 原始HTML)，未找到时返回None
+        """
+        entry = self._load_index(date_str).get(doc_id)
+        if entry is None:
+            return None
+        offset, length = entry
+        with open(self.segment_path(date_str), 'rb') as f:
+            f.seek(offset)
+            record = self._parse_record(f.read(length))
+        if record is None:
+            raise ValueError(f"归档记录损坏: {date_str} {doc_id}")
+        _, meta, payload, codec = record
+        return meta, self._decompress(payload, codec)
+    
+    def iter_records(self, date_str):
+        """
+        顺序遍历某个日期的全部记录（同一docId的旧记录也会出现）
+        
+        Args:
+            date_str (str): 日期
+        
+        Yields:
+            tuple: (docId, 元数据dict, 原始HTML)
+        """
+        with open(self.segment_path(date_str), 'rb') as f:
+            for doc_id, meta, payload, codec in self._scan(f):
+                yield doc_id, meta, self._decompress(payload, codec)
+    
+    def _load_index(self, date_str):
+        """
+        加载某个日期的索引，并与记录段核对
+        
+        索引末尾缺失的记录从段中补齐；段末尾写了一半的记录被截掉；
+        索引指向段外时整个重建。只读时补齐的索引只保留在内存中，
+        末尾不完整的记录（可能正在被采集程序写入）忽略而不截掉。
+        """
+        if date_str in self._indexes:
+            return self._indexes[date_str]
+        
+        index = {}
+        end = 0
+        if os.path.exists(self.index_path(date_str)):
+            with open(self.index_path(date_str), 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.rstrip('\n').split('\t', 2)
+                    # 跳过崩溃时写了一半的行
+                    if len(parts) != 3 or not line.endswith('\n'):
+                        continue
+                    offset, length = int(parts[0]), int(parts[1])
+                    index[parts[2]] = (offset, length)
+                    end = max(end, offset + length)
+        
+        seg_path = self.segment_path(date_str)
+        size = os.path.getsize(seg_path) if os.path.exists(seg_path) else 0
+        if end > size:
+            print(f"⚠ 归档索引与记录段不一致，{'在内存中' if self.read_only else ''}重建索引: {date_str}")
+            index, end = {}, 0
+        if size > end:
+            index = self._recover(date_str, index, end)
+        
+        self._indexes[date_str] = index
+        return index
+    
+    def _recover(self, date_str, index, start):
+        """从start开始扫描记录段，补写索引并截掉末尾不完整的记录（只读时只补齐内存中的索引）"""
+        seg_path = self.segment_path(date_str)
+        recovered = []
+        with open(seg_path, 'rb' if self.read_only else 'r+b') as f:
+            f.seek(start)
+            end = start
+            for doc_id, _, _, _ in self._scan(f):
+                recovered.append((end, f.tell() - end, doc_id))
+                end = f.tell()
+            if end < os.path.getsize(seg_path) and not self.read_only:
+                print(f"⚠ 截掉归档末尾不完整的记录: {seg_path}")
+                f.truncate(end)
+        
+        for offset, length, doc_id in recovered:
+            index[doc_id] = (offset, length)
+        if self.read_only:
+            return index
+        # 原索引末尾可能有写了一半的行，按偏移顺序整体重写
+        tmp_path = self.index_path(date_str) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for doc_id, (offset, length) in sorted(index.items(), key=lambda item: item[1]):
+                f.write(f"{offset}\t{length}\t{doc_id}\n")
+        os.replace(tmp_path, self.index_path(date_str))
+        if recovered:
+            print(f"✓ 从记录段恢复 {len(recovered)} 条索引: {date_str}")
+        return index
+    
+    def _scan(self, f):
+        """从文件当前位置顺序读取完整记录，遇到不完整或损坏的记录即停止"""
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            magic, codec, key_len, meta_len, payload_len, _ = RECORD_HEADER.unpack(header)
+            if magic != RECORD_MAGIC:
+                return
+            body = f.read(key_len + meta_len + payload_len)
+            record = self._parse_record(header + body)
+            if record is None:
+                f.seek(-len(header) - len(body), os.SEEK_CUR)
+                return
+            yield record
+    
+    def _parse_record(self, data):
+        """解析一条记录，不完整或校验失败时返回None"""
+        if len(data) < RECORD_HEADER.size:
+            return None
+        magic, codec, key_len, meta_len, payload_len, crc = RECORD_HEADER.unpack_from(data)
+        start = RECORD_HEADER.size
+        if magic != RECORD_MAGIC or len(data) != start + key_len + meta_len + payload_len:
+            return None
+        payload = data[start + key_len + meta_len:]
+        if zlib.crc32(payload) != crc:
+            return None
+        doc_id = data[start:start + key_len].decode('utf-8')
+        meta = json.loads(data[start + key_len:start + key_len + meta_len].decode('utf-8'))
+        return doc_id, meta, payload, codec
+    
+    def _decompress(self, payload, codec):
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("该记录使用zstd压缩，请先安装zstandard")
+            return zstandard.ZstdDecompressor().decompress(payload).decode('utf-8')
+        return zlib.decompress(payload).decode('utf-8')
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 压缩位图
+功能：Roaring风格的32位整数集合，按高16位分桶，每个桶元素少时存为排序的uint16数组，
+多时存为65536位的位图；用于存放文书号集合，支持交集、并集、区间过滤和序列化
+
+序列化格式（与url_dedup_store相同，按本机字节序）：
+    桶数 uint32，然后每个桶依次为 高16位 uint16、类型 uint8（0数组/1位图）、元素数 uint32、内容
+    数组桶的内容为 元素数 个uint16，位图桶的内容为 8192 字节
+"""
+
+import struct
+from array import array
+
+ARRAY_LIMIT = 4096  # 元素数超过该值时数组桶改为位图桶（此时数组不再比8KB的位图小）
+BITMAP_BYTES = 8192
+TYPE_ARRAY = 0
+TYPE_BITMAP = 1
+_HEADER = struct.Struct('=I')
+_CONTAINER = struct.Struct('=HBI')
+
+
+# Python 3.10以下没有int.bit_count
+_bit_count = getattr(int, 'bit_count', None) or (lambda value: bin(value).count('1'))
+
+
+# 每个字节值中为1的位
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+def _bits_to_array(bits):
+    """位图桶（整数）转为排序的uint16数组"""
+    values = array('H')
+    for index, byte in enumerate(bits.to_bytes(BITMAP_BYTES, 'little')):
+        if byte:
+            base = index << 3
+            values.extend(base + bit for bit in _BYTE_BITS[byte])
+    return values
+
+
+def _array_to_bits(values):
+    """排序的uint16数组转为位图桶（整数）"""
+    buf = bytearray(BITMAP_BYTES)
+    for value in values:
+        buf[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def _normalize(container):
+    """按元素数选择桶的存放方式；空桶返回None"""
+    if isinstance(container, int):
+        count = _bit_count(container)
+        if count == 0:
+            return None
+        return _bits_to_array(container) if count <= ARRAY_LIMIT else container
+    if not container:
+        return None
+    return container if len(container) <= ARRAY_LIMIT else _array_to_bits(container)
+
+
+def _and(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return _normalize(a & b)
+    if isinstance(a, int):
+        a, b = b, a
+    if isinstance(b, int):
+        return _normalize(array('H', (value for value in a if b >> value & 1)))
+    if len(a) > len(b):
+        a, b = b, a
+    other = set(b)
+    return _normalize(array('H', (value for value in a if value in other)))
+
+
+def _and_count(a, b):
+    """两个桶交集的元素数"""
+    if isinstance(a, int) and isinstance(b, int):
+        return _bit_count(a & b)
+    if isinstance(a, int):
+        a, b = b, a
+    if isinstance(b, int):
+        return sum(b >> value & 1 for value in a)
+    if len(a) > len(b):
+        a, b = b, a
+    return len(set(a).intersection(b))
+
+
+def _or(a, b):
+    if isinstance(a, int) or isinstance(b, int) or len(a) + len(b) > ARRAY_LIMIT:
+        a = a if isinstance(a, int) else _array_to_bits(a)
+        b = b if isinstance(b, int) else _array_to_bits(b)
+        return _normalize(a | b)
+    return array('H', sorted(set(a).union(b)))
+
+
+class RoaringBitmap:
+    """32位非负整数的压缩集合"""
+    
+    __slots__ = ('_containers',)
+    
+    def __init__(self, values=()):
+        """
+        Args:
+            values (iterable): 初始元素，不要求有序、可以重复
+        """
+        groups = {}
+        for value in values:
+            groups.setdefault(value >> 16, []).append(value & 0xFFFF)
+        self._containers = {}
+        for high, lows in groups.items():
+            self._containers[high] = _normalize(array('H', sorted(set(lows))))
+    
+    @classmethod
+    def _from_containers(cls, containers):
+        bitmap = cls()
+        bitmap._containers = containers
+        return bitmap
+    
+    def __len__(self):
+        return sum(_bit_count(c) if isinstance(c, int) else len(c) for c in self._containers.values())
+    
+    def __bool__(self):
+        return bool(self._containers)
+    
+    def __contains__(self, value):
+        container = self._containers.get(value >> 16)
+        if container is None:
+            return False
+        low = value & 0xFFFF
+        if isinstance(container, int):
+            return bool(container >> low & 1)
+        # 排序数组上二分
+        lo, hi = 0, len(container)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if container[mid] < low:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < len(container) and container[lo] == low
+    
+    def __iter__(self):
+        for high in sorted(self._containers):
+            base = high << 16
+            container = self._containers[high]
+            lows = _bits_to_array(container) if isinstance(container, int) else container
+            for low in lows:
+                yield base | low
+    
+    def __and__(self, other):
+        containers = {}
+        for high, container in self._containers.items():
+            if high in other._containers:
+                result = _and(container, other._containers[high])
+                if result is not None:
+                    containers[high] = result
+        return self._from_containers(containers)
+    
+    def __or__(self, other):
+        containers = dict(self._containers)
+        for high, container in other._containers.items():
+            containers[high] = _or(containers[high], container) if high in containers else container
+        return self._from_containers(containers)
+    
+    def intersection_len(self, other):
+        """交集的元素数（不构造交集）"""
+        total = 0
+        for high, container in self._containers.items():
+            if high in other._containers:
+                total += _and_count(container, other._containers[high])
+        return total
+    
+    def range(self, start, stop):
+        """
+        只保留[start, stop)内的元素
+        
+        Returns:
+            RoaringBitmap: 新的集合
+        """
+        if start >= stop:
+            return RoaringBitmap()
+        first, last = start >> 16, (stop - 1) >> 16
+        containers = {}
+        for high, container in self._containers.items():
+            if high < first or high > last:
+                continue
+            low_start = start & 0xFFFF if high == first else 0
+            low_stop = ((stop - 1) & 0xFFFF) + 1 if high == last else 0x10000
+            if low_start == 0 and low_stop == 0x10000:
+                containers[high] = container
+                continue
+            if isinstance(container, int):
+                mask = ((1 << low_stop) - 1) ^ ((1 << low_start) - 1)
+                result = _normalize(container & mask)
+            else:
+                result = _normalize(array('H', (value for value in container if low_start <= value < low_stop)))
+            if result is not None:
+                containers[high] = result
+        return self._from_containers(containers)
+    
+    def serialize(self):
+        """
+        Returns:
+            bytes: 序列化结果，格式见模块说明
+        """
+        parts = [_HEADER.pack(len(self._containers))]
+        for high in sorted(self._containers):
+            container = self._containers[high]
+            if isinstance(container, int):
+                parts.append(_CONTAINER.pack(high, TYPE_BITMAP, _bit_count(container)))
+                parts.append(container.to_bytes(BITMAP_BYTES, 'little'))
+            else:
+                parts.append(_CONTAINER.pack(high, TYPE_ARRAY, len(container)))
+                parts.append(container.tobytes())
+        return b''.join(parts)
+    
+    @classmethod
+    def deserialize(cls, data, offset=0):
+        """
+        从bytes或mmap的offset处读取
+        
+        Returns:
+            RoaringBitmap: 读取结果
+        """
+        (count,) = _HEADER.unpack_from(data, offset)
+        pos = offset + _HEADER.size
+        containers = {}
+        for _ in range(count):
+            high, kind, cardinality = _CONTAINER.unpack_from(data, pos)
+            pos += _CONTAINER.size
+            if kind == TYPE_BITMAP:
+                containers[high] = int.from_bytes(data[pos:pos + BITMAP_BYTES], 'little')
+                pos += BITMAP_BYTES
+            else:
+                values = array('H')
+                values.frombytes(data[pos:pos + cardinality * 2])
+                containers[high] = values
+                pos += cardinality * 2
+        return cls._from_containers(containers)
+
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 请求路由策略
+功能：按页面类型拦截图片、字体、媒体等与正文无关的资源请求，统计拦截的请求数、
+实际下载的流量（放行响应的content-length）和估计节省的流量
+"""
+
+import re
+
+PAGE_SEARCH = 'search'  # 首页、检索和结果列表页
+PAGE_DETAIL = 'detail'  # 文书详情页
+
+# 被拦截的请求无法得知实际大小：同类资源有放行过的（如验证码图片）按其实测平均大小估算，
+# 否则按下列常见大小估算
+ESTIMATED_BYTES = {
+    'image': 30 * 1024,
+    'font': 80 * 1024,
+    'media': 500 * 1024,
+    'stylesheet': 20 * 1024,
+}
+
+# 验证码图片必须放行，否则无法识别验证页面
+CAPTCHA_PATTERNS = [r'captcha', r'yzm', r'verify', r'validatecode', r'checkcode']
+
+DEFAULT_RULES = {
+    PAGE_SEARCH: {
+        'block_types': {'image', 'font', 'media'},
+        'allow_patterns': CAPTCHA_PATTERNS,
+        'deny_patterns': [],
+    },
+    PAGE_DETAIL: {
+        'block_types': {'image', 'font', 'media'},
+        'allow_patterns': CAPTCHA_PATTERNS,
+        'deny_patterns': [],
+    },
+}
+
+
+def page_kind_of(url):
+    """根据页面URL判断页面类型，带docId的是文书详情页"""
+    return PAGE_DETAIL if 'docId=' in url else PAGE_SEARCH
+
+
+class RoutePolicy:
+    """按页面类型决定放行或拦截的路由策略，注册到浏览器上下文上"""
+    
+    def __init__(self, rules=None):
+        """
+        Args:
+            rules (dict): 页面类型 -> {'block_types': 拦截的资源类型集合,
+                'allow_patterns': 总是放行的URL正则, 'deny_patterns': 总是拦截的URL正则}，
+                默认使用DEFAULT_RULES
+        """
+        self.rules = {}
+        for kind, rule in (rules or DEFAULT_RULES).items():
+            self.rules[kind] = {
+                'block_types': set(rule.get('block_types', ())),
+                'allow': self._compile(rule.get('allow_patterns', ())),
+                'deny': self._compile(rule.get('deny_patterns', ())),
+            }
+        self.reset_stats()
+    
+    @staticmethod
+    def _compile(patterns):
+        if not patterns:
+            return None
+        return re.compile('|'.join(f'(?:{p})' for p in patterns), re.IGNORECASE)
+    
+    def reset_stats(self):
+        """清零统计"""
+        self.allowed = 0
+        self.blocked = {}  # 资源类型 -> 拦截数
+        self.measured = {}  # 资源类型 -> [有content-length的放行响应数, 字节数]
+    
+    def should_block(self, kind, resource_type, url):
+        """
+        判断某个请求是否拦截
+        
+        Args:
+            kind (str): 请求所在页面的类型
+            resource_type (str): playwright的资源类型，如image、font、document
+            url (str): 请求URL
+        
+        Returns:
+            bool: 是否拦截
+        """
+        rule = self.rules.get(kind)
+        if rule is None or resource_type == 'document':
+            return False
+        if rule['allow'] is not None and rule['allow'].search(url):
+            return False
+        if rule['deny'] is not None and rule['deny'].search(url):
+            return True
+        return resource_type in rule['block_types']
+    
+    def handle(self, route):
+        """playwright路由回调：context.route('**/*', policy.handle)"""
+        request = route.request
+        try:
+            page_url = request.frame.url
+        except Exception:
+            page_url = request.url
+        resource_type = request.resource_type
+        if self.should_block(page_kind_of(page_url), resource_type, request.url):
+            self.blocked[resource_type] = self.blocked.get(resource_type, 0) + 1
+            route.abort('blockedbyclient')
+        else:
+            self.allowed += 1
+            route.continue_()
+    
+    def record_response(self, response):
+        """playwright响应回调：按content-length累计放行请求实际下载的字节数（没有该头的不计）"""
+        try:
+            length = int(response.headers.get('content-length', ''))
+            resource_type = response.request.resource_type
+        except ValueError:
+            return
+        entry = self.measured.setdefault(resource_type, [0, 0])
+        entry[0] += 1
+        entry[1] += length
+    
+    @property
+    def bytes_downloaded(self):
+        """放行请求实测的下载字节数"""
+        return sum(total for _, total in self.measured.values())
+    
+    @property
+    def bytes_saved(self):
+        """被拦截请求的估计字节数（估算方法见ESTIMATED_BYTES）"""
+        saved = 0
+        for resource_type, count in self.blocked.items():
+            responses, total = self.measured.get(resource_type, (0, 0))
+            size = total / responses if responses else ESTIMATED_BYTES.get(resource_type, 0)
+            saved += count * size
+        return int(saved)
+    
+    def attach(self, context):
+        """将策略注册到浏览器上下文，之后新建的页面都按策略路由并统计响应大小"""
+        context.route('**/*', self.handle)
+        context.on('response', self.record_response)
+    
+    def summary(self):
+        """
+        统计摘要
+        
+        Returns:
+            str: 放行数、拦截数（按类型）、实测下载流量和估计节省的流量
+        """
+        blocked_total = sum(self.blocked.values())
+        detail = '，'.join(f'{t} {n}' for t, n in sorted(self.blocked.items())) or '无'
+        return (f"放行请求 {self.allowed} 个，拦截 {blocked_total} 个（{detail}），"
+                f"实测下载 {self.bytes_downloaded / 1024 / 1024:.1f}MB（按content-length），"
+                f"节省流量约 {self.bytes_saved / 1024 / 1024:.1f}MB（估计值，未实测）")
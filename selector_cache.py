@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 选择器缓存
+功能：记住每个步骤上次命中的选择器，下次优先尝试，未命中时才遍历整条候选链；
+同时记录每个步骤的命中率和每个选择器的耗时，持久化到JSON文件
+"""
+
+import os
+import json
+import time
+
+
+class SelectorCache:
+    """按步骤缓存命中的选择器"""
+    
+    def __init__(self, path='选择器缓存.json', max_failures=3):
+        """
+        加载（或新建）缓存
+        
+        Args:
+            path (str): 缓存文件路径
+            max_failures (int): 缓存的选择器连续失败该次数后作废，回到按顺序尝试
+        """
+        self.path = path
+        self.max_failures = max_failures
+        self.steps = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.steps = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠ 选择器缓存读取失败，重新开始: {str(e)}")
+    
+    def _step(self, step):
+        return self.steps.setdefault(step, {
+            'winner': None,
+            'failures': 0,
+            'hits': 0,
+            'misses': 0,
+            'selectors': {},
+        })
+    
+    def _try(self, entry, selector, query):
+        """执行一次查询并记录耗时，出错视为未找到"""
+        start = time.perf_counter()
+        try:
+            result = query(selector)
+        except Exception:
+            result = None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        stats = entry['selectors'].setdefault(selector, {'tries': 0, 'found': 0, 'total_ms': 0.0})
+        stats['tries'] += 1
+        stats['total_ms'] = round(stats['total_ms'] + elapsed_ms, 1)
+        if result:
+            stats['found'] += 1
+        return result
+    
+    def find(self, step, selectors, query):
+        """
+        按缓存优先、候选链兜底的顺序查找
+        
+        Args:
+            step (str): 步骤名，如'next_page'
+            selectors (list): 候选选择器，按优先级排列
+            query (callable): 查询函数，参数为选择器，返回真值表示找到
+        
+        Returns:
+            tuple: (查询结果, 命中的选择器)，都未找到时为(None, None)
+        """
+        entry = self._step(step)
+        winner = entry['winner']
+        if winner in selectors:
+            result = self._try(entry, winner, query)
+            if result:
+                entry['hits'] += 1
+                entry['failures'] = 0
+                self.save()
+                return result, winner
+        
+        entry['misses'] += 1
+        for selector in selectors:
+            if selector == winner:
+                continue
+            result = self._try(entry, selector, query)
+            if result:
+                entry['winner'] = selector
+                entry['failures'] = 0
+                self.save()
+                return result, selector
+        
+        # 整条链都没找到（例如已到最后一页），缓存的选择器多次落空后才作废
+        if winner is not None:
+            entry['failures'] += 1
+            if entry['failures'] >= self.max_failures:
+                print(f"⚠ 选择器缓存作废: {step} -> {winner}")
+                entry['winner'] = None
+                entry['failures'] = 0
+        self.save()
+        return None, None
+    
+    def save(self):
+        """写入缓存文件（先写临时文件再替换）"""
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.steps, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠ 选择器缓存保存失败: {str(e)}")
+    
+    def summary(self):
+        """
+        各步骤的命中率和命中选择器的平均耗时
+        
+        Returns:
+            list: 每个步骤一行说明
+        """
+        lines = []
+        for step, entry in sorted(self.steps.items()):
+            total = entry['hits'] + entry['misses']
+            rate = entry['hits'] / total * 100 if total else 0.0
+            line = f"{step}: 命中率 {rate:.0f}% ({entry['hits']}/{total})"
+            stats = entry['selectors'].get(entry['winner'])
+            if stats and stats['tries']:
+                line += f"，当前选择器 {entry['winner']} 平均 {stats['total_ms'] / stats['tries']:.0f}ms"
+            lines.append(line)
+        return lines
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 法条引用
+功能：从清洗后的文书正文中提取引用的法条（如《中华人民共和国民事诉讼法》第一百七十七条第一款第一项），
+规范化法律名称、把条款项号转换为整数，并建立 (法律, 条) -> 文书号 的压缩位图索引，
+用于按法条、日期检索文书和统计共同引用
+
+索引目录结构：
+    laws.json      法律名称字典（按字符串排序）和各日期的第一篇文书号
+    keys.bin       已排序的uint64键数组，键为 法律编号<<32 | 条号<<8 | "之几"，通过mmap二分查找
+    entries.dat    与键一一对应的(位图偏移 uint64, 字节数 uint32)
+    bitmaps.bin    各键引用该条的文书号集合（roaring_bitmap序列化）
+    doc_keys.bin / doc_keys.idx    正排：每篇文书引用的键的下标（uint32数组）及每篇的起点
+    docs.dat / docs.idx            文书信息，每行"docId\t日期\t文件路径\t标题"，文书号按日期排列
+"""
+
+import os
+import re
+import sys
+import mmap
+import json
+import bisect
+import shutil
+import struct
+import argparse
+import unicodedata
+from array import array
+from collections import Counter
+from typing import NamedTuple
+from concurrent.futures import ProcessPoolExecutor
+
+from bigram_index import find_shards
+from chinese_numerals import chinese_to_int, NUMERAL_CHARS
+from document_catalog import parse_document_text
+from doc_id import extract_doc_id
+from roaring_bitmap import RoaringBitmap
+
+ENTRY = struct.Struct('<QI')
+
+_NUMBER = rf'[{NUMERAL_CHARS}0-9]+'
+LAW_PATTERN = re.compile(r'《([^《》]{2,80})》(?:[(（][^)）]{0,20}[)）])?')
+# 条，可带"之一"，后接款、项（项号可以带括号）
+ARTICLE_PATTERN = re.compile(
+    rf'第({_NUMBER})条(?:之({_NUMBER}))?'
+    rf'(?:第({_NUMBER})款)?'
+    rf'(?:第[(（]?({_NUMBER})[)）]?项)?'
+)
+# 同一条中接着列出的其他款、项，如"第一款第一项、第二项"中的"第二项"
+CLAUSE_PATTERN = re.compile(rf'(?:第({_NUMBER})款)?(?:第[(（]?({_NUMBER})[)）]?项)?')
+SEPARATOR_PATTERN = re.compile(r'\s*(?:、|，|,|以及|及|和|与)?\s*')
+VERSION_PATTERN = re.compile(r'[(（][^)）]*(?:年|修正|修订|试行)[^)）]*[)）]')
+# 书名号中也会出现合同、协议等名称，只有以这些词结尾的才当作法律法规
+LAW_NAME_PATTERN = re.compile(r'(?:法|法典|条例|规定|解释|办法|决定|规则|意见|批复|细则|修正案(?:\(.+\))?|公约)$')
+
+# 常见简称 -> 规范名称（规范名称去掉了"中华人民共和国"）
+LAW_ALIASES = {
+    '民诉法': '民事诉讼法',
+    '刑诉法': '刑事诉讼法',
+    '行诉法': '行政诉讼法',
+    '民诉法解释': '最高人民法院关于适用民事诉讼法的解释',
+    '民事诉讼法解释': '最高人民法院关于适用民事诉讼法的解释',
+}
+
+
+class StatuteCitation(NamedTuple):
+    """一处法条引用"""
+    law: str          # 规范化的法律名称
+    article: int
+    sub: int = 0      # "第一百零七条之一"中的一，没有时为0
+    paragraph: int = 0  # 款，没有时为0
+    item: int = 0     # 项，没有时为0
+    
+    def label(self):
+        """如'民事诉讼法第177条第1款第1项'"""
+        text = f"{self.law}第{self.article}条" + (f"之{self.sub}" if self.sub else '')
+        text += f"第{self.paragraph}款" if self.paragraph else ''
+        return text + (f"第{self.item}项" if self.item else '')
+
+
+def normalize_law_name(name):
+    """
+    规范化法律名称：去掉"中华人民共和国"、版本说明和书名号，常见简称换成全称
+    
+    Args:
+        name (str): 书名号中的法律名称或简称
+    
+    Returns:
+        str: 规范名称
+    """
+    name = unicodedata.normalize('NFKC', name)
+    name = VERSION_PATTERN.sub('', name)
+    name = re.sub(r'[\s《》〈〉<>]', '', name).replace('中华人民共和国', '')
+    return LAW_ALIASES.get(name, name)
+
+
+def _to_int(text):
+    return chinese_to_int(text) if text else 0
+
+
+def extract_statutes(body):
+    """
+    提取正文中的法条引用
+    
+    法律名称后连续列出的各条（以顿号、逗号、"和"等分隔）都归于该法律。
+    
+    Args:
+        body (str): 文书正文（DocumentCleaner的输出）
+    
+    Returns:
+        list: StatuteCitation列表，按出现顺序，已去重
+    """
+    text = unicodedata.normalize('NFKC', body)
+    citations = []
+    seen = set()
+    for law_match in LAW_PATTERN.finditer(text):
+        law = normalize_law_name(law_match.group(1))
+        if not LAW_NAME_PATTERN.search(law):
+            continue
+        pos = law_match.end()
+        article = None
+        while True:
+            separator = SEPARATOR_PATTERN.match(text, pos)
+            start = separator.end()
+            match = ARTICLE_PATTERN.match(text, start)
+            if match:
+                article, sub = _to_int(match.group(1)), _to_int(match.group(2))
+                citation = StatuteCitation(law, article, sub, _to_int(match.group(3)), _to_int(match.group(4)))
+            elif article is not None:
+                match = CLAUSE_PATTERN.match(text, start)
+                if not match.group(0):
+                    break
+                # 只写了款或项，沿用前一条（只写项时也沿用前一款）
+                paragraph = _to_int(match.group(1)) or (citations[-1].paragraph if citations else 0)
+                citation = StatuteCitation(law, article, sub, paragraph, _to_int(match.group(2)))
+            else:
+                break
+            if citation not in seen:
+                seen.add(citation)
+                citations.append(citation)
+            pos = match.end()
+    return citations
+
+
+def _extract_shard(shard_dir, shard_name):
+    """提取一个日期目录中全部文书的法条引用（在子进程中运行）"""
+    documents = []
+    for filename in sorted(os.listdir(shard_dir)):
+        if not filename.endswith('.txt'):
+            continue
+        file_path = os.path.join(shard_dir, filename)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                document = parse_document_text(f.read())
+            citations = extract_statutes(document['body'])
+        except (OSError, UnicodeDecodeError, ValueError):
+            continue
+        doc_id = extract_doc_id(document['url']) if document['url'] else 'file-' + file_path
+        articles = sorted({(c.law, c.article, c.sub) for c in citations})
+        documents.append((doc_id, shard_name, file_path, document['title'], articles))
+    return documents
+
+
+def _pack_key(law_id, article, sub):
+    return (law_id << 32) | (min(article, 0xFFFFFF) << 8) | min(sub, 0xFF)
+
+
+def build_index(root='文书', output_dir='法条索引', workers=None):
+    """
+    扫描文书目录建立法条索引（各日期目录并行提取，先写入临时目录再替换）
+    
+    Args:
+        root (str): 文书根目录
+        output_dir (str): 索引目录
+        workers (int): 进程数，默认CPU核数
+    
+    Returns:
+        int: 索引的文书数
+    """
+    shards = find_shards(root)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shard_results = list(executor.map(_extract_shard, *zip(*shards))) if shards else []
+    
+    laws = sorted({law for documents in shard_results for *_, articles in documents for law, _, _ in articles})
+    law_ids = {law: i for i, law in enumerate(laws)}
+    postings = {}
+    doc_keys = []
+    shard_starts = []
+    doc = 0
+    for (_, shard_name), documents in zip(shards, shard_results):
+        shard_starts.append([shard_name, doc])
+        for *_, articles in documents:
+            keys = [_pack_key(law_ids[law], article, sub) for law, article, sub in articles]
+            for key in keys:
+                postings.setdefault(key, []).append(doc)
+            doc_keys.append(keys)
+            doc += 1
+    sorted_keys = sorted(postings)
+    key_index = {key: i for i, key in enumerate(sorted_keys)}
+    
+    tmp_dir = output_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    with open(os.path.join(tmp_dir, 'keys.bin'), 'wb') as f:
+        f.write(array('Q', sorted_keys).tobytes())
+    entries = bytearray()
+    offset = 0
+    with open(os.path.join(tmp_dir, 'bitmaps.bin'), 'wb') as f:
+        for key in sorted_keys:
+            data = RoaringBitmap(postings[key]).serialize()
+            f.write(data)
+            entries += ENTRY.pack(offset, len(data))
+            offset += len(data)
+    with open(os.path.join(tmp_dir, 'entries.dat'), 'wb') as f:
+        f.write(entries)
+    
+    key_offsets = array('Q', [0])
+    doc_offsets = array('Q', [0])
+    with open(os.path.join(tmp_dir, 'doc_keys.bin'), 'wb') as keys_file, \
+            open(os.path.join(tmp_dir, 'docs.dat'), 'wb') as docs_file:
+        docs = (document for documents in shard_results for document in documents)
+        for keys, (doc_id, shard_name, file_path, title, _) in zip(doc_keys, docs):
+            keys_file.write(array('I', sorted(key_index[key] for key in keys)).tobytes())
+            key_offsets.append(key_offsets[-1] + len(keys))
+            line = '\t'.join(field.replace('\t', ' ').replace('\n', ' ')
+                             for field in (doc_id, shard_name, file_path, title)) + '\n'
+            line = line.encode('utf-8')
+            docs_file.write(line)
+            doc_offsets.append(doc_offsets[-1] + len(line))
+    with open(os.path.join(tmp_dir, 'doc_keys.idx'), 'wb') as f:
+        f.write(key_offsets.tobytes())
+    with open(os.path.join(tmp_dir, 'docs.idx'), 'wb') as f:
+        f.write(doc_offsets.tobytes())
+    with open(os.path.join(tmp_dir, 'laws.json'), 'w', encoding='utf-8') as f:
+        json.dump({'laws': laws, 'shards': shard_starts, 'documents': doc}, f, ensure_ascii=False)
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.replace(tmp_dir, output_dir)
+    print(f"✓ 法条索引建立完成：{doc} 篇文书，{len(laws)} 部法律，{len(sorted_keys)} 个条文")
+    return doc
+
+
+class StatuteIndex:
+    """只读的法条引用索引"""
+    
+    def __init__(self, path='法条索引'):
+        """
+        打开索引
+        
+        Args:
+            path (str): 索引目录
+        """
+        self.path = path
+        with open(os.path.join(path, 'laws.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.laws = meta['laws']
+        self.document_count = meta['documents']
+        self._shard_names = [name for name, _ in meta['shards']]
+        self._shard_starts = [start for _, start in meta['shards']]
+        self._maps = []
+        self._views = []
+        self._keys = self._open('keys.bin', 'Q')
+        self._entries = self._open('entries.dat')
+        self._bitmaps = self._open('bitmaps.bin')
+        self._doc_keys = self._open('doc_keys.bin', 'I')
+        self._doc_key_offsets = self._open('doc_keys.idx', 'Q')
+        self._docs = self._open('docs.dat')
+        self._doc_offsets = self._open('docs.idx', 'Q')
+    
+    def _open(self, filename, fmt='B'):
+        path = os.path.join(self.path, filename)
+        if os.path.getsize(path) == 0:
+            view = memoryview(b'').cast(fmt)
+        else:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps.append(mapped)
+            base = memoryview(mapped)
+            self._views.append(base)
+            view = base.cast(fmt)
+        self._views.append(view)
+        return view
+    
+    def __len__(self):
+        return self.document_count
+    
+    def _law_id(self, law):
+        name = normalize_law_name(law)
+        i = bisect.bisect_left(self.laws, name)
+        return i if i < len(self.laws) and self.laws[i] == name else None
+    
+    def _bitmap(self, i):
+        offset, _ = ENTRY.unpack_from(self._entries, i * ENTRY.size)
+        return RoaringBitmap.deserialize(self._bitmaps, offset)
+    
+    def _key_label(self, key):
+        law, article, sub = self.laws[key >> 32], (key >> 8) & 0xFFFFFF, key & 0xFF
+        return f"{law}第{article}条" + (f"之{sub}" if sub else '')
+    
+    def _doc_range(self, date_from=None, date_to=None):
+        """日期区间（含两端）对应的文书号区间[start, stop)，文书号按日期排列"""
+        first = bisect.bisect_left(self._shard_names, date_from) if date_from else 0
+        last = bisect.bisect_right(self._shard_names, date_to) if date_to else len(self._shard_names)
+        start = self._shard_starts[first] if first < len(self._shard_starts) else self.document_count
+        stop = self._shard_starts[last] if last < len(self._shard_starts) else self.document_count
+        return start, stop
+    
+    def docs(self, law, article=None, sub=0, date_from=None, date_to=None):
+        """
+        引用某法律（某条）的文书号集合
+        
+        Args:
+            law (str): 法律名称或简称，如'民诉法'、'中华人民共和国民事诉讼法'
+            article (int): 条号，为None时不限条
+            sub (int): "之几"
+            date_from (str): 起始日期（含），如'2023-01-01'
+            date_to (str): 截止日期（含）
+        
+        Returns:
+            RoaringBitmap: 文书号集合
+        """
+        law_id = self._law_id(law)
+        if law_id is None:
+            return RoaringBitmap()
+        if article is None:
+            low, high = law_id << 32, (law_id + 1) << 32
+        else:
+            low = _pack_key(law_id, article, sub)
+            high = low + 1
+        result = RoaringBitmap()
+        for i in range(bisect.bisect_left(self._keys, low), bisect.bisect_left(self._keys, high)):
+            result = result | self._bitmap(i)
+        if date_from or date_to:
+            result = result.range(*self._doc_range(date_from, date_to))
+        return result
+    
+    def document(self, doc):
+        """
+        Returns:
+            dict: doc_id、date、file_path、title
+        """
+        line = bytes(self._docs[self._doc_offsets[doc]:self._doc_offsets[doc + 1]])
+        doc_id, date, file_path, title = line.decode('utf-8').rstrip('\n').split('\t')
+        return {'doc': doc, 'doc_id': doc_id, 'date': date, 'file_path': file_path, 'title': title}
+    
+    def search(self, law, article=None, sub=0, date_from=None, date_to=None, limit=20):
+        """
+        检索引用某法条的文书，参数同docs()
+        
+        Returns:
+            list: 文书信息dict，按日期排列
+        """
+        hits = []
+        for doc in self.docs(law, article, sub, date_from, date_to):
+            hits.append(self.document(doc))
+            if len(hits) >= limit:
+                break
+        return hits
+    
+    def co_citations(self, law, article=None, sub=0, date_from=None, date_to=None, limit=20):
+        """
+        与某法条共同被引用最多的条文
+        
+        Returns:
+            list: (条文, 共同引用的文书数)，按文书数降序
+        """
+        target = self.docs(law, article, sub, date_from, date_to)
+        law_id = self._law_id(law)
+        counts = Counter()
+        for doc in target:
+            start, end = self._doc_key_offsets[doc], self._doc_key_offsets[doc + 1]
+            counts.update(self._doc_keys[start:end].tolist())
+        results = []
+        for i, count in counts.most_common():
+            key = self._keys[i]
+            if key >> 32 == law_id and (article is None or (key >> 8) & 0xFFFFFF == article):
+                continue
+            results.append((self._key_label(key), count))
+            if len(results) >= limit:
+                break
+        return results
+    
+    def top_articles(self, law=None, limit=20):
+        """
+        被引用文书数最多的条文
+        
+        Returns:
+            list: (条文, 文书数)
+        """
+        if law is None:
+            first, last = 0, len(self._keys)
+        else:
+            law_id = self._law_id(law)
+            if law_id is None:
+                return []
+            first = bisect.bisect_left(self._keys, law_id << 32)
+            last = bisect.bisect_left(self._keys, (law_id + 1) << 32)
+        counts = [(len(self._bitmap(i)), i) for i in range(first, last)]
+        counts.sort(reverse=True)
+        return [(self._key_label(self._keys[i]), count) for count, i in counts[:limit]]
+    
+    def close(self):
+        """释放映射"""
+        for view in reversed(self._views):
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+        self._views = []
+        self._maps = []
+
+
+def main(argv=None):
+    """命令行入口：python -m statute_citations build / search / cocite / top / extract"""
+    parser = argparse.ArgumentParser(prog='python -m statute_citations', description='法条引用索引')
+    parser.add_argument('--index', default='法条索引', help='索引目录（默认: 法条索引）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='建立法条索引')
+    build_parser.add_argument('root', nargs='?', default='文书', help='文书根目录（默认: 文书）')
+    build_parser.add_argument('--workers', type=int, default=None, help='进程数（默认: CPU核数）')
+    for name, help_text in (('search', '检索引用某法条的文书'), ('cocite', '共同引用最多的条文')):
+        sub_parser = subparsers.add_parser(name, help=help_text)
+        sub_parser.add_argument('law', help='法律名称或简称，如 民诉法')
+        sub_parser.add_argument('--article', type=int, help='条号')
+        sub_parser.add_argument('--year', help='年份，如 2023')
+        sub_parser.add_argument('--from', dest='date_from', help='起始日期 YYYY-MM-DD')
+        sub_parser.add_argument('--to', dest='date_to', help='截止日期 YYYY-MM-DD')
+        sub_parser.add_argument('--limit', type=int, default=20, help='最多显示条数（默认: 20）')
+    top_parser = subparsers.add_parser('top', help='被引用最多的条文')
+    top_parser.add_argument('law', nargs='?', help='法律名称或简称，不给时统计全部法律')
+    top_parser.add_argument('--limit', type=int, default=20, help='最多显示条数（默认: 20）')
+    extract_parser = subparsers.add_parser('extract', help='显示一篇文书引用的法条')
+    extract_parser.add_argument('file', help='文书txt文件')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    
+    if args.command == 'extract':
+        with open(args.file, 'r', encoding='utf-8') as f:
+            for citation in extract_statutes(parse_document_text(f.read())['body']):
+                print(citation.label())
+        return True
+    
+    if args.command == 'build':
+        if not os.path.isdir(args.root):
+            print(f"✗ 目录不存在: {args.root}")
+            return False
+        build_index(args.root, args.index, args.workers)
+        return True
+    
+    index = StatuteIndex(args.index)
+    try:
+        if args.command == 'top':
+            for label, count in index.top_articles(args.law, args.limit):
+                print(f"{count:>8}  {label}")
+            return True
+        date_from, date_to = args.date_from, args.date_to
+        if args.year:
+            date_from, date_to = f"{args.year}-01-01", f"{args.year}-12-31"
+        if args.command == 'search':
+            matched = index.docs(args.law, args.article, date_from=date_from, date_to=date_to)
+            print(f"共 {len(matched)} 篇文书")
+            for hit in index.search(args.law, args.article, date_from=date_from, date_to=date_to, limit=args.limit):
+                print(f"[{hit['date']}] {hit['title']}")
+                print(f"   {hit['file_path']}")
+        else:
+            for label, count in index.co_citations(args.law, args.article, date_from=date_from,
+                                                   date_to=date_to, limit=args.limit):
+                print(f"{count:>8}  {label}")
+        return True
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 文书标题解析与链接筛选
+功能：把检索结果中的文书标题（如"A公司与B公司承揽合同纠纷审判监督民事裁定书"）解析为当事人、案由、
+审理程序、案件类别和文书类型，并按每次采集任务的规则在打开详情页之前筛选链接、排定访问顺序
+
+规则文件（JSON，默认 采集规则.json）示例：
+    {
+        "include": {"doc_type": ["判决书"], "category": ["民事"]},
+        "exclude": {"procedure": ["执行审查"], "case_reason": ["管辖"]},
+        "priority": [{"procedure": "二审"}, {"case_reason": ["合同纠纷", "借款"]}]
+    }
+    include中各字段都要满足（同一字段的多个值满足其一即可），exclude中任一字段满足即排除；
+    priority按顺序排列，满足第一条的先访问，都不满足的最后访问，同一优先级保持原顺序。
+    case_reason、parties按包含匹配，其余字段按相等匹配。
+"""
+
+import re
+import sys
+import json
+import hashlib
+import argparse
+from typing import NamedTuple
+
+DOC_TYPES = ('判决书', '裁定书', '调解书', '决定书', '通知书', '支付令', '保护令')
+CATEGORIES = ('国家赔偿', '司法救助', '民事', '刑事', '行政', '执行')
+# 标题中文书类型之前表示审理程序的词（可连写，如"民事申请再审审查案件"、"管辖权异议二审"）
+PROCEDURE_TERMS = (
+    '再审审查与审判监督', '申请再审审查', '审判监督', '再审', '一审', '二审', '管辖权异议', '管辖',
+    '执行审查类', '执行实施类', '非诉执行审查', '执行审查', '执行实施', '首次执行', '恢复执行',
+    '执行异议', '执行复议', '强制清算与破产', '破产', '特别程序', '刑罚与执行变更', '一案', '案件', '案',
+)
+# 审理程序的规范名称及对应的词，按顺序取第一个命中的
+PROCEDURES = (
+    ('审判监督', ('审判监督', '再审')),
+    ('二审', ('二审',)),
+    ('一审', ('一审',)),
+    ('执行审查', ('执行审查', '执行异议', '执行复议')),
+    ('执行实施', ('执行实施', '首次执行', '恢复执行')),
+    ('破产', ('破产',)),
+    ('特别程序', ('特别程序',)),
+    ('刑罚变更', ('刑罚与执行变更',)),
+)
+
+
+def _alternation(words):
+    """按长度降序拼成正则分支，较长的词优先匹配"""
+    return '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+# 从标题末尾向前依次为：文书类型、案件类别、审理程序；其余部分为当事人和案由
+TITLE_PATTERN = re.compile(
+    rf'(?P<head>.*?)(?P<procedure>(?:{_alternation(PROCEDURE_TERMS + CATEGORIES)})*?)'
+    rf'(?P<category>{_alternation(CATEGORIES)})?(?P<doc_type>{_alternation(DOC_TYPES)})$'
+)
+# 当事人之间的连接词；"之诉"、"上诉人"等词中的诉不是
+CONNECTOR_PATTERN = re.compile(r'因与|与|(?<![之上申起])诉(?![人讼])')
+ROLE_PATTERN = re.compile(
+    r'^(?:原审第三人|原审原告|原审被告|被上诉人|上诉人|再审申请人|被申请人|申请人|第三人|原告|被告)'
+)
+# 当事人名称的结尾：匿名写法（某、某某1）、"等"、括号，以及机构名称的常见结尾
+NAME_END_PATTERN = re.compile(
+    r'某+\d*|\d+|等|[）)]|有限责任公司|有限公司|分公司|公司|分行|支行|银行|集团|中心|委员会|人民政府|'
+    r'办事处|合作社|事务所|大学|学校|医院|企业|商行|街道|[厂局所院社店部站队村镇]'
+)
+# 名称结尾之后若紧跟这些字，说明结尾词属于案由（如"损害公司利益责任纠纷"、"所有权确认纠纷"）
+REASON_CONTINUATIONS = ('利益', '债权人', '决议', '盈余', '设立', '证照', '解散', '清算', '合并', '分立',
+                        '减资', '增资', '收购', '关联', '有权', '会保险', '员')
+
+
+class TitleInfo(NamedTuple):
+    """从文书标题解析出的字段，无法识别的为空字符串"""
+    parties: tuple
+    case_reason: str
+    procedure: str
+    jurisdiction: bool
+    category: str
+    doc_type: str
+
+
+def _split_names(text):
+    """当事人列表按顿号拆分，去掉诉讼地位和末尾的"等\""""
+    names = []
+    for name in re.split(r'[、，,]', text):
+        name = ROLE_PATTERN.sub('', name.strip())
+        if name.endswith('等'):
+            name = name[:-1]
+        if name:
+            names.append(name)
+    return names
+
+
+def _split_reason(text):
+    """
+    分开后一方当事人与案由
+    
+    取最后一个名称结尾（"等"优先）作为分界；整段以名称结尾时没有案由，找不到时整段作为案由
+    """
+    split = 0
+    for match in NAME_END_PATTERN.finditer(text):
+        if match.end() == len(text):
+            return text, ''
+        if text.startswith(REASON_CONTINUATIONS, match.end()):
+            continue
+        split = match.end()
+        if match.group() == '等':
+            break
+    return text[:split], text[split:]
+
+
+def parse_title(title):
+    """
+    解析文书标题
+    
+    Args:
+        title (str): 检索结果中的文书标题
+    
+    Returns:
+        TitleInfo: 解析结果；标题不以文书类型结尾时除当事人和案由外均为空
+    """
+    title = title.strip()
+    match = TITLE_PATTERN.match(title)
+    if match:
+        head, procedure_text = match.group('head'), match.group('procedure')
+        doc_type = match.group('doc_type')
+        category = match.group('category') or ''
+    else:
+        head, procedure_text, doc_type, category = title, '', '', ''
+    if not category:
+        category = next((word for word in CATEGORIES if word in procedure_text), '')
+    procedure = next((name for name, words in PROCEDURES
+                      if any(word in procedure_text for word in words)), '')
+    
+    connector = CONNECTOR_PATTERN.search(head, 1)
+    if connector:
+        left, right = head[:connector.start()], head[connector.end():]
+    else:
+        left, right = '', head
+    other, case_reason = _split_reason(right)
+    parties = _split_names(left) + _split_names(other)
+    return TitleInfo(tuple(parties), case_reason, procedure, '管辖' in procedure_text, category, doc_type)
+
+
+class LinkRules:
+    """按标题筛选、排序文书链接的规则"""
+    
+    FIELDS = TitleInfo._fields
+    _CONTAINS_FIELDS = ('case_reason', 'parties')
+    
+    def __init__(self, include=None, exclude=None, priority=None):
+        """
+        Args:
+            include (dict): 字段 -> 值或值列表，各字段都满足才保留
+            exclude (dict): 字段 -> 值或值列表，任一字段满足即排除
+            priority (list): 条件dict（格式同include）的列表，越靠前越先访问
+        """
+        self.include = self._normalize(include or {})
+        self.exclude = self._normalize(exclude or {})
+        self.priority = [self._normalize(rule) for rule in priority or []]
+    
+    @property
+    def fingerprint(self):
+        """筛选条件（include、exclude）的指纹，条件改变后指纹不同；priority只影响顺序，不计入"""
+        conditions = json.dumps({'include': self.include, 'exclude': self.exclude},
+                                ensure_ascii=False, sort_keys=True)
+        return hashlib.blake2b(conditions.encode('utf-8'), digest_size=8).hexdigest()
+    
+    @classmethod
+    def from_file(cls, path):
+        """
+        从JSON规则文件读取
+        
+        Raises:
+            ValueError: 规则中有未知的字段
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(config.get('include'), config.get('exclude'), config.get('priority'))
+    
+    def _normalize(self, conditions):
+        normalized = {}
+        for field, values in conditions.items():
+            if field not in self.FIELDS:
+                raise ValueError(f"未知的标题字段: {field}")
+            normalized[field] = values if isinstance(values, list) else [values]
+        return normalized
+    
+    def _field_matches(self, info, field, values):
+        value = getattr(info, field)
+        if field == 'parties':
+            return any(wanted in name for name in value for wanted in values)
+        if field in self._CONTAINS_FIELDS:
+            return any(wanted in value for wanted in values)
+        return value in values
+    
+    def _matches_all(self, info, conditions):
+        return all(self._field_matches(info, field, values) for field, values in conditions.items())
+    
+    def accepts(self, info):
+        """是否保留"""
+        if not self._matches_all(info, self.include):
+            return False
+        return not any(self._field_matches(info, field, values) for field, values in self.exclude.items())
+    
+    def rank(self, info):
+        """优先级，越小越先访问"""
+        for i, rule in enumerate(self.priority):
+            if self._matches_all(info, rule):
+                return i
+        return len(self.priority)
+    
+    def apply(self, links):
+        """
+        筛选并排序链接
+        
+        Args:
+            links (iterable): LinkRecord
+        
+        Returns:
+            tuple: (保留的链接列表（按优先级排序，同级保持原顺序）, 排除的链接列表)
+        """
+        kept, skipped = [], []
+        for link in links:
+            info = parse_title(link.title)
+            if self.accepts(info):
+                kept.append((self.rank(info), len(kept), link))
+            else:
+                skipped.append(link)
+        kept.sort()
+        return [link for _, _, link in kept], skipped
+
+
+def main(argv=None):
+    """命令行入口：python -m title_parser [标题 ...] [--rules 规则文件]，不给标题时从标准输入逐行读取"""
+    parser = argparse.ArgumentParser(prog='python -m title_parser', description='文书标题解析与链接筛选')
+    parser.add_argument('titles', nargs='*', help='文书标题')
+    parser.add_argument('--rules', help='规则文件，给出时显示每个标题是否保留及优先级')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    
+    rules = LinkRules.from_file(args.rules) if args.rules else None
+    titles = args.titles or (line.strip() for line in sys.stdin)
+    kept = skipped = 0
+    for title in titles:
+        if not title:
+            continue
+        info = parse_title(title)
+        print(title)
+        print(f"    当事人: {'、'.join(info.parties) or '-'}  案由: {info.case_reason or '-'}  "
+              f"程序: {info.procedure or '-'}{'（管辖）' if info.jurisdiction else ''}  "
+              f"类别: {info.category or '-'}  文书: {info.doc_type or '-'}")
+        if rules is not None:
+            if rules.accepts(info):
+                kept += 1
+                print(f"    ✓ 保留，优先级 {rules.rank(info)}")
+            else:
+                skipped += 1
+                print("    ✗ 排除")
+    if rules is not None:
+        print(f"\n保留 {kept} 个，排除 {skipped} 个")
+    return True
+
+
+if __name__ == "__main__":
+    main()
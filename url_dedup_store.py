@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - 跨运行的URL去重
+功能：以docId的8字节摘要为键持久化记录已见过的文书，成员判断不占用进程内存
+
+文件结构：
+    URL去重.bin       已排序的uint64摘要数组，通过mmap二分查找
+    URL去重.bin.log   新增摘要的追加日志，启动时读入内存，积累到一定数量后合并进排序数组
+"""
+
+import os
+import mmap
+import heapq
+import bisect
+import hashlib
+from array import array
+
+KEY_SIZE = 8
+
+
+def doc_id_key(doc_id):
+    """
+    计算docId的去重键
+    
+    docId先去掉首尾空白再取blake2b的8字节摘要；按日期采集时，
+    即使文书总数达到千万级，64位摘要碰撞的概率也可以忽略。
+    
+    Args:
+        doc_id (str): 文书docId
+    
+    Returns:
+        int: 64位无符号整数键
+    """
+    digest = hashlib.blake2b(doc_id.strip().encode('utf-8'), digest_size=KEY_SIZE).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class UrlDedupStore:
+    """持久化的docId去重集合：排序数组（mmap）+ 追加日志"""
+    
+    def __init__(self, path='URL去重.bin', merge_threshold=50000):
+        """
+        打开（或创建）去重集合
+        
+        Args:
+            path (str): 排序数组文件路径，日志为同名加.log
+            merge_threshold (int): 日志中的键达到该数量时合并进排序数组
+        """
+        self.path = path
+        self.log_path = path + '.log'
+        self.merge_threshold = merge_threshold
+        self._map = None
+        self._keys = memoryview(b'').cast('Q')
+        self._recent = set()
+        
+        self._open_sorted()
+        self._load_log()
+        self._log = open(self.log_path, 'ab')
+    
+    def _open_sorted(self):
+        """映射排序数组（数组按本机字节序存放）"""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._keys = memoryview(self._map).cast('Q')
+    
+    def _close_sorted(self):
+        # Windows下被映射的文件不能替换，合并前必须先释放
+        self._keys.release()
+        self._keys = memoryview(b'').cast('Q')
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+    
+    def _load_log(self):
+        """读入追加日志，崩溃时写了一半的键被截掉"""
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'r+b') as f:
+            data = f.read()
+            usable = len(data) - len(data) % KEY_SIZE
+            if usable != len(data):
+                print(f"⚠ 截掉去重日志末尾不完整的记录: {self.log_path}")
+                f.truncate(usable)
+        self._recent = set(array('Q', data[:usable]))
+    
+    def __len__(self):
+        return len(self._keys) + sum(1 for key in self._recent if not self._in_sorted(key))
+    
+    def __contains__(self, doc_id):
+        return self.contains(doc_id)
+    
+    def _in_sorted(self, key):
+        i = bisect.bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+    
+    def contains(self, doc_id):
+        """
+        检查docId是否已经见过
+        
+        Args:
+            doc_id (str): 文书docId
+        
+        Returns:
+            bool: 是否已见过
+        """
+        key = doc_id_key(doc_id)
+        return key in self._recent or self._in_sorted(key)
+    
+    def add_many(self, doc_ids):
+        """
+        记录一批docId，日志只刷新一次
+        
+        Args:
+            doc_ids (iterable): 文书docId
+        
+        Returns:
+            int: 新增的数量
+        """
+        new_keys = array('Q')
+        for doc_id in doc_ids:
+            key = doc_id_key(doc_id)
+            if key not in self._recent and not self._in_sorted(key):
+                self._recent.add(key)
+                new_keys.append(key)
+        if new_keys:
+            self._log.write(new_keys.tobytes())
+            self._log.flush()
+            os.fsync(self._log.fileno())
+        if len(self._recent) >= self.merge_threshold:
+            self.merge()
+        return len(new_keys)
+    
+    def add(self, doc_id):
+        """记录一个docId，返回是否为新增"""
+        return self.add_many([doc_id]) == 1
+    
+    def merge(self):
+        """将日志中的键归并进排序数组，然后清空日志"""
+        if not self._recent:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            buffer = array('Q')
+            last = None
+            for key in heapq.merge(self._keys, sorted(self._recent)):
+                if key == last:
+                    continue
+                last = key
+                buffer.append(key)
+                if len(buffer) >= 65536:
+                    f.write(buffer.tobytes())
+                    buffer = array('Q')
+            f.write(buffer.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._close_sorted()
+        os.replace(tmp_path, self.path)
+        self._open_sorted()
+        
+        # 替换完成后再清空日志；若在此之前崩溃，日志中的键只是重复，下次合并时去掉
+        self._log.close()
+        self._log = open(self.log_path, 'wb')
+        self._recent = set()
+        print(f"✓ 去重集合合并完成，共 {len(self._keys)} 个docId")
+    
+    def close(self):
+        """关闭文件"""
+        self._log.close()
+        self._close_sorted()
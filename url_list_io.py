@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+裁判文书网爬取项目 - URL列表读写
+功能：流式读取 URL列表/ 下的文书链接文件，产出LinkRecord，内存占用与文件大小无关；
+新的链接文件为只追加的JSONL，每收集完一页就写入并刷到磁盘，采集中途崩溃不丢失已收集的页
+
+JSONL文件结构（<日期>_上海市文书.jsonl）：
+    每行一条链接 {"doc_id", "url", "title", "page", "position"}
+    该日期的链接收集完成、正常关闭时最后一行为索引
+    {"index": {"records": 链接数, "pages": [[页码, 字节偏移, 链接数], ...]}}，统计数量、按页读取时不必扫描全文；
+    没有索引行表示收集未完成（崩溃或出错），按记录行扫描仍可完整读取
+
+旧格式（<日期>_上海市文书.txt）为"# "开头的说明行和"N. 标题"、"   URL: ..."的行对
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+
+from link_record import LinkRecord
+
+URL_LIST_SUFFIX = '.jsonl'
+TEXT_SUFFIX = '.txt'
+FILENAME_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})_(.*)(\.jsonl|\.txt)$')
+_TITLE_LINE = re.compile(r'\d+\. (.*)$')
+_TAIL_CHUNK = 65536
+
+
+def iter_text_url_list(path):
+    """
+    流式读取旧格式的URL文件
+    
+    Args:
+        path (str): 文件路径
+    
+    Yields:
+        LinkRecord: 按文件中的顺序（旧格式不记录页码和序号）
+    """
+    title = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            match = _TITLE_LINE.match(line)
+            if match:
+                title = match.group(1)
+            elif line.startswith('URL: ') and title is not None:
+                yield LinkRecord.from_url(line[len('URL: '):], title)
+                title = None
+
+
+def _encode_record(link):
+    return (json.dumps(link._asdict(), ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def _decode_line(line):
+    """
+    解析JSONL中的一行
+    
+    Returns:
+        LinkRecord或dict: 链接记录，索引行返回索引dict；写了一半的行返回None
+    """
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+    if 'index' in data:
+        return data['index']
+    return LinkRecord(data['doc_id'], data['url'], data['title'], data.get('page', 0), data.get('position', 0))
+
+
+class UrlListReader:
+    """只读的JSONL链接文件"""
+    
+    def __init__(self, path):
+        """
+        Args:
+            path (str): 文件路径
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self.index = self._read_index()
+    
+    @property
+    def complete(self):
+        """链接是否已收集完成（有索引行）"""
+        return self.index is not None
+    
+    def _read_index(self):
+        """读取末尾的索引行，没有时返回None"""
+        self._file.seek(0, os.SEEK_END)
+        size = self._file.tell()
+        if size == 0:
+            return None
+        chunk = _TAIL_CHUNK
+        while True:
+            start = max(0, size - chunk)
+            self._file.seek(start)
+            tail = self._file.read(size - start)
+            line_start = tail.rfind(b'\n', 0, len(tail) - 1)
+            if line_start >= 0 or start == 0:
+                break
+            chunk *= 2
+        if not tail.endswith(b'\n'):
+            return None
+        last = _decode_line(tail[line_start + 1:])
+        if not isinstance(last, dict):
+            return None
+        return last
+    
+    def __iter__(self):
+        self._file.seek(0)
+        for line in self._file:
+            if not line.endswith(b'\n'):
+                break  # 崩溃时写了一半的行
+            record = _decode_line(line)
+            if isinstance(record, LinkRecord):
+                yield record
+            elif record is not None:
+                break
+    
+    def __len__(self):
+        if self.index is not None:
+            return self.index['records']
+        return sum(1 for _ in self)
+    
+    def pages(self):
+        """
+        Returns:
+            list: (页码, 链接数)，按写入顺序
+        """
+        if self.index is not None:
+            return [(page, count) for page, _, count in self.index['pages']]
+        counts = {}
+        for record in self:
+            counts[record.page] = counts.get(record.page, 0) + 1
+        return list(counts.items())
+    
+    def page(self, page):
+        """
+        读取某一页收集到的链接（有索引时只读取该页的行）
+        
+        Returns:
+            list: LinkRecord
+        """
+        if self.index is None:
+            return [record for record in self if record.page == page]
+        records = []
+        for number, offset, count in self.index['pages']:
+            if number != page:
+                continue
+            self._file.seek(offset)
+            for _ in range(count):
+                records.append(_decode_line(self._file.readline()))
+        return records
+    
+    def close(self):
+        """关闭文件"""
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class UrlListWriter:
+    """只追加的JSONL链接文件，每页写入后立即刷到磁盘"""
+    
+    def __init__(self, path):
+        """
+        打开（或创建）链接文件；文件已存在时去掉末尾的索引行后继续追加，
+        崩溃留下的半行被截掉
+        
+        Args:
+            path (str): 文件路径
+        """
+        self.path = path
+        self.pages = []
+        self.doc_ids = set()
+        end = 0
+        if os.path.exists(path):
+            end = self._recover()
+        self._file = open(path, 'r+b' if os.path.exists(path) else 'wb')
+        self._file.seek(end)
+        self._file.truncate()
+        self.records = len(self.doc_ids)
+    
+    def _recover(self):
+        """扫描已有的记录行，重建页索引和docId集合，返回可继续写入的位置（索引行或半行的起点）"""
+        end = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                record = _decode_line(line) if line.endswith(b'\n') else None
+                if isinstance(record, LinkRecord):
+                    if not self.pages or self.pages[-1][0] != record.page:
+                        self.pages.append([record.page, end, 0])
+                    self.pages[-1][2] += 1
+                    self.doc_ids.add(record.doc_id)
+                    end += len(line)
+                    continue
+                if record is None:
+                    print(f"⚠ 截掉链接文件末尾不完整的记录: {self.path}")
+                break
+        return end
+    
+    def append_page(self, page, links):
+        """
+        写入一页新收集的链接，docId已在文件中的跳过
+        
+        Args:
+            page (int): 结果页页码
+            links (iterable): LinkRecord
+        
+        Returns:
+            int: 写入的链接数
+        """
+        offset = self._file.tell()
+        data = bytearray()
+        count = 0
+        for link in links:
+            if link.doc_id in self.doc_ids:
+                continue
+            self.doc_ids.add(link.doc_id)
+            data += _encode_record(link if link.page == page else link._replace(page=page))
+            count += 1
+        if not count:
+            return 0
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.pages.append([page, offset, count])
+        self.records += count
+        return count
+    
+    def close(self):
+        """链接收集完成：写入索引行并关闭文件"""
+        if self._file.closed:
+            return
+        index = {'index': {'records': self.records, 'pages': self.pages}}
+        self._file.write((json.dumps(index, separators=(',', ':')) + '\n').encode('utf-8'))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+    
+    def abort(self):
+        """收集未完成：不写索引行直接关闭，下次打开时从已写入的页继续"""
+        if not self._file.closed:
+            self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def is_url_list_complete(path):
+    """
+    某个链接文件中的链接是否已收集完成
+    
+    Returns:
+        bool: JSONL有索引行，或为旧格式（收集完成后才写出）时为True；文件不存在时为False
+    """
+    if not os.path.exists(path):
+        return False
+    if not path.endswith(URL_LIST_SUFFIX):
+        return True
+    with UrlListReader(path) as reader:
+        return reader.complete
+
+
+def iter_url_list(path):
+    """
+    流式读取一个链接文件，按扩展名区分JSONL和旧格式
+    
+    Yields:
+        LinkRecord: 按文件中的顺序
+    """
+    if path.endswith(URL_LIST_SUFFIX):
+        with UrlListReader(path) as reader:
+            yield from reader
+    else:
+        yield from iter_text_url_list(path)
+
+
+def find_url_lists(folder='URL列表', date_from=None, date_to=None):
+    """
+    列出目录中的链接文件，同一日期同时有JSONL和旧格式时取JSONL
+    
+    Args:
+        folder (str): URL列表目录
+        date_from (str): 起始日期（含），如'2023-01-01'
+        date_to (str): 截止日期（含）
+    
+    Returns:
+        list: (日期, 文件路径)，按日期排列
+    """
+    chosen = {}
+    for filename in os.listdir(folder):
+        match = FILENAME_PATTERN.match(filename)
+        if not match:
+            continue
+        date_str, name, suffix = match.groups()
+        if (date_from and date_str < date_from) or (date_to and date_str > date_to):
+            continue
+        key = (date_str, name)
+        if key not in chosen or suffix == URL_LIST_SUFFIX:
+            chosen[key] = os.path.join(folder, filename)
+    return [(date_str, chosen[(date_str, name)]) for date_str, name in sorted(chosen)]
+
+
+def iter_url_lists(folder='URL列表', date_from=None, date_to=None):
+    """
+    按日期顺序流式读取目录中的全部链接
+    
+    Yields:
+        tuple: (日期, LinkRecord)
+    """
+    for date_str, path in find_url_lists(folder, date_from, date_to):
+        for record in iter_url_list(path):
+            yield date_str, record
+
+
+def convert_text_url_list(text_path, jsonl_path=None):
+    """
+    旧格式的URL文件转换为JSONL（写入临时文件后替换）
+    
+    Args:
+        text_path (str): 旧格式文件
+        jsonl_path (str): 输出路径，默认为同名.jsonl
+    
+    Returns:
+        int: 转换的链接数
+    """
+    if jsonl_path is None:
+        jsonl_path = text_path[:-len(TEXT_SUFFIX)] + URL_LIST_SUFFIX
+    tmp_path = jsonl_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    with UrlListWriter(tmp_path) as writer:
+        writer.append_page(0, iter_text_url_list(text_path))
+        count = writer.records
+    os.replace(tmp_path, jsonl_path)
+    return count
+
+
+def main(argv=None):
+    """命令行入口：python -m url_list_io stats / cat / convert"""
+    parser = argparse.ArgumentParser(prog='python -m url_list_io', description='URL列表读写')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    stats_parser = subparsers.add_parser('stats', help='统计各日期的链接数')
+    cat_parser = subparsers.add_parser('cat', help='逐行输出链接（docId、标题、URL）')
+    for sub_parser in (stats_parser, cat_parser):
+        sub_parser.add_argument('folder', nargs='?', default='URL列表', help='URL列表目录（默认: URL列表）')
+        sub_parser.add_argument('--from', dest='date_from', help='起始日期 YYYY-MM-DD')
+        sub_parser.add_argument('--to', dest='date_to', help='截止日期 YYYY-MM-DD')
+    convert_parser = subparsers.add_parser('convert', help='把旧格式的txt文件转换为JSONL（已有JSONL的日期跳过）')
+    convert_parser.add_argument('folder', nargs='?', default='URL列表', help='URL列表目录（默认: URL列表）')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    
+    if not os.path.isdir(args.folder):
+        print(f"✗ 目录不存在: {args.folder}")
+        return False
+    
+    if args.command == 'convert':
+        converted = 0
+        for _, path in find_url_lists(args.folder):
+            if path.endswith(TEXT_SUFFIX):
+                count = convert_text_url_list(path)
+                print(f"✓ {os.path.basename(path)}: {count} 个链接")
+                converted += 1
+        print(f"✓ 共转换 {converted} 个文件")
+    elif args.command == 'stats':
+        total = 0
+        for date_str, path in find_url_lists(args.folder, args.date_from, args.date_to):
+            if path.endswith(URL_LIST_SUFFIX):
+                with UrlListReader(path) as reader:
+                    count = len(reader)
+                    note = '' if reader.complete else '  ⚠ 无索引（采集中断）'
+            else:
+                count = sum(1 for _ in iter_text_url_list(path))
+                note = '  （旧格式）'
+            total += count
+            print(f"{date_str}  {count:>6}{note}")
+        print(f"✓ 共 {total} 个链接")
+    else:
+        for date_str, record in iter_url_lists(args.folder, args.date_from, args.date_to):
+            print(f"{date_str}\t{record.doc_id}\t{record.title}\t{record.url}")
+    return True
+
+
+if __name__ == "__main__":
+    main()